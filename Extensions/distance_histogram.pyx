@@ -3,15 +3,17 @@ cimport numpy as np
 from numpy cimport ndarray
 
 
-cdef extern from "math.h":
+cdef extern from "math.h" nogil:
 
     double floor(double x)
     double ceil(double x)
     double sqrt(double x)
 
-cdef inline double round(double r):
+cdef inline double round(double r) nogil:
     return floor(r + 0.5) if (r > 0.0) else ceil(r - 0.5)
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
 def distance_histogram(ndarray[np.float64_t, ndim=2]  config not None,
                        ndarray[np.float64_t, ndim=2]  cell not None,
                        ndarray[np.float64_t, ndim=2]  rcell not None,
@@ -27,51 +29,70 @@ def distance_histogram(ndarray[np.float64_t, ndim=2]  config not None,
     # This computes the intra and intermolecular distances histogram.
     # The algorithm is a Pyrex adaptation of the FORTRAN implementation 
     # made by Miguel Angel Gonzalez (Institut Laue Langevin).
+    # The GIL is released during the calculation. The arrays must not be modified by another thread meanwhile.
 
-    cdef double x, y, z, sdx, sdy, sdz, rx, ry, rz, r
+    cdef double x, y, z, sx, sy, sz, sdx, sdy, sdz, rx, ry, rz, r
 
-    cdef int i, j, bin, nbins
+    cdef int i, j, bin, nbins, nindexes
 
     nbins = hinter.shape[2]
 
-    for 0 <= i < indexes.shape[0]:
+    nindexes = indexes.shape[0]
 
-        x = config[i,0]
-        y = config[i,1]
-        z = config[i,2]
+    # As the bounds are not checked in the loops, the shapes of the arrays are checked beforehand.
+    if config.shape[0] < nindexes or scaleconfig.shape[0] < nindexes or molindex.shape[0] < nindexes or symbolindex.shape[0] < nindexes:
+        raise IndexError("The configuration, the molecule and symbol indexes and the scaled configuration must have at least one row per atom.")
 
-        scaleconfig[i,0] = x*rcell[0,0] + y*rcell[0,1] + z*rcell[0,2]
-        scaleconfig[i,1] = x*rcell[1,0] + y*rcell[1,1] + z*rcell[1,2]
-        scaleconfig[i,2] = x*rcell[2,0] + y*rcell[2,1] + z*rcell[2,2]
+    if config.shape[1] < 3 or scaleconfig.shape[1] < 3 or cell.shape[0] < 3 or cell.shape[1] < 3 or rcell.shape[0] < 3 or rcell.shape[1] < 3:
+        raise IndexError("The configurations must be (n,3) arrays and the cells (3,3) arrays.")
+
+    if hintra.shape[0] < hinter.shape[0] or hintra.shape[1] < hinter.shape[1] or hintra.shape[2] < nbins:
+        raise IndexError("The intra and intermolecular histograms must have the same shape.")
+
+    for 0 <= i < nindexes:
+        if symbolindex[i] < 0 or symbolindex[i] >= hinter.shape[0] or symbolindex[i] >= hinter.shape[1]:
+            raise IndexError("Invalid symbol index for atom %d." % i)
+
+    with nogil:
+
+        for 0 <= i < nindexes:
+
+            x = config[i,0]
+            y = config[i,1]
+            z = config[i,2]
+
+            scaleconfig[i,0] = x*rcell[0,0] + y*rcell[0,1] + z*rcell[0,2]
+            scaleconfig[i,1] = x*rcell[1,0] + y*rcell[1,1] + z*rcell[1,2]
+            scaleconfig[i,2] = x*rcell[2,0] + y*rcell[2,1] + z*rcell[2,2]
         
-    for 0 <= i < indexes.shape[0] - 1:
+        for 0 <= i < nindexes - 1:
 
-        sx = scaleconfig[i,0]
-        sy = scaleconfig[i,1]
-        sz = scaleconfig[i,2]
+            sx = scaleconfig[i,0]
+            sy = scaleconfig[i,1]
+            sz = scaleconfig[i,2]
 
-        for i + 1 <= j < indexes.shape[0]:
+            for i + 1 <= j < nindexes:
 
-            sdx = scaleconfig[j,0] - sx
-            sdy = scaleconfig[j,1] - sy
-            sdz = scaleconfig[j,2] - sz
+                sdx = scaleconfig[j,0] - sx
+                sdy = scaleconfig[j,1] - sy
+                sdz = scaleconfig[j,2] - sz
 
-            sdx -= round(sdx)
-            sdy -= round(sdy)
-            sdz -= round(sdz)
+                sdx -= round(sdx)
+                sdy -= round(sdy)
+                sdz -= round(sdz)
             
-            rx = sdx*cell[0,0] + sdy*cell[0,1] + sdz*cell[0,2]
-            ry = sdx*cell[1,0] + sdy*cell[1,1] + sdz*cell[1,2]
-            rz = sdx*cell[2,0] + sdy*cell[2,1] + sdz*cell[2,2]
+                rx = sdx*cell[0,0] + sdy*cell[0,1] + sdz*cell[0,2]
+                ry = sdx*cell[1,0] + sdy*cell[1,1] + sdz*cell[1,2]
+                rz = sdx*cell[2,0] + sdy*cell[2,1] + sdz*cell[2,2]
 
-            r = sqrt(rx*rx + ry*ry + rz*rz)
+                r = sqrt(rx*rx + ry*ry + rz*rz)
 
-            bin = <int>((r-rmin)/dr)
+                bin = <int>((r-rmin)/dr)
             
-            if ( (bin < 0) or (bin >= nbins)):
-                continue
+                if ( (bin < 0) or (bin >= nbins)):
+                    continue
 
-            if molindex[i] == molindex[j]:
-                hintra[symbolindex[i],symbolindex[j],bin] += 1.0
-            else:
-                hinter[symbolindex[i],symbolindex[j],bin] += 1.0
+                if molindex[i] == molindex[j]:
+                    hintra[symbolindex[i],symbolindex[j],bin] += 1.0
+                else:
+                    hinter[symbolindex[i],symbolindex[j],bin] += 1.0
@@ -7,34 +7,207 @@
 
 
 import cython
+import numpy
 cimport numpy as np
 from numpy cimport ndarray
 
-cdef extern from "math.h":
+cdef extern from "math.h" nogil:
+    double floor(double x)
     double sqrt(double x)
 
 @cython.cdivision(True)
 @cython.boundscheck(False)
 @cython.wraparound(False)
-def cpt_cluster_connectivity(ndarray[np.float64_t, ndim=2] coords, 
-                                ndarray[np.float64_t, ndim=1] covRadii, 
-                                np.float32_t tolerance,
-                                bonds):
+def cpt_cluster_connectivity(ndarray[np.float64_t, ndim=2] coords not None, 
+                             ndarray[np.float64_t, ndim=1] covRadii not None, 
+                             double tolerance,
+                             ndarray[np.float64_t, ndim=2] cell=None,
+                             ndarray[np.float64_t, ndim=2] rcell=None):
     '''
     Compute the connectivity of an atom cluster.
+    
+    Two atoms are bonded if their distance is lower than the sum of their covalent radii plus the tolerance. The atoms 
+    are binned in a grid of cells at least as large as the largest possible bond so that only the atoms of neighbouring 
+    cells are compared, hence the cost is linear in the number of atoms.
+    
+    If the direct and reciprocal cells are given (as (3,3) arrays whose rows are the basis vectors), the distances 
+    follow the minimum image convention and the grid is periodic. Otherwise the grid spans the bounding box of the atoms.
+    
+    The returned bonds are (i,j) pairs of row indexes of coords with i < j, sorted by i then j.
     '''
     
-    cdef int i, j, nbat
-    cdef float radius, distance
-    nbat = len(covRadii)
+    cdef int nAtoms, nBonds, nNeighbours, i, j, k, c, nc, p, a, b, periodic
+    cdef int ix, iy, iz, dx, dy, dz, jx, jy, jz
+    cdef int nCells[3]
+    cdef int neighbours[27]
+    cdef double cutoff, maxRadius, radius, distance, sdx, sdy, sdz, rx, ry, rz, width, s
+    cdef double origin[3]
+    cdef double extent[3]
+    
+    nAtoms = covRadii.shape[0]
+
+    # As the bounds are not checked in the loops, the shapes of the arrays are checked beforehand.
+    if coords.shape[0] < nAtoms or coords.shape[1] < 3:
+        raise IndexError("The coordinates must be a (n,3) array with one row per covalent radius.")
+
+    periodic = cell is not None and rcell is not None
+    if periodic and (cell.shape[0] < 3 or cell.shape[1] < 3 or rcell.shape[0] < 3 or rcell.shape[1] < 3):
+        raise IndexError("The direct and reciprocal cells must be (3,3) arrays.")
+
+    if nAtoms < 2:
+        return numpy.zeros((0,2), dtype=numpy.int32)
+    
+    maxRadius = covRadii.max()
+    cutoff = 2.0*maxRadius + tolerance
+
+    # The reduced coordinates of the atoms, in [0,1[ along each direction of the grid.
+    cdef ndarray[np.float64_t, ndim=2] scaled = numpy.empty((nAtoms,3), dtype=numpy.float64)
+
+    if periodic:
+        for 0 <= i < nAtoms:
+            for 0 <= k < 3:
+                s = rcell[k,0]*coords[i,0] + rcell[k,1]*coords[i,1] + rcell[k,2]*coords[i,2]
+                scaled[i,k] = s - floor(s)
+        for 0 <= k < 3:
+            # The distance between the two faces of the cell normal to the k-th reciprocal vector.
+            width = 1.0/sqrt(rcell[k,0]*rcell[k,0] + rcell[k,1]*rcell[k,1] + rcell[k,2]*rcell[k,2])
+            extent[k] = width
+    else:
+        for 0 <= k < 3:
+            origin[k] = coords[0,k]
+            extent[k] = coords[0,k]
+        for 0 <= i < nAtoms:
+            for 0 <= k < 3:
+                if coords[i,k] < origin[k]:
+                    origin[k] = coords[i,k]
+                if coords[i,k] > extent[k]:
+                    extent[k] = coords[i,k]
+        for 0 <= k < 3:
+            extent[k] = extent[k] - origin[k]
+            if extent[k] <= 0.0:
+                extent[k] = cutoff
+            for 0 <= i < nAtoms:
+                scaled[i,k] = (coords[i,k] - origin[k])/extent[k]
+    
+    # The number of cells along each direction. The cells are never smaller than the cutoff and there are no more
+    # cells than atoms, up to rounding.
+    cdef int maxCells = <int>(nAtoms**(1.0/3.0)) + 1
+    for 0 <= k < 3:
+        nCells[k] = <int>(extent[k]/cutoff)
+        if nCells[k] < 1:
+            nCells[k] = 1
+        if nCells[k] > maxCells:
+            nCells[k] = maxCells
+    
+    cdef ndarray[np.int32_t, ndim=1] cellIndex = numpy.empty((nAtoms,), dtype=numpy.int32)
+    cdef ndarray[np.int32_t, ndim=1] head = numpy.empty((nCells[0]*nCells[1]*nCells[2],), dtype=numpy.int32)
+    cdef ndarray[np.int32_t, ndim=1] following = numpy.empty((nAtoms,), dtype=numpy.int32)
+    cdef ndarray[np.int32_t, ndim=2] bonds = numpy.empty((0,2), dtype=numpy.int32)
+
+    with nogil:
+        
+        # Builds the linked lists of the atoms of each cell.
+        for 0 <= c < nCells[0]*nCells[1]*nCells[2]:
+            head[c] = -1
+
+        for 0 <= i < nAtoms:
+            ix = <int>(scaled[i,0]*nCells[0])
+            iy = <int>(scaled[i,1]*nCells[1])
+            iz = <int>(scaled[i,2]*nCells[2])
+            if ix >= nCells[0]:
+                ix = nCells[0] - 1
+            if iy >= nCells[1]:
+                iy = nCells[1] - 1
+            if iz >= nCells[2]:
+                iz = nCells[2] - 1
+            c = (ix*nCells[1] + iy)*nCells[2] + iz
+            cellIndex[i] = c
+            following[i] = head[c]
+            head[c] = i
+        
+    # The bonds are counted during the first pass and stored during the second one.
+    for 0 <= p < 2:
+        
+        with nogil:
+            
+            nBonds = 0
+            
+            for 0 <= ix < nCells[0]:
+                for 0 <= iy < nCells[1]:
+                    for 0 <= iz < nCells[2]:
+                        
+                        c = (ix*nCells[1] + iy)*nCells[2] + iz
+                        
+                        # The distinct neighbouring cells not preceding the current one, such as each pair of cells 
+                        # is visited once. There are less than 27 of them when the grid has less than 3 cells along 
+                        # a periodic direction.
+                        nNeighbours = 0
+                        for -1 <= dx < 2:
+                            jx = ix + dx
+                            if periodic:
+                                jx = (jx + nCells[0]) % nCells[0]
+                            elif jx < 0 or jx >= nCells[0]:
+                                continue
+                            for -1 <= dy < 2:
+                                jy = iy + dy
+                                if periodic:
+                                    jy = (jy + nCells[1]) % nCells[1]
+                                elif jy < 0 or jy >= nCells[1]:
+                                    continue
+                                for -1 <= dz < 2:
+                                    jz = iz + dz
+                                    if periodic:
+                                        jz = (jz + nCells[2]) % nCells[2]
+                                    elif jz < 0 or jz >= nCells[2]:
+                                        continue
+                                    nc = (jx*nCells[1] + jy)*nCells[2] + jz
+                                    if nc < c:
+                                        continue
+                                    for 0 <= k < nNeighbours:
+                                        if neighbours[k] == nc:
+                                            break
+                                    else:
+                                        neighbours[nNeighbours] = nc
+                                        nNeighbours += 1
+                        
+                        for 0 <= k < nNeighbours:
+                            nc = neighbours[k]
+                            i = head[c]
+                            while i >= 0:
+                                j = following[i] if nc == c else head[nc]
+                                while j >= 0:
+                                    if periodic:
+                                        sdx = scaled[j,0] - scaled[i,0]
+                                        sdy = scaled[j,1] - scaled[i,1]
+                                        sdz = scaled[j,2] - scaled[i,2]
+                                        sdx -= floor(sdx + 0.5)
+                                        sdy -= floor(sdy + 0.5)
+                                        sdz -= floor(sdz + 0.5)
+                                        rx = sdx*cell[0,0] + sdy*cell[1,0] + sdz*cell[2,0]
+                                        ry = sdx*cell[0,1] + sdy*cell[1,1] + sdz*cell[2,1]
+                                        rz = sdx*cell[0,2] + sdy*cell[1,2] + sdz*cell[2,2]
+                                    else:
+                                        rx = coords[j,0] - coords[i,0]
+                                        ry = coords[j,1] - coords[i,1]
+                                        rz = coords[j,2] - coords[i,2]
+                                    distance = rx*rx + ry*ry + rz*rz
+                                    radius = covRadii[i] + covRadii[j] + tolerance
+                                    if distance <= (radius*radius):
+                                        if p == 1:
+                                            if i < j:
+                                                a, b = i, j
+                                            else:
+                                                a, b = j, i
+                                            bonds[nBonds,0] = a
+                                            bonds[nBonds,1] = b
+                                        nBonds += 1
+                                    j = following[j]
+                                i = following[i]
+                                
+        if p == 0:
+            bonds = numpy.empty((nBonds,2), dtype=numpy.int32)
     
-    for i in range(nbat-1):
-        radiusi = covRadii[i] + tolerance
-        for j in range(i+1,nbat):
-            radius = radiusi + covRadii[j]
-            distance = (coords[i,0] - coords[j,0])**2 + (coords[i,1] - coords[j,1])**2 + (coords[i,2] - coords[j,2])**2
-            if distance <= (radius*radius):
-                bonds.append([i,j])
-    return bonds
+    # Sorted for the bonds not to depend on the grid.
+    order = numpy.lexsort((bonds[:,1],bonds[:,0]))
 
-                
\ No newline at end of file
+    return bonds[order]
@@ -3,7 +3,7 @@ cimport numpy as np
 import numpy as np
 from numpy cimport ndarray
 
-cdef extern from "math.h":
+cdef extern from "math.h" nogil:
     double floor(double x)
     double ceil(double x)
 
@@ -13,17 +13,37 @@ def mt(ndarray[np.float64_t, ndim = 2] config not None,
        ndarray[np.int32_t, ndim = 3] grid not None,
        double resolution,ndarray[np.float64_t, ndim = 1] mini not None): 
     
-    cdef int at, nbatom , atom
-    cdef double Xpos, Ypos, Zpos, i, j, k , mx, my, mz
+    # The GIL is released during the calculation. The arrays must not be modified by another thread meanwhile.
+    # Returns the number of atoms that fell out of the grid and were not counted.
+
+    cdef int at, nbatom , atom, i, j, k, nx, ny, nz, skipped
+    cdef double Xpos, Ypos, Zpos, mx, my, mz
     
+    if config.shape[1] < 3 or mini.shape[0] < 3:
+        raise IndexError("The configuration must be a (n,3) array and the minimum of the grid a 3-vector.")
+
     mx = mini[0] 
     my = mini[1]
     mz = mini[2]
     
+    nx = grid.shape[0]
+    ny = grid.shape[1]
+    nz = grid.shape[2]
+
     nbatom = config.shape[0]
-    for atom in range(nbatom):
-        # The  of atoms |i| in the current configuration.
-        i = floor((config[atom,0]-mx)/resolution)
-        j = floor((config[atom,1]-my)/resolution)
-        k = floor((config[atom,2]-mz)/resolution)
-        grid[i,j,k] += 1
+
+    skipped = 0
+
+    with nogil:
+        for atom in range(nbatom):
+            # The  of atoms |i| in the current configuration.
+            i = <int>floor((config[atom,0]-mx)/resolution)
+            j = <int>floor((config[atom,1]-my)/resolution)
+            k = <int>floor((config[atom,2]-mz)/resolution)
+            # The atoms falling out of the grid are skipped.
+            if i < 0 or i >= nx or j < 0 or j >= ny or k < 0 or k >= nz:
+                skipped += 1
+                continue
+            grid[i,j,k] += 1
+
+    return skipped
@@ -4,7 +4,7 @@ import numpy as np
 from numpy cimport ndarray
 
 
-cdef extern from "math.h":
+cdef extern from "math.h" nogil:
     double floor(double x)
     double ceil(double x)
     double sqrt(double x)
@@ -12,16 +12,18 @@ cdef extern from "math.h":
     double abs(double x)
     float  fminf(float x, float y)
     
-cdef inline double round(double r):
+cdef inline double round(double r) nogil:
     return floor(r + 0.5) if (r > 0.0) else ceil(r - 0.5)
 
 
-cdef inline double mod(double x, double y):
+cdef inline double mod(double x, double y) nogil:
     return abs(fmod(x,y))
      
 def pmod(x,y):
     return mod(x,y)
  
+@cython.boundscheck(False)
+@cython.wraparound(False)
 def spatial_density(ndarray[np.float64_t, ndim=2]  config not None,
                       ndarray[np.int32_t, ndim=1] indexes not None,
                       ndarray[np.float64_t, ndim=2]  cell not None,
@@ -32,104 +34,117 @@ def spatial_density(ndarray[np.float64_t, ndim=2]  config not None,
                       np.float64_t resolution,
                       ndarray[np.int32_t, ndim=3] hist not None):
     
+    # The GIL is released during the calculation. The arrays must not be modified by another thread meanwhile.
 
     cdef double x, y, z, sdx, sdy, sdz, minix, miniy, miniz
     cdef double xorigin, yorigin, zorigin, orthx, orthy, orthz
     cdef double aa, bb, cc, dd, ee, ff, gg, hh, ii,  denum, micx, micy, micz, xscaledOrigin, yscaledOrigin, zscaledOrigin
-    cdef int i, j,k, bin, nbins, nbases, nindexes, xind, yind, zind
+    cdef int i, j,k, bin, nbins, nbases, nindexes, xind, yind, zind, nx, ny, nz
     
     
     nbases = bases.shape[0]
     nindexes = indexes.shape[0]
+    
+    # As the bounds are not checked in the loops, the shapes of the arrays are checked beforehand.
+    if config.shape[0] < nindexes or config.shape[1] < 3:
+        raise IndexError("The configuration must be a (n,3) array with at least one row per atom.")
+
+    if origins.shape[0] < nbases or origins.shape[1] < 3 or bases.shape[1] < 3 or bases.shape[2] < 3 or mini.shape[0] < 3:
+        raise IndexError("Invalid shape for the origins, the bases or the minimum of the grid.")
+
+    if cell.shape[0] < 3 or cell.shape[1] < 3 or rcell.shape[0] < 3 or rcell.shape[1] < 3:
+        raise IndexError("The cells must be (3,3) arrays.")
+        
+    nx = hist.shape[0]
+    ny = hist.shape[1]
+    nz = hist.shape[2]
         
     minix = mini[0]
     miniy = mini[1]
     miniz = mini[2]
     
     cdef ndarray[np.float64_t, ndim=2] invBasis = np.zeros((3,3), dtype = np.float64)
-    cdef ndarray[np.float64_t, ndim=2] basis = np.zeros((3,3), dtype = np.float64)
     cdef ndarray[np.float64_t, ndim=2] scaleconfig = np.zeros((nindexes,3), dtype = np.float64)
     
-    for 0 <= i < nindexes:
+    with nogil:
+    
+        for 0 <= i < nindexes:
 
-        x = <float> config[i,0]
-        y = <float> config[i,1]
-        z = <float> config[i,2]
+            x = <float> config[i,0]
+            y = <float> config[i,1]
+            z = <float> config[i,2]
         
-        scaleconfig[i,0] = x*rcell[0,0] + y*rcell[0,1] + z*rcell[0,2]
-        scaleconfig[i,1] = x*rcell[1,0] + y*rcell[1,1] + z*rcell[1,2]
-        scaleconfig[i,2] = x*rcell[2,0] + y*rcell[2,1] + z*rcell[2,2]
+            scaleconfig[i,0] = x*rcell[0,0] + y*rcell[0,1] + z*rcell[0,2]
+            scaleconfig[i,1] = x*rcell[1,0] + y*rcell[1,1] + z*rcell[1,2]
+            scaleconfig[i,2] = x*rcell[2,0] + y*rcell[2,1] + z*rcell[2,2]
         
-    for 0 <= i < nbases:
+        for 0 <= i < nbases:
         
-        xorigin = origins[i,0]
-        yorigin = origins[i,1]
-        zorigin = origins[i,2]
+            xorigin = origins[i,0]
+            yorigin = origins[i,1]
+            zorigin = origins[i,2]
         
-        xscaledOrigin = xorigin*rcell[0,0] + yorigin*rcell[0,1] + zorigin*rcell[0,2]
-        yscaledOrigin = xorigin*rcell[1,0] + yorigin*rcell[1,1] + zorigin*rcell[1,2]
-        zscaledOrigin = xorigin*rcell[2,0] + yorigin*rcell[2,1] + zorigin*rcell[2,2]
+            xscaledOrigin = xorigin*rcell[0,0] + yorigin*rcell[0,1] + zorigin*rcell[0,2]
+            yscaledOrigin = xorigin*rcell[1,0] + yorigin*rcell[1,1] + zorigin*rcell[1,2]
+            zscaledOrigin = xorigin*rcell[2,0] + yorigin*rcell[2,1] + zorigin*rcell[2,2]
         
-        basis = bases[i,:,:]
-
-        aa = <float>basis[0,0]
-        bb = <float>basis[0,1]
-        cc = <float>basis[0,2]
+            aa = <float>bases[i,0,0]
+            bb = <float>bases[i,0,1]
+            cc = <float>bases[i,0,2]
         
-        dd = <float>basis[1,0]
-        ee = <float>basis[1,1]
-        ff = <float>basis[1,2]
+            dd = <float>bases[i,1,0]
+            ee = <float>bases[i,1,1]
+            ff = <float>bases[i,1,2]
         
-        gg = <float>basis[2,0]
-        hh = <float>basis[2,1]
-        ii = <float>basis[2,2]
+            gg = <float>bases[i,2,0]
+            hh = <float>bases[i,2,1]
+            ii = <float>bases[i,2,2]
         
-        denum = -cc*ee*gg+bb*ff*gg+cc*dd*hh-aa*ff*hh-bb*dd*ii+aa*ee*ii
+            denum = -cc*ee*gg+bb*ff*gg+cc*dd*hh-aa*ff*hh-bb*dd*ii+aa*ee*ii
         
-        invBasis[0,0] = (-ff*hh+ee*ii)/denum
-        invBasis[0,1] = (cc*hh-bb*ii)/denum
-        invBasis[0,2] = (-cc*ee+bb*ff)/denum
+            invBasis[0,0] = (-ff*hh+ee*ii)/denum
+            invBasis[0,1] = (cc*hh-bb*ii)/denum
+            invBasis[0,2] = (-cc*ee+bb*ff)/denum
         
-        invBasis[1,0] = (ff*gg-dd*ii)/denum
-        invBasis[1,1] = (-cc*gg+aa*ii)/denum
-        invBasis[1,2] = (cc*dd-aa*ff)/denum
+            invBasis[1,0] = (ff*gg-dd*ii)/denum
+            invBasis[1,1] = (-cc*gg+aa*ii)/denum
+            invBasis[1,2] = (cc*dd-aa*ff)/denum
         
-        invBasis[2,0] = (-ee*gg+dd*hh)/denum
-        invBasis[2,1] = (bb*gg-aa*hh)/denum
-        invBasis[2,2] = (-bb*dd+aa*ee)/denum
+            invBasis[2,0] = (-ee*gg+dd*hh)/denum
+            invBasis[2,1] = (bb*gg-aa*hh)/denum
+            invBasis[2,2] = (-bb*dd+aa*ee)/denum
         
         
-        for 0 <= j < nindexes:
+            for 0 <= j < nindexes:
  
-            sdx = scaleconfig[j,0] - xscaledOrigin
-            sdy = scaleconfig[j,1] - yscaledOrigin
-            sdz = scaleconfig[j,2] - zscaledOrigin
+                sdx = scaleconfig[j,0] - xscaledOrigin
+                sdy = scaleconfig[j,1] - yscaledOrigin
+                sdz = scaleconfig[j,2] - zscaledOrigin
 
-            sdx -= round(sdx)
-            sdy -= round(sdy)
-            sdz -= round(sdz)
+                sdx -= round(sdx)
+                sdy -= round(sdy)
+                sdz -= round(sdz)
 
-            micx =  sdx*cell[0,0] + sdy*cell[0,1] + sdz*cell[0,2]
-            micy =  sdx*cell[1,0] + sdy*cell[1,1] + sdz*cell[1,2]
-            micz =  sdx*cell[2,0] + sdy*cell[2,1] + sdz*cell[2,2]
+                micx =  sdx*cell[0,0] + sdy*cell[0,1] + sdz*cell[0,2]
+                micy =  sdx*cell[1,0] + sdy*cell[1,1] + sdz*cell[1,2]
+                micz =  sdx*cell[2,0] + sdy*cell[2,1] + sdz*cell[2,2]
             
-            orthx = <float> (invBasis[0,0]*micx + invBasis[0,1]*micy  + invBasis[0,2]*micz) 
-            orthy = <float> (invBasis[1,0]*micx + invBasis[1,1]*micy  + invBasis[1,2]*micz)
-            orthz = <float> (invBasis[2,0]*micx + invBasis[2,1]*micy  + invBasis[2,2]*micz)
+                orthx = <float> (invBasis[0,0]*micx + invBasis[0,1]*micy  + invBasis[0,2]*micz) 
+                orthy = <float> (invBasis[1,0]*micx + invBasis[1,1]*micy  + invBasis[1,2]*micz)
+                orthz = <float> (invBasis[2,0]*micx + invBasis[2,1]*micy  + invBasis[2,2]*micz)
             
-            x = (orthx-minix)/resolution
-            y = (orthy-miniy)/resolution
-            z = (orthz-miniz)/resolution
+                x = (orthx-minix)/resolution
+                y = (orthy-miniy)/resolution
+                z = (orthz-miniz)/resolution
             
-            xind = <int> x
-            yind = <int> y
-            zind = <int> z
+                xind = <int> x
+                yind = <int> y
+                zind = <int> z
 
-            hist[xind,yind,zind] += 1
+                # The points falling out of the grid are skipped.
+                if xind < 0 or xind >= nx or yind < 0 or yind >= ny or zind < 0 or zind >= nz:
+                    continue
+
+                hist[xind,yind,zind] += 1
 
     return hist
-        
-        
-        
-        
-        
\ No newline at end of file
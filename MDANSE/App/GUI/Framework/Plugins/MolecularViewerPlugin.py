@@ -43,7 +43,7 @@ from MMTK.Trajectory import Trajectory
 from MDANSE import ELEMENTS, LOGGER
 from MDANSE.Core.Error import Error
 from MDANSE.Externals.pubsub import pub
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import ensure_connectivity, read_frame, sorted_atoms
 
 from MDANSE.App.GUI.Framework.Plugins.ComponentPlugin import ComponentPlugin
 
@@ -254,6 +254,9 @@ class MolecularViewerPanel(ComponentPlugin):
         
         self._nFrames = len(trajectory)
 
+        # The bonds are drawn.
+        ensure_connectivity(trajectory.universe)
+
         self._atoms = sorted_atoms(trajectory.universe)
         
         # The number of atoms of the universe stored by the trajectory.
@@ -947,7 +950,7 @@ class MolecularViewerPanel(ComponentPlugin):
         '''
         
         self._currentFrame = frame % len(self._trajectory)
-        self._trajectory.universe.setConfiguration(self._trajectory.configuration[self._currentFrame])
+        read_frame(self._trajectory, self._currentFrame)
         self.coords = self._trajectory.universe.contiguousObjectConfiguration().array
                         
         # Reset the view.                        
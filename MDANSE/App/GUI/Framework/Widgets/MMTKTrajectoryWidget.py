@@ -36,6 +36,10 @@ from MMTK.Trajectory import Trajectory
 
 from MDANSE.Externals.pubsub import pub
 from MDANSE.Framework.Configurable import ConfigurationError
+from MDANSE.MolecularDynamics.CompressedTrajectory import CompressedTrajectory
+from MDANSE.MolecularDynamics.DCDTrajectory import DCDTrajectory
+from MDANSE.MolecularDynamics.MemoryMappedTrajectory import MemoryMappedTrajectory
+from MDANSE.MolecularDynamics.VirtualTrajectory import VirtualTrajectory
 
 from MDANSE.App.GUI import DATA_CONTROLLER
 from MDANSE.App.GUI.Framework.Widgets.IWidget import IWidget
@@ -76,7 +80,7 @@ class MMTKTrajectoryWidget(IWidget):
                 
         data = DATA_CONTROLLER[filename].data
         
-        if not isinstance(data, Trajectory):
+        if not isinstance(data, (Trajectory,CompressedTrajectory,DCDTrajectory,MemoryMappedTrajectory,VirtualTrajectory)):
             return
 
         self._trajectory.SetItems(DATA_CONTROLLER.keys())
@@ -56,6 +56,7 @@ class RunningModeWidget(IWidget):
         self._radiobuttons = []
         self._radiobuttons.append(wx.RadioButton(panel, wx.ID_ANY, label="monoprocessor", style=wx.RB_GROUP, name="monoprocessor"))
         self._radiobuttons.append(wx.RadioButton(panel, wx.ID_ANY, label="multiprocessor", name="multiprocessor"))
+        self._radiobuttons.append(wx.RadioButton(panel, wx.ID_ANY, label="multithread", name="multithread"))
         self._radiobuttons[0].SetValue(True)
         
         self._processors = wx.SpinCtrl(panel, wx.ID_ANY, initial=1, min=1, max=multiprocessing.cpu_count(), style=wx.SP_WRAP|wx.SP_ARROW_KEYS)
@@ -63,7 +64,8 @@ class RunningModeWidget(IWidget):
 
         gbSizer.Add(self._radiobuttons[0], (0,0), flag=wx.ALIGN_CENTER_VERTICAL)
         gbSizer.Add(self._radiobuttons[1], (1,0), flag=wx.ALIGN_CENTER_VERTICAL)
-        gbSizer.Add(self._processors, (1,1))
+        gbSizer.Add(self._processors, (1,1), span=(2,1), flag=wx.ALIGN_CENTER_VERTICAL)
+        gbSizer.Add(self._radiobuttons[2], (2,0), flag=wx.ALIGN_CENTER_VERTICAL)
 
         panel.SetSizer(gbSizer)
                     
@@ -82,8 +84,8 @@ class RunningModeWidget(IWidget):
         if name == "monoprocessor":
             value = ("monoprocessor",)
 
-        elif name == "multiprocessor":
-            value = ("multiprocessor", self._processors.GetValue())
+        else:
+            value = (name, self._processors.GetValue())
                                 
         return value
 
@@ -98,4 +100,4 @@ class RunningModeWidget(IWidget):
         
         name = btn.GetName()
         
-        self._processors.Enable(name=="multiprocessor")
\ No newline at end of file
+        self._processors.Enable(name in ["multiprocessor","multithread"])
\ No newline at end of file
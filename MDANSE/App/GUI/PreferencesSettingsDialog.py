@@ -108,6 +108,57 @@ class LoggingLevelWidget(PreferencesItemWidget):
         
         return self._widget.SetStringSelection(value)
                         
+class IntegerWidget(PreferencesItemWidget):
+    
+    type = "integer"
+
+    def build_panel(self):
+
+        sb = wx.StaticBox(self, wx.ID_ANY, label=self._item.name)
+
+        mini = self._item.mini if self._item.mini is not None else 0
+        
+        self._widget = wx.SpinCtrl(self, wx.ID_ANY, min=mini, max=2**31-1, initial=self._item.value, style=wx.SP_ARROW_KEYS)
+
+        sizer = wx.StaticBoxSizer(sb, wx.HORIZONTAL)
+
+        sizer.Add(self._widget, 1, wx.ALL|wx.EXPAND, 5)
+                
+        self.SetSizer(sizer)
+
+    def get_value(self):
+        
+        return self._widget.GetValue()
+
+    def set_value(self, value):
+        
+        self._widget.SetValue(value)
+
+class SingleChoiceWidget(PreferencesItemWidget):
+    
+    type = "single_choice"
+
+    def build_panel(self):
+
+        sb = wx.StaticBox(self, wx.ID_ANY, label=self._item.name)
+
+        self._widget = wx.Choice(self, wx.ID_ANY, choices=self._item.choices)
+        self._widget.SetStringSelection(self._item.value)
+
+        sizer = wx.StaticBoxSizer(sb, wx.HORIZONTAL)
+
+        sizer.Add(self._widget, 1, wx.ALL|wx.EXPAND, 5)
+                
+        self.SetSizer(sizer)
+
+    def get_value(self):
+        
+        return self._widget.GetStringSelection()
+
+    def set_value(self, value):
+        
+        self._widget.SetStringSelection(value)
+                        
 WIDGETS = dict([(v.type,v) for v in PreferencesItemWidget.__subclasses__()])    
 
 class PreferencesSettingsDialog(wx.Dialog):
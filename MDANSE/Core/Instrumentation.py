@@ -0,0 +1,290 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Instrumentation of the jobs
+
+When enabled, the instrumentation records the wall and CPU time spent in each step of a job together with
+the worker that ran it and the time spent in some named sections of the code (trajectory reading, combine,
+finalize ...). The events recorded by the workers are sent back to the master with the results of their steps.
+The events can be exported as a JSON trace readable by the Chrome trace viewer (chrome://tracing) or Perfetto
+and summarized as a table.
+
+When disabled, the instrumented code only pays for a test on a boolean.
+
+The events are recorded per thread so that the threads of a thread pool record their events independently.
+'''
+
+import collections
+import contextlib
+import json
+import os
+import socket
+import threading
+import time
+
+from MDANSE.Core.Singleton import Singleton
+
+def cpu_time():
+    '''
+    Returns the CPU time (user + system) spent by the current process. When several threads run steps, this
+    includes the CPU time of all of them.
+
+    :return: the CPU time in seconds
+    :rtype: float
+    '''
+
+    t = os.times()
+
+    return t[0] + t[1]
+
+class _ThreadState(threading.local):
+    '''
+    The recording state of a thread.
+    '''
+
+    def __init__(self):
+
+        self.worker = threading.current_thread().name
+
+        self.events = []
+
+        self.sections = None
+
+class Instrumentation(object):
+    '''
+    Records the timing events of the running job.
+
+    An event is a tuple (name, step index, worker, start time, wall time, CPU time, sections) where sections is
+    a dictionary of the time spent in each named section during the event. The step index, CPU time and sections are
+    only set for the step events.
+    '''
+
+    __metaclass__ = Singleton
+
+    def __init__(self):
+
+        self.enabled = False
+
+        self._state = _ThreadState()
+
+    @property
+    def worker(self):
+        '''
+        Returns the name of the worker in which the events of the current thread are recorded.
+
+        :return: the name of the worker
+        :rtype: str
+        '''
+
+        return self._state.worker
+
+    def set_worker(self, name=None):
+        '''
+        Sets the name of the worker in which the events of the current thread are recorded.
+
+        :param name: the name of the worker. If None, it is built from the host name and the process id.
+        :type name: str
+        '''
+
+        if name is None:
+            name = "%s:%d" % (socket.gethostname(),os.getpid())
+
+        self._state.worker = name
+
+    def enable(self):
+        '''
+        Enables the instrumentation and clears the events recorded so far by the current thread.
+        '''
+
+        self.enabled = True
+
+        self._state.events = []
+
+    def disable(self):
+        '''
+        Disables the instrumentation.
+        '''
+
+        self.enabled = False
+
+        self._state.sections = None
+
+    def pop_events(self):
+        '''
+        Returns the events recorded so far by the current thread and forget them.
+
+        :return: the events or None if the instrumentation is disabled
+        :rtype: list
+        '''
+
+        if not self.enabled:
+            return None
+
+        events = self._state.events
+        self._state.events = []
+
+        return events
+
+    def add_events(self, events):
+        '''
+        Adds events recorded elsewhere, typically by a worker, to those of the current thread.
+
+        :param events: the events
+        :type events: list
+        '''
+
+        if self.enabled and events:
+            self._state.events.extend(events)
+
+    def run_step(self, job, index):
+        '''
+        Runs a step of a job and records its timing.
+
+        :param job: the job
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        :param index: the index of the step
+        :type index: int
+
+        :return: the return value of the run_step method of the job
+        :rtype: 2-tuple
+        '''
+
+        if not self.enabled:
+            return job.run_step(index)
+
+        state = self._state
+
+        state.sections = collections.defaultdict(float)
+
+        start = time.time()
+        cpuStart = cpu_time()
+
+        try:
+            return job.run_step(index)
+        finally:
+            state.events.append(("step", index, state.worker, start, time.time() - start, cpu_time() - cpuStart, dict(state.sections)))
+            state.sections = None
+
+    @contextlib.contextmanager
+    def section(self, name):
+        '''
+        Context manager that records the time spent in a named section of the code. Within a step, the time is
+        accumulated in the step event, otherwise an event is recorded for the section.
+
+        :param name: the name of the section
+        :type name: str
+        '''
+
+        if not self.enabled:
+            yield
+            return
+
+        start = time.time()
+
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            state = self._state
+            if state.sections is not None:
+                state.sections[name] += duration
+            else:
+                state.events.append((name, None, state.worker, start, duration, None, None))
+
+    def write_trace(self, filename):
+        '''
+        Writes the events recorded by the current thread in the Chrome trace event format.
+
+        :param filename: the name of the trace file
+        :type filename: str
+        '''
+
+        events = self._state.events
+
+        if not events:
+            return
+
+        origin = min([e[3] for e in events])
+
+        workers = sorted(set([e[2] for e in events]))
+        tids = dict([(w,i) for i, w in enumerate(workers)])
+
+        traceEvents = [{"name" : "thread_name", "ph" : "M", "pid" : 1, "tid" : tids[w], "args" : {"name" : w}} for w in workers]
+
+        for name, index, worker, start, wall, cpu, sections in events:
+            event = {"name" : name, "cat" : name, "ph" : "X", "pid" : 1, "tid" : tids[worker],
+                     "ts" : 1.0e6*(start - origin), "dur" : 1.0e6*wall}
+            if index is not None:
+                event["name"] = "step %d" % index
+                event["args"] = {"index" : index, "cpu (s)" : cpu}
+                for k, v in sections.items():
+                    event["args"]["%s (s)" % k] = v
+            traceEvents.append(event)
+
+        with open(filename, 'w') as f:
+            json.dump({"traceEvents" : traceEvents, "displayTimeUnit" : "ms"}, f)
+
+    def summary(self):
+        '''
+        Returns a table summarizing the events recorded so far by the current thread.
+
+        :return: the summary table
+        :rtype: str
+        '''
+
+        durations = collections.OrderedDict()
+        durations["step (wall)"] = []
+        durations["step (cpu)"] = []
+
+        busy = collections.defaultdict(float)
+        nSteps = collections.defaultdict(int)
+
+        for name, index, worker, start, wall, cpu, sections in self._state.events:
+            if index is not None:
+                durations["step (wall)"].append(wall)
+                durations["step (cpu)"].append(cpu)
+                for k, v in sections.items():
+                    durations.setdefault("step (%s)" % k,[]).append(v)
+                busy[worker] += wall
+                nSteps[worker] += 1
+            else:
+                durations.setdefault(name,[]).append(wall)
+
+        lines = ["%-20s %10s %12s %12s %12s" % ("Phase","Count","Total (s)","Mean (ms)","Max (ms)")]
+        for name, values in durations.items():
+            if not values:
+                continue
+            lines.append("%-20s %10d %12.3f %12.3f %12.3f" % (name,len(values),sum(values),1.0e3*sum(values)/len(values),1.0e3*max(values)))
+
+        lines.append("")
+        lines.append("%-30s %10s %12s" % ("Worker","Steps","Busy (s)"))
+        for worker in sorted(busy):
+            lines.append("%-30s %10d %12.3f" % (worker,nSteps[worker],busy[worker]))
+
+        return "\n".join(lines)
+
+INSTRUMENTATION = Instrumentation()
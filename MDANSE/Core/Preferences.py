@@ -206,6 +206,109 @@ class InputDirectory(PreferencesItem):
         
         self._value = value
 
+class Integer(PreferencesItem):
+    '''
+    This class implements a preferences item that handles an integer, optionally bounded by a minimum value.
+    '''
+    
+    type = "integer"
+
+    def __init__(self, name, section, default, mini=None, *args, **kwargs):
+        '''
+        Constructs an integer preferences item.
+        
+        :param name: the name of the preference item
+        :type name: str 
+        :param section: the section of the preferences item
+        :type section: str
+        :param default: the default value for the preferences item
+        :type default: int
+        :param mini: if not None, the minimum value allowed for the preferences item
+        :type mini: int
+        '''
+        
+        PreferencesItem.__init__(self, name, section, default, *args, **kwargs)
+        
+        self._mini = mini
+
+    @property
+    def mini(self):
+        '''
+        Returns the minimum value allowed for the preferences item, None if not bounded.
+        
+        :return: the minimum value allowed for the preferences item
+        :rtype: int
+        '''
+        
+        return self._mini
+
+    def set_value(self, value):
+        '''
+        Set the value of the integer preferences item.
+        
+        :param value: the integer
+        :type value: int or str
+        '''
+        
+        try:
+            value = int(value)
+        except (TypeError,ValueError):
+            raise PreferencesError("Invalid value for %r preferences item: %r" % (self._name,value))
+        
+        if self._mini is not None and value < self._mini:
+            raise PreferencesError("The value of %r preferences item must be greater or equal than %d" % (self._name,self._mini))
+        
+        self._value = value
+
+class SingleChoice(PreferencesItem):
+    '''
+    This class implements a preferences item whose value is picked from a list of choices.
+    '''
+    
+    type = "single_choice"
+
+    def __init__(self, name, section, default, choices, *args, **kwargs):
+        '''
+        Constructs a single choice preferences item.
+        
+        :param name: the name of the preference item
+        :type name: str 
+        :param section: the section of the preferences item
+        :type section: str
+        :param default: the default value for the preferences item
+        :type default: str
+        :param choices: the allowed values for the preferences item
+        :type choices: list of str
+        '''
+        
+        self._choices = list(choices)
+
+        PreferencesItem.__init__(self, name, section, default, *args, **kwargs)
+        
+    @property
+    def choices(self):
+        '''
+        Returns the allowed values for the preferences item.
+        
+        :return: the allowed values for the preferences item
+        :rtype: list of str
+        '''
+        
+        return self._choices
+
+    def set_value(self, value):
+        '''
+        Set the value of the single choice preferences item.
+        
+        :param value: the choice
+        :type value: str
+        '''
+        
+        if not value in self._choices:
+            raise PreferencesError("Invalid value for %r preferences item: %r" % (self._name,value))
+        
+        self._value = value
+
 class LoggingLevel(PreferencesItem):
     
     type = "logging_level"
@@ -243,6 +346,19 @@ class Preferences(object):
         self._items = collections.OrderedDict()
         self._items["working_directory"] = InputDirectory("working_directory", "paths", PLATFORM.home_directory()) 
         self._items["macros_directory"] = InputDirectory("macros_directory", "paths", os.path.join(PLATFORM.home_directory(), "mdanse_macros")) 
+        # The maximum memory (in MB) held by the results of the tasks in flight when running a job in parallel.
+        self._items["results_memory_budget"] = Integer("results_memory_budget", "parallel", 1024, mini=1)
+        # The interval (in seconds) between two checkpoints of a running job. If 0, no checkpoint is written.
+        self._items["checkpoint_interval"] = Integer("checkpoint_interval", "jobs", 600, mini=0)
+        # The maximum memory (in MB) held by the cache of the frames read from the trajectories. If 0, the frames are not cached.
+        # The cache is opt-in: it only pays off when the same frames are read several times.
+        self._items["frame_cache_memory"] = Integer("frame_cache_memory", "trajectories", 0, mini=0)
+        # The number of frames read ahead by a background thread when running a frame-based job. If 0, the frames are not read ahead.
+        self._items["prefetch_depth"] = Integer("prefetch_depth", "trajectories", 4, mini=0)
+        # The type of the values stored in the atom-major caches of the trajectories. If 'none', no cache is used.
+        self._items["trajectory_cache"] = SingleChoice("trajectory_cache", "trajectories", "none", ["none","float32","float64"])
+        # When the bonds of the trajectories are computed: at opening ('eager') or once a selection or a job needs them ('lazy').
+        self._items["connectivity"] = SingleChoice("connectivity", "trajectories", "eager", ["eager","lazy"])
                                 
         self._parser = ConfigParser.ConfigParser()
 
@@ -0,0 +1,716 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Multi-node master-slave model based on TCP sockets
+
+The master listens on a TCP address to which the workers connect. Once connected, a worker registers
+itself and receives the type and the input parameters of the job from which it builds its own copy of
+the job, opening the trajectory by itself. The master then sends it the chunks of step indexes to run one
+at a time.
+
+The messages are pickled python objects framed by their length. While running a chunk, a worker sends
+heartbeats from a background thread. A worker holds a lease on its current chunk as long as its heartbeats
+keep coming. A worker whose connection is lost or which stays silent for longer than the heartbeat timeout
+is dropped, and its chunk is sent again to another worker. The master raises an error instead of waiting
+forever when no worker has been connected for longer than the registration timeout.
+
+A worker is started on a node with:
+
+    python -m MDANSE.DistributedComputing.Cluster host:port
+
+The master can also spawn its workers on the local host, which is useful for testing the remote mode
+without a cluster.
+
+Trust model: unpickling a message may run arbitrary code, hence no message is unpickled before its sender
+has been authenticated. The master and the workers share a secret key, read from the MDANSE_CLUSTER_KEY
+environment variable or, for the workers spawned on the local host, generated by the master. Each connection
+starts with a mutual challenge-response on that key from which a session key is derived, and every message
+then carries an HMAC of its contents and of its position in the stream computed with the session key. A peer
+that does not know the key is disconnected before any of its data is unpickled, and a worker never unpickles
+what comes from a master that could not prove it knows the key. The messages are not encrypted: anyone who
+can watch the network can read the parameters of the job and its results. Without an explicit address, the
+master only listens on the local host.
+'''
+
+import collections
+import cPickle
+import hashlib
+import hmac
+import os
+import select
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from MDANSE.Core.Error import Error
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
+from MDANSE.DistributedComputing.Scheduling import build_job, job_bootstrap, run_steps
+
+class ClusterError(Error):
+    pass
+
+class AuthenticationError(ClusterError):
+    pass
+
+# The tags of the messages exchanged between the master and the workers.
+REGISTER, JOB, TASK, RESULT, FAILED, HEARTBEAT, STOP = range(7)
+
+# The header of a message: its length as an unsigned 64 bits integer in network byte order.
+_HEADER = struct.Struct('!Q')
+
+# The environment variable holding the secret key shared by the master and the workers.
+AUTHKEY_VARIABLE = 'MDANSE_CLUSTER_KEY'
+
+# The size (in bytes) of the challenges exchanged when a connection is opened.
+_NONCE_SIZE = 32
+
+# The size (in bytes) of the HMAC of a message.
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+def get_authkey(authkey=None):
+    '''
+    Returns the secret key shared by the master and the workers.
+
+    :param authkey: the key. If None, it is read from the MDANSE_CLUSTER_KEY environment variable.
+    :type authkey: str
+
+    :return: the key
+    :rtype: str
+
+    :raise ClusterError: if no key is given and the environment variable is not set
+    '''
+
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_VARIABLE)
+
+    if not authkey:
+        raise ClusterError("No secret key for authenticating the connections: set the %s environment variable." % AUTHKEY_VARIABLE)
+
+    return authkey
+
+def _digest(key, *parts):
+
+    return hmac.new(key, ''.join(parts), hashlib.sha256).digest()
+
+def _receive_exactly(sock, size):
+
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size,1024*1024))
+        if not chunk:
+            raise EOFError("Connection closed by peer.")
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return ''.join(chunks)
+
+class Channel(object):
+    '''
+    An authenticated connection between the master and a worker.
+    '''
+
+    def __init__(self, sock, authkey, master):
+        '''
+        :param sock: the connected socket
+        :type sock: socket.socket
+        :param authkey: the secret key shared by the master and the workers
+        :type authkey: str
+        :param master: True for the master side of the connection, False for the worker side
+        :type master: bool
+        '''
+
+        self.sock = sock
+
+        self._authkey = authkey
+
+        self._role, self._peerRole = ('M','W') if master else ('W','M')
+
+        self._sessionKey = None
+
+        # The number of messages sent and received so far. A message replayed or dropped breaks its HMAC.
+        self._sent = 0
+        self._received = 0
+
+    def authenticate(self):
+        '''
+        Runs the mutual challenge-response opening the connection and derives the session key.
+
+        :raise AuthenticationError: if the peer does not know the secret key
+        '''
+
+        if self._role == 'M':
+            masterNonce = os.urandom(_NONCE_SIZE)
+            self.sock.sendall(masterNonce)
+            data = _receive_exactly(self.sock, _NONCE_SIZE + _DIGEST_SIZE)
+            workerNonce, digest = data[:_NONCE_SIZE], data[_NONCE_SIZE:]
+            if not hmac.compare_digest(digest, _digest(self._authkey, 'W', masterNonce, workerNonce)):
+                raise AuthenticationError("The worker failed to authenticate.")
+            self.sock.sendall(_digest(self._authkey, 'M', workerNonce, masterNonce))
+        else:
+            masterNonce = _receive_exactly(self.sock, _NONCE_SIZE)
+            workerNonce = os.urandom(_NONCE_SIZE)
+            self.sock.sendall(workerNonce + _digest(self._authkey, 'W', masterNonce, workerNonce))
+            digest = _receive_exactly(self.sock, _DIGEST_SIZE)
+            if not hmac.compare_digest(digest, _digest(self._authkey, 'M', workerNonce, masterNonce)):
+                raise AuthenticationError("The master failed to authenticate.")
+
+        self._sessionKey = _digest(self._authkey, masterNonce, workerNonce)
+
+    def send(self, message):
+        '''
+        Sends a message.
+
+        :param message: the message
+        :type message: any picklable python object
+        '''
+
+        data = cPickle.dumps(message, protocol=cPickle.HIGHEST_PROTOCOL)
+
+        digest = _digest(self._sessionKey, self._role, _HEADER.pack(self._sent), data)
+        self._sent += 1
+
+        self.sock.sendall(_HEADER.pack(len(data)) + digest)
+        self.sock.sendall(data)
+
+    def receive(self):
+        '''
+        Receives a message sent by the send method of the peer. The message is only unpickled once its HMAC has been checked.
+
+        :return: the message
+        :rtype: any picklable python object
+
+        :raise EOFError: if the connection has been closed by the peer
+        :raise AuthenticationError: if the HMAC of the message is invalid
+        '''
+
+        header = _receive_exactly(self.sock, _HEADER.size + _DIGEST_SIZE)
+
+        size, = _HEADER.unpack(header[:_HEADER.size])
+
+        data = _receive_exactly(self.sock, size)
+
+        if not hmac.compare_digest(header[_HEADER.size:], _digest(self._sessionKey, self._peerRole, _HEADER.pack(self._received), data)):
+            raise AuthenticationError("Invalid message authentication code.")
+        self._received += 1
+
+        return cPickle.loads(data)
+
+    def close(self):
+        '''
+        Closes the connection.
+        '''
+
+        self.sock.close()
+
+def parse_address(address):
+    '''
+    Parses a TCP address.
+
+    :param address: the address in the form "host:port"
+    :type address: str
+
+    :return: the host and the port
+    :rtype: 2-tuple
+    '''
+
+    try:
+        host, port = address.rsplit(':',1)
+        port = int(port)
+    except ValueError:
+        raise ClusterError("Invalid address %r: must be of the form host:port" % address)
+
+    return host, port
+
+class _Worker(object):
+    '''
+    The master side of the connection with a worker.
+    '''
+
+    def __init__(self, channel, address):
+
+        self.channel = channel
+        self.sock = channel.sock
+        self.address = address
+        self.name = "%s:%d" % address
+        self.registered = False
+        self.task = None
+        self.lastSeen = time.time()
+
+class ClusterMaster(object):
+    '''
+    Master process of a socket based master-slave setup.
+    '''
+
+    # The time (in seconds) after which a silent worker is considered dead.
+    heartbeatTimeout = 60.0
+
+    # The time (in seconds) after which the master gives up when no worker is connected.
+    registrationTimeout = 300.0
+
+    # The time (in seconds) left to a connecting peer for authenticating itself.
+    authenticationTimeout = 10.0
+
+    def __init__(self, job, nWorkers, address=None, heartbeatTimeout=None, registrationTimeout=None, authkey=None):
+        '''
+        :param job: the job whose steps will be run by the workers. It must have been initialized.
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        :param nWorkers: the number of workers expected or, for a local setup, the number of workers to spawn
+        :type nWorkers: int
+        :param address: the (host, port) address on which the master listens. If None, a free port of the local host is used.
+        :type address: 2-tuple
+        :param heartbeatTimeout: the heartbeat timeout (in seconds). If None the class default is used.
+        :type heartbeatTimeout: float
+        :param registrationTimeout: the registration timeout (in seconds). If None the class default is used.
+        :type registrationTimeout: float
+        :param authkey: the secret key shared with the workers. If None, it is read from the MDANSE_CLUSTER_KEY environment
+        variable or, if not set and the master listens on the local host, generated.
+        :type authkey: str
+        '''
+
+        if heartbeatTimeout is not None:
+            self.heartbeatTimeout = heartbeatTimeout
+
+        if registrationTimeout is not None:
+            self.registrationTimeout = registrationTimeout
+
+        self._bootstrap = job_bootstrap(job)
+
+        self._nWorkers = nWorkers
+
+        if address is None:
+            address = ('localhost',0)
+            if authkey is None and not os.environ.get(AUTHKEY_VARIABLE):
+                authkey = os.urandom(32).encode('hex')
+
+        self._authkey = get_authkey(authkey)
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(address)
+        self._server.listen(max(5,nWorkers))
+
+        self._workers = {}
+
+        # The connections authenticated by the handshake threads and not yet added to the workers (see _accept).
+        self._authenticated = collections.deque()
+        self._handshakeLock = threading.Lock()
+        self._closed = False
+
+        # The chunks waiting for a worker and the chunks not completed yet, indexed by a task id.
+        self._queue = collections.deque()
+        self._tasks = {}
+        self._nextTaskId = 0
+
+        self._results = collections.deque()
+
+        self._processes = []
+
+        self._lonelySince = time.time()
+
+    @property
+    def address(self):
+        '''
+        Returns the address on which the master listens.
+
+        :return: the (host, port) address of the master
+        :rtype: 2-tuple
+        '''
+
+        return self._server.getsockname()
+
+    @property
+    def authkey(self):
+        '''
+        Returns the secret key shared with the workers.
+
+        :return: the secret key
+        :rtype: str
+        '''
+
+        return self._authkey
+
+    @property
+    def nWorkers(self):
+        '''
+        Returns the number of workers expected.
+
+        :return: the number of workers
+        :rtype: int
+        '''
+
+        return self._nWorkers
+
+    def start(self, local=False):
+        '''
+        Starts the master.
+
+        :param local: if True, the workers are spawned on the local host
+        :type local: bool
+        '''
+
+        if local:
+            address = "%s:%d" % self.address
+            env = dict(os.environ)
+            env[AUTHKEY_VARIABLE] = self._authkey
+            for _ in range(self._nWorkers):
+                self._processes.append(subprocess.Popen([sys.executable, '-m', 'MDANSE.DistributedComputing.Cluster', address], env=env))
+
+        self._lonelySince = time.time()
+
+    def requestTask(self, indexes):
+        '''
+        Requests the run of a chunk of steps.
+
+        :param indexes: the indexes of the steps
+        :type indexes: list of int
+        '''
+
+        taskId = self._nextTaskId
+        self._nextTaskId += 1
+
+        self._tasks[taskId] = indexes
+        self._queue.append(taskId)
+
+        self._dispatch()
+
+    def retrieveResult(self):
+        '''
+        Retrieves the result of a chunk of steps in the order of completion.
+
+        :return: the result of the chunk as returned by MDANSE.DistributedComputing.Scheduling.run_steps
+        :rtype: 3-tuple
+        '''
+
+        while not self._results:
+            self._poll()
+
+        return self._results.popleft()
+
+    def shutdown(self):
+        '''
+        Stops the workers and closes the connections.
+        '''
+
+        with self._handshakeLock:
+            self._closed = True
+            while self._authenticated:
+                channel, _ = self._authenticated.popleft()
+                channel.close()
+
+        for w in self._workers.values():
+            try:
+                w.channel.send((STOP,))
+            except socket.error:
+                pass
+            w.channel.close()
+        self._workers.clear()
+
+        self._server.close()
+
+        # Leave some time to the local workers to exit by themselves.
+        deadline = time.time() + 10.0
+        for p in self._processes:
+            while p.poll() is None and time.time() < deadline:
+                time.sleep(0.1)
+            if p.poll() is None:
+                p.terminate()
+                p.wait()
+        self._processes = []
+
+    def _poll(self, timeout=1.0):
+
+        while self._authenticated:
+            channel, address = self._authenticated.popleft()
+            self._workers[channel.sock] = _Worker(channel, address)
+
+        sockets = [self._server] + self._workers.keys()
+
+        readable, _, _ = select.select(sockets, [], [], timeout)
+
+        for sock in readable:
+            if sock is self._server:
+                self._accept()
+            elif sock in self._workers:
+                self._receive(self._workers[sock])
+
+        self._check_workers()
+
+        self._dispatch()
+
+    def _accept(self):
+
+        sock, address = self._server.accept()
+
+        # The handshake runs on its own thread such as a slow or silent peer does not block the other workers.
+        handshake = threading.Thread(target=self._handshake, args=(sock, address))
+        handshake.daemon = True
+        handshake.start()
+
+    def _handshake(self, sock, address):
+
+        from MDANSE import LOGGER
+
+        channel = Channel(sock, self._authkey, True)
+
+        # Nothing is unpickled from a peer that does not know the secret key.
+        sock.settimeout(self.authenticationTimeout)
+        try:
+            channel.authenticate()
+        except (AuthenticationError, EOFError, socket.error) as e:
+            sock.close()
+            LOGGER("Connection from %s:%d refused: %s" % (address[0],address[1],e), "warning")
+            return
+
+        # A worker blocked in the middle of a message must not block the master forever.
+        sock.settimeout(self.heartbeatTimeout)
+
+        # The connection becomes a worker at the next poll of the master.
+        with self._handshakeLock:
+            if self._closed:
+                sock.close()
+            else:
+                self._authenticated.append((channel, address))
+
+    def _receive(self, worker):
+
+        try:
+            message = worker.channel.receive()
+        except (EOFError, socket.error, cPickle.UnpicklingError, AuthenticationError) as e:
+            self._drop(worker, "connection lost (%s)" % e)
+            return
+
+        worker.lastSeen = time.time()
+
+        tag = message[0]
+
+        if tag == REGISTER:
+            worker.name = message[1]
+            try:
+                worker.channel.send((JOB, self._bootstrap, INSTRUMENTATION.enabled))
+            except socket.error as e:
+                self._drop(worker, "connection lost (%s)" % e)
+                return
+            worker.registered = True
+
+        elif tag == RESULT:
+            taskId, result = message[1:]
+            worker.task = None
+            # A chunk could have been completed twice if it has been sent again while its first worker was still alive.
+            if self._tasks.pop(taskId, None) is not None:
+                self._results.append(result)
+
+        elif tag == FAILED:
+            taskId, error = message[1:]
+            if taskId is None:
+                raise ClusterError("Worker %s could not build the job:\n%s" % (worker.name, error))
+            raise ClusterError("Steps %s failed on worker %s:\n%s" % (self._tasks.get(taskId), worker.name, error))
+
+    def _drop(self, worker, reason):
+
+        from MDANSE import LOGGER
+
+        worker.sock.close()
+
+        del self._workers[worker.sock]
+
+        LOGGER("Worker %s dropped: %s" % (worker.name,reason), "warning")
+
+        # The chunk leased by the worker is sent again first.
+        if worker.task is not None and worker.task in self._tasks:
+            self._queue.appendleft(worker.task)
+
+    def _check_workers(self):
+
+        now = time.time()
+
+        for w in self._workers.values():
+            if now - w.lastSeen > self.heartbeatTimeout:
+                self._drop(w, "no heartbeat for %d seconds" % (now - w.lastSeen))
+
+        if self._workers:
+            self._lonelySince = now
+            return
+
+        if self._processes and all([p.poll() is not None for p in self._processes]):
+            raise ClusterError("All the local workers have exited.")
+
+        if now - self._lonelySince > self.registrationTimeout:
+            raise ClusterError("No worker connected to %s:%d for %d seconds." % (self.address + (self.registrationTimeout,)))
+
+    def _dispatch(self):
+
+        for w in self._workers.values():
+
+            if not self._queue:
+                break
+
+            if not w.registered or w.task is not None:
+                continue
+
+            taskId = self._queue.popleft()
+
+            try:
+                w.channel.send((TASK, taskId, self._tasks[taskId]))
+            except socket.error as e:
+                self._queue.appendleft(taskId)
+                self._drop(w, "connection lost (%s)" % e)
+                continue
+
+            # The lease on the chunk lasts as long as the worker keeps sending heartbeats.
+            w.task = taskId
+            w.lastSeen = time.time()
+
+class ClusterSlave(object):
+    '''
+    A worker process that connects to a master and runs the chunks of steps it receives.
+    '''
+
+    # The interval (in seconds) between two heartbeats.
+    heartbeatInterval = 5.0
+
+    # The time (in seconds) left to the master for authenticating itself and sending the job.
+    authenticationTimeout = 10.0
+
+    def __init__(self, address, heartbeatInterval=None, authkey=None):
+        '''
+        :param address: the (host, port) address of the master
+        :type address: 2-tuple
+        :param heartbeatInterval: the heartbeat interval (in seconds). If None the class default is used.
+        :type heartbeatInterval: float
+        :param authkey: the secret key shared with the master. If None, it is read from the MDANSE_CLUSTER_KEY environment variable.
+        :type authkey: str
+        '''
+
+        if heartbeatInterval is not None:
+            self.heartbeatInterval = heartbeatInterval
+
+        self._address = address
+
+        self._authkey = get_authkey(authkey)
+
+        self._lock = threading.Lock()
+
+    def _send(self, channel, message):
+
+        with self._lock:
+            channel.send(message)
+
+    def _heartbeat(self, channel, stop):
+
+        while not stop.wait(self.heartbeatInterval):
+            try:
+                self._send(channel, (HEARTBEAT,))
+            except socket.error:
+                break
+
+    def run(self):
+        '''
+        Runs the worker until the master stops it or closes the connection.
+        '''
+
+        sock = socket.create_connection(self._address)
+
+        channel = Channel(sock, self._authkey, False)
+
+        stop = threading.Event()
+
+        heartbeat = threading.Thread(target=self._heartbeat, args=(channel, stop))
+        heartbeat.daemon = True
+
+        try:
+            # A peer that does not answer the handshake must not block the worker forever.
+            sock.settimeout(self.authenticationTimeout)
+            try:
+                channel.authenticate()
+
+                self._send(channel, (REGISTER, "%s:%d" % (socket.gethostname(),os.getpid())))
+
+                _, bootstrap, instrumented = channel.receive()
+            except socket.timeout:
+                raise ClusterError("The master %s:%d did not authenticate itself within %d seconds." % (self._address + (self.authenticationTimeout,)))
+            
+            # The master may then stay silent for long, e.g. while the other workers run the last chunks.
+            sock.settimeout(None)
+
+            if instrumented:
+                INSTRUMENTATION.enable()
+                INSTRUMENTATION.set_worker()
+
+            # Building the job opens the trajectory, which may take a while.
+            heartbeat.start()
+
+            try:
+                job = build_job(bootstrap)
+            except:
+                self._send(channel, (FAILED, None, "".join(traceback.format_exception(*sys.exc_info()))))
+                # Closing the connection while a chunk sent by the master is still unread would reset it and the failure
+                # could be lost. Wait for the master to stop the worker instead.
+                try:
+                    while channel.receive()[0] != STOP:
+                        pass
+                except (EOFError, socket.error):
+                    pass
+                return
+
+            while True:
+
+                try:
+                    message = channel.receive()
+                except EOFError:
+                    break
+
+                if message[0] == STOP:
+                    break
+
+                _, taskId, indexes = message
+
+                try:
+                    result = run_steps(job, indexes)
+                except:
+                    self._send(channel, (FAILED, taskId, "".join(traceback.format_exception(*sys.exc_info()))))
+                    break
+
+                self._send(channel, (RESULT, taskId, result))
+
+        finally:
+            stop.set()
+            if heartbeat.is_alive():
+                heartbeat.join()
+            sock.close()
+
+if __name__ == "__main__":
+
+    if len(sys.argv) != 2:
+        print "Usage: python -m MDANSE.DistributedComputing.Cluster host:port"
+        print "The secret key shared with the master is read from the %s environment variable." % AUTHKEY_VARIABLE
+        sys.exit(1)
+
+    ClusterSlave(parse_address(sys.argv[1])).run()
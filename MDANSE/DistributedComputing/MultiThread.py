@@ -0,0 +1,189 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Single node master-slave model based on a pool of threads
+
+The workers are threads of the master process running the steps of the job itself. Hence, neither the job nor its 
+trajectory and universe are duplicated and the results are combined without any copy. The reads of the shared 
+trajectory are serialized by a lock (see MDANSE.MolecularDynamics.Trajectory.read_lock) while the computational
+kernels of the jobs run in parallel as they release the GIL.
+
+Only the jobs flagged as thread safe can be run on a pool of threads.
+'''
+
+import Queue
+import sys
+import threading
+import traceback
+
+from MDANSE.Core.Error import Error
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
+from MDANSE.DistributedComputing.Scheduling import run_steps
+from MDANSE.MolecularDynamics.Trajectory import share_trajectory
+
+class MultiThreadError(Error):
+    pass
+
+class ThreadSlave(threading.Thread):
+    '''
+    A worker thread that runs chunks of steps of a job.
+    '''
+
+    def __init__(self, rank, job, tasks, results):
+        '''
+        :param rank: the rank of the worker
+        :type rank: int
+        :param job: the job
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        :param tasks: the queue from which the chunks of step indexes are fetched
+        :type tasks: Queue.Queue
+        :param results: the queue in which the results are sent
+        :type results: Queue.Queue
+        '''
+
+        threading.Thread.__init__(self, name="MDANSE thread %d" % rank)
+
+        self.daemon = True
+
+        self._rank = rank
+        self._job = job
+        self._tasks = tasks
+        self._results = results
+
+    def run(self):
+
+        INSTRUMENTATION.set_worker("thread %d" % self._rank)
+
+        while True:
+
+            indexes = self._tasks.get()
+            if indexes is None:
+                break
+
+            try:
+                result = run_steps(self._job, indexes)
+            except:
+                self._results.put((self._rank, indexes, False, "".join(traceback.format_exception(*sys.exc_info()))))
+                break
+
+            self._results.put((self._rank, indexes, True, result))
+
+class ThreadMaster(object):
+    '''
+    Master of a pool of worker threads.
+    '''
+
+    def __init__(self, job, nWorkers):
+        '''
+        :param job: the job whose steps will be run by the workers. It must have been initialized.
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        :param nWorkers: the number of workers
+        :type nWorkers: int
+        '''
+
+        self._job = job
+
+        self._tasks = Queue.Queue()
+        self._results = Queue.Queue()
+
+        self._workers = [ThreadSlave(rank, job, self._tasks, self._results) for rank in range(nWorkers)]
+
+    @property
+    def nWorkers(self):
+        '''
+        Returns the number of workers.
+
+        :return: the number of workers
+        :rtype: int
+        '''
+
+        return len(self._workers)
+
+    def _trajectory(self):
+
+        try:
+            return self._job.configuration['trajectory']['instance']
+        except KeyError:
+            return None
+
+    def start(self):
+        '''
+        Shares the trajectory of the job between the workers and starts them.
+        '''
+
+        trajectory = self._trajectory()
+        if trajectory is not None:
+            share_trajectory(trajectory)
+
+        for w in self._workers:
+            w.start()
+
+    def requestTask(self, indexes):
+        '''
+        Requests the run of a chunk of steps.
+
+        :param indexes: the indexes of the steps
+        :type indexes: list of int
+        '''
+
+        self._tasks.put(indexes)
+
+    def retrieveResult(self):
+        '''
+        Retrieves the result of a chunk of steps in the order of completion.
+
+        :return: the result of the chunk as returned by MDANSE.DistributedComputing.Scheduling.run_steps
+        :rtype: 3-tuple
+        '''
+
+        rank, indexes, status, value = self._results.get()
+
+        if not status:
+            raise MultiThreadError("Steps %s failed on thread %d:\n%s" % (indexes, rank, value))
+
+        return value
+
+    def shutdown(self):
+        '''
+        Stops the workers once they have completed their running chunk. The chunks not started yet are discarded.
+        '''
+
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except Queue.Empty:
+                break
+
+        for _ in self._workers:
+            self._tasks.put(None)
+
+        for w in self._workers:
+            w.join()
+
+        trajectory = self._trajectory()
+        if trajectory is not None:
+            share_trajectory(trajectory, False)
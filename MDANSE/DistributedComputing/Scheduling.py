@@ -0,0 +1,436 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Scheduling of the steps of a job over a set of workers
+
+Sending one task per step makes the dispatch overhead dominate for jobs made of many cheap steps. The
+steps are rather sent as chunks whose size is adapted from the measured duration of a step such as a
+chunk lasts about a given target duration. The chunk size is also bounded by a fraction of the remaining
+steps per worker so that the last chunks get smaller and the workers finish at about the same time.
+
+Jobs whose steps have heterogeneous costs can provide an estimate of those costs. The steps are then
+scheduled longest first so that the most expensive steps do not end up running alone at the end of the job.
+
+The number of chunks in flight is bounded by a window whose size is derived from a memory budget and from
+the measured size of the results of a step. No chunk is dispatched as long as the results in flight, together
+with the results combined but still held by the job, would exceed that budget, which prevents the results from
+piling up in the master when the workers outpace it.
+
+The workers do not receive the configured job but only its type and input parameters from which they build
+and initialize their own copy of the job, opening the trajectory by themselves.
+'''
+
+import time
+
+import numpy
+
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
+
+def nbytes(obj):
+    '''
+    Returns the number of bytes held by the numpy arrays found in a (possibly nested) python object.
+
+    :param obj: the object. Tuples, lists and dictionaries are walked recursively.
+    :type obj: any python object
+
+    :return: the number of bytes held by the numpy arrays of the object
+    :rtype: int
+    '''
+
+    if isinstance(obj, numpy.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, (tuple,list)):
+        return sum([nbytes(v) for v in obj])
+    elif isinstance(obj, dict):
+        return sum([nbytes(v) for v in obj.values()])
+    else:
+        return 0
+
+def copy_arrays(obj):
+    '''
+    Returns a copy of a (possibly nested) python object in which the numpy arrays are copied.
+
+    :param obj: the object. Tuples, lists and dictionaries are walked recursively.
+    :type obj: any python object
+
+    :return: the copied object
+    :rtype: any python object
+    '''
+
+    if isinstance(obj, numpy.ndarray):
+        return obj.copy()
+    elif isinstance(obj, (tuple,list)):
+        return type(obj)([copy_arrays(v) for v in obj])
+    elif isinstance(obj, dict):
+        copy = obj.__class__()
+        for k, v in obj.items():
+            copy[k] = copy_arrays(v)
+        return copy
+    else:
+        return obj
+
+def run_steps(job, indexes):
+    '''
+    Runs a chunk of steps of a job. The steps are first announced to the job through its prefetch_steps method, if any.
+
+    :param job: the job
+    :type job: MDANSE.Framework.Jobs.IJob.IJob
+    :param indexes: the indexes of the steps to run
+    :type indexes: list of int
+
+    :return: the list of the (index, result) 2-tuples returned by the run_step method of the job, the wall time spent
+    running the chunk and the instrumentation events recorded while running it (None if the instrumentation is disabled)
+    :rtype: 3-tuple
+    '''
+
+    start = time.time()
+
+    prefetch = getattr(job, 'prefetch_steps', None)
+    if prefetch is None:
+        results = [INSTRUMENTATION.run_step(job, index) for index in indexes]
+    else:
+        prefetch(indexes)
+        try:
+            results = [INSTRUMENTATION.run_step(job, index) for index in indexes]
+        finally:
+            # A chunk interrupted by an error must not leave its reading thread and file handle behind.
+            from MDANSE.MolecularDynamics.Trajectory import FramePrefetcher
+            FramePrefetcher.uninstall()
+
+    return results, time.time() - start, INSTRUMENTATION.pop_events()
+
+def job_bootstrap(job):
+    '''
+    Returns what a worker needs to build its own copy of a job.
+
+    The jobs providing a worker_state method are rebuilt by the workers from that state. The other ones are sent as they are.
+
+    :param job: the job
+    :type job: MDANSE.Framework.Jobs.IJob.IJob
+
+    :return: a 2-tuple whose 1st element tells whether the 2nd one is the state of the job or the job itself
+    :rtype: 2-tuple
+    '''
+
+    workerState = getattr(job, 'worker_state', None)
+    if workerState is None:
+        return (False, job)
+    else:
+        return (True, workerState())
+
+def build_job(bootstrap):
+    '''
+    Builds the copy of a job run by a worker.
+
+    :param bootstrap: what the worker needs to build the job as returned by job_bootstrap
+    :type bootstrap: 2-tuple
+
+    :return: the job
+    :rtype: MDANSE.Framework.Jobs.IJob.IJob
+    '''
+
+    isState, value = bootstrap
+    if not isState:
+        return value
+
+    from MDANSE.Framework.Jobs.IJob import IJob
+
+    return IJob.from_worker_state(value)
+
+class AdaptiveChunker(object):
+    '''
+    Splits the steps of a job into chunks whose size adapts to the measured duration of a step.
+
+    When the job provides an estimate of the cost of its steps, the steps are scheduled by decreasing cost
+    (longest first) and the chunks are built such as their cost rather than their number of steps matches the
+    target duration. The workers pull their chunks from a common queue so that the most expensive steps start
+    first and the cheapest ones fill the gaps at the end of the job.
+    '''
+
+    # The target duration (in seconds) of a chunk.
+    targetDuration = 1.0
+
+    def __init__(self, steps, nWorkers, targetDuration=None, costs=None):
+        '''
+        :param steps: the indexes of the steps to schedule
+        :type steps: list of int
+        :param nWorkers: the number of workers running the chunks
+        :type nWorkers: int
+        :param targetDuration: the target duration (in seconds) of a chunk. If None the class default is used.
+        :type targetDuration: float
+        :param costs: if not None, the estimated cost of each step, indexed by the step index. Only the ratios between the costs matter.
+        :type costs: sequence of float
+        '''
+
+        if targetDuration is not None:
+            self.targetDuration = targetDuration
+
+        self._steps = list(steps)
+
+        if costs is None:
+            self._costs = dict([(s,1.0) for s in self._steps])
+        else:
+            self._costs = dict([(s,max(0.0,float(costs[s]))) for s in self._steps])
+            # Longest first. The sort is stable so that the steps of equal cost remain in index order.
+            self._steps.sort(key=lambda s : self._costs[s], reverse=True)
+
+        self._nWorkers = max(1,nWorkers)
+
+        self._position = 0
+
+        self._remainingCost = sum(self._costs.values())
+
+        self._unitDuration = None
+
+    @property
+    def remaining(self):
+        '''
+        Returns the number of steps that have not been scheduled yet.
+
+        :return: the number of steps that have not been scheduled yet
+        :rtype: int
+        '''
+
+        return len(self._steps) - self._position
+
+    @property
+    def step_duration(self):
+        '''
+        Returns the current estimate of the duration of a step of unit cost, None if no chunk has been measured yet.
+
+        :return: the current estimate of the duration of a step
+        :rtype: float
+        '''
+
+        return self._unitDuration
+
+    def cost(self, indexes):
+        '''
+        Returns the estimated cost of a set of steps.
+
+        :param indexes: the indexes of the steps
+        :type indexes: list of int
+
+        :return: the estimated cost of the steps
+        :rtype: float
+        '''
+
+        return sum([self._costs[i] for i in indexes])
+
+    def chunk_size(self, maxSize=None):
+        '''
+        Returns the number of steps of the next chunk.
+
+        :param maxSize: if not None, the maximum number of steps of the chunk
+        :type maxSize: int
+
+        :return: the number of steps of the next chunk
+        :rtype: int
+        '''
+
+        # As long as no step has been measured, the steps are sent one by one.
+        if self._unitDuration is None:
+            return min(1,self.remaining)
+
+        targetCost = self.targetDuration/max(self._unitDuration,1.0e-9)
+
+        # Guided scheduling: never more than half of the remaining cost per worker.
+        targetCost = min(targetCost, self._remainingCost/(2*self._nWorkers))
+
+        if maxSize is None:
+            maxSize = self.remaining
+
+        size = 0
+        cost = 0.0
+        for s in self._steps[self._position:self._position+maxSize]:
+            cost += self._costs[s]
+            if size > 0 and cost > targetCost:
+                break
+            size += 1
+
+        return size
+
+    def next_chunk(self, maxSize=None):
+        '''
+        Returns the next chunk of steps to run.
+
+        :param maxSize: if not None, the maximum number of steps of the chunk
+        :type maxSize: int
+
+        :return: the indexes of the steps of the next chunk or None if all the steps have been scheduled
+        :rtype: list of int
+        '''
+
+        if self.remaining <= 0:
+            return None
+
+        if maxSize is not None:
+            maxSize = max(1,maxSize)
+
+        size = self.chunk_size(maxSize)
+
+        chunk = self._steps[self._position:self._position+size]
+
+        self._position += size
+
+        self._remainingCost -= self.cost(chunk)
+
+        return chunk
+
+    def update(self, indexes, duration):
+        '''
+        Updates the estimate of the duration of a step with the measured duration of a chunk.
+
+        :param indexes: the indexes of the steps of the chunk
+        :type indexes: list of int
+        :param duration: the duration (in seconds) of the chunk
+        :type duration: float
+        '''
+
+        cost = self.cost(indexes)
+        if cost <= 0:
+            return
+
+        unitDuration = duration/cost
+
+        if self._unitDuration is None:
+            self._unitDuration = unitDuration
+        else:
+            self._unitDuration = 0.5*(self._unitDuration + unitDuration)
+
+class ResultsWindow(object):
+    '''
+    Bounds the number of chunks in flight and the memory held by their results.
+    '''
+
+    def __init__(self, maxChunks, budget=None):
+        '''
+        :param maxChunks: the maximum number of chunks in flight
+        :type maxChunks: int
+        :param budget: the maximum memory (in bytes) held by the results of the chunks in flight. If None, the memory is not bounded.
+        :type budget: int
+        '''
+
+        self._maxChunks = max(1,maxChunks)
+
+        self._budget = budget
+
+        self._chunks = 0
+
+        self._steps = 0
+
+        self._stepSize = None
+
+        self._retained = 0
+
+    @property
+    def empty(self):
+        '''
+        Returns whether or not some chunks are in flight.
+
+        :return: True if no chunk is in flight
+        :rtype: bool
+        '''
+
+        return self._chunks == 0
+
+    def available_steps(self):
+        '''
+        Returns the number of steps that can still be dispatched without exceeding the memory budget.
+
+        :return: the number of steps that can be dispatched or None if not bounded
+        :rtype: int
+        '''
+
+        if self._budget is None or self._stepSize is None or self._stepSize == 0:
+            return None
+
+        available = int((self._budget - self._retained)/self._stepSize) - self._steps
+
+        # At least one step must be dispatched when nothing is in flight otherwise the job would never end.
+        if self._chunks == 0:
+            available = max(1,available)
+
+        return max(0,available)
+
+    def is_open(self):
+        '''
+        Returns whether or not a new chunk can be dispatched.
+
+        :return: True if a new chunk can be dispatched
+        :rtype: bool
+        '''
+
+        if self._chunks >= self._maxChunks:
+            return False
+
+        available = self.available_steps()
+
+        return available is None or available > 0
+
+    def retain(self, size):
+        '''
+        Records the memory held by the results already retrieved but still kept by the job. That memory is taken
+        from the budget of the results in flight.
+
+        :param size: the memory (in bytes) held by the kept results
+        :type size: int
+        '''
+
+        self._retained = size
+
+    def push(self, nSteps):
+        '''
+        Records the dispatch of a chunk.
+
+        :param nSteps: the number of steps of the chunk
+        :type nSteps: int
+        '''
+
+        self._chunks += 1
+        self._steps += nSteps
+
+    def pop(self, nSteps, size):
+        '''
+        Records the retrieval of the results of a chunk.
+
+        :param nSteps: the number of steps of the chunk
+        :type nSteps: int
+        :param size: the memory (in bytes) held by the results of the chunk
+        :type size: int
+        '''
+
+        self._chunks -= 1
+        self._steps -= nSteps
+
+        if nSteps <= 0:
+            return
+
+        # The largest size measured so far is kept to remain on the safe side.
+        stepSize = float(size)/nSteps
+        if self._stepSize is None or stepSize > self._stepSize:
+            self._stepSize = stepSize
@@ -0,0 +1,385 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Single node master-slave model based on the multiprocessing module
+
+The master process starts a set of worker processes that only receive the type and the input parameters of
+the job (see MDANSE.DistributedComputing.Scheduling.job_bootstrap). Each worker builds its own copy of the job,
+opening its own handle on the input trajectory, and then loops over the chunks of step indexes sent by the
+master through a task queue. Neither the opened trajectory nor the data derived from it are pickled.
+
+The numpy arrays found in the return values of a chunk are not pickled but copied into a shared memory
+buffer owned by the worker. Only a small skeleton describing where the arrays are stored in that buffer
+is sent back through the result queue. The master rebuilds the result as numpy views on the shared memory
+buffer which remain valid until the result has been combined. The buffer is then released and the worker
+can write its next result in it. Results that do not fit in the buffer are sent pickled through the queue.
+'''
+
+import ctypes
+import multiprocessing
+import Queue
+import sys
+import traceback
+
+import numpy
+
+from MDANSE.Core.Error import Error
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
+from MDANSE.DistributedComputing.Scheduling import build_job, job_bootstrap, run_steps
+
+class SharedMemoryError(Error):
+    pass
+
+class SharedArray(object):
+    '''
+    Placeholder for a numpy array stored in a shared memory buffer.
+    '''
+
+    __slots__ = ('offset','dtype','shape')
+
+    def __init__(self, offset, dtype, shape):
+
+        self.offset = offset
+        self.dtype = dtype
+        self.shape = shape
+
+    def __getstate__(self):
+        return (self.offset, self.dtype, self.shape)
+
+    def __setstate__(self, state):
+        self.offset, self.dtype, self.shape = state
+
+# The alignment (in bytes) of the arrays stored in the shared memory buffers.
+ALIGNMENT = 16
+
+# The status of a message sent by a worker to the master.
+SHARED, PICKLED, FAILED = range(3)
+
+def pack(obj, buffer, offset=0):
+    '''
+    Copies the numpy arrays found in a (possibly nested) python object into a shared memory buffer.
+
+    :param obj: the object to pack. Tuples, lists and dictionaries are walked recursively.
+    :type obj: any python object
+    :param buffer: the shared memory buffer
+    :type buffer: 1D numpy array of bytes
+    :param offset: the position in the buffer from which the arrays will be stored
+    :type offset: int
+
+    :return: the skeleton of the object where the numpy arrays have been replaced by SharedArray placeholders and the
+    position of the first free byte in the buffer
+    :rtype: 2-tuple
+
+    :raise SharedMemoryError: if the arrays do not fit in the buffer
+    '''
+
+    if isinstance(obj, numpy.ndarray):
+        if obj.dtype.hasobject or obj.size == 0:
+            return obj, offset
+        offset = (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        end = offset + obj.nbytes
+        if end > buffer.size:
+            raise SharedMemoryError("The result does not fit in the shared memory buffer.")
+        buffer[offset:end].view(obj.dtype).reshape(obj.shape)[...] = obj
+        return SharedArray(offset, obj.dtype, obj.shape), end
+
+    elif isinstance(obj, (tuple,list)):
+        skeleton = []
+        for v in obj:
+            v, offset = pack(v, buffer, offset)
+            skeleton.append(v)
+        return type(obj)(skeleton), offset
+
+    elif isinstance(obj, dict):
+        skeleton = obj.__class__()
+        for k, v in obj.items():
+            skeleton[k], offset = pack(v, buffer, offset)
+        return skeleton, offset
+
+    else:
+        return obj, offset
+
+def unpack(skeleton, buffer):
+    '''
+    Rebuilds an object packed by pack. The numpy arrays of the object are views on the shared memory buffer.
+
+    :param skeleton: the skeleton of the object as returned by pack
+    :type skeleton: any python object
+    :param buffer: the shared memory buffer
+    :type buffer: 1D numpy array of bytes
+
+    :return: the unpacked object
+    :rtype: any python object
+    '''
+
+    if isinstance(skeleton, SharedArray):
+        end = skeleton.offset + int(numpy.prod(skeleton.shape))*skeleton.dtype.itemsize
+        return buffer[skeleton.offset:end].view(skeleton.dtype).reshape(skeleton.shape)
+
+    elif isinstance(skeleton, (tuple,list)):
+        return type(skeleton)([unpack(v, buffer) for v in skeleton])
+
+    elif isinstance(skeleton, dict):
+        obj = skeleton.__class__()
+        for k, v in skeleton.items():
+            obj[k] = unpack(v, buffer)
+        return obj
+
+    else:
+        return skeleton
+
+def reopen_trajectory(job):
+    '''
+    Replaces the trajectory of a job by a new handle on the same file.
+
+    The handle of the trajectory inherited from the master process can not be used concurrently by several processes
+    because they would share the same file offset.
+
+    :param job: the job
+    :type job: MDANSE.Framework.Jobs.IJob.IJob
+    '''
+
+    try:
+        trajConfig = job.configuration['trajectory']
+        traj = trajConfig['instance']
+    except KeyError:
+        return
+
+    from MDANSE.MolecularDynamics.Trajectory import reopen_trajectory
+
+    trajConfig['instance'] = reopen_trajectory(traj)
+
+class SharedMemorySlave(multiprocessing.Process):
+    '''
+    A worker process that runs chunks of steps of a job.
+    '''
+
+    def __init__(self, rank, bootstrap, tasks, results, buffer, released):
+        '''
+        :param rank: the rank of the worker
+        :type rank: int
+        :param bootstrap: what the worker needs to build the job as returned by MDANSE.DistributedComputing.Scheduling.job_bootstrap
+        :type bootstrap: 2-tuple
+        :param tasks: the queue from which the chunks of step indexes are fetched
+        :type tasks: multiprocessing.Queue
+        :param results: the queue in which the results are sent
+        :type results: multiprocessing.Queue
+        :param buffer: the shared memory buffer of the worker
+        :type buffer: multiprocessing.RawArray
+        :param released: semaphore signaled by the master once the shared memory buffer has been consumed
+        :type released: multiprocessing.Semaphore
+        '''
+
+        multiprocessing.Process.__init__(self, name="MDANSE worker %d" % rank)
+
+        self.daemon = True
+
+        self._rank = rank
+        self._jobBootstrap = bootstrap
+        self._tasks = tasks
+        self._results = results
+        self._rawBuffer = buffer
+        self._released = released
+
+    def run(self):
+
+        buffer = numpy.frombuffer(self._rawBuffer, dtype=numpy.uint8)
+
+        # Forget the events inherited from the master.
+        INSTRUMENTATION.set_worker("worker %d" % self._rank)
+        INSTRUMENTATION.pop_events()
+
+        try:
+            job = build_job(self._jobBootstrap)
+            # A job sent as it is shares the trajectory handle of the master.
+            if not self._jobBootstrap[0]:
+                reopen_trajectory(job)
+        except:
+            self._results.put((self._rank, None, FAILED, "".join(traceback.format_exception(*sys.exc_info()))))
+            return
+
+        while True:
+
+            indexes = self._tasks.get()
+            if indexes is None:
+                break
+
+            try:
+                result = run_steps(job, indexes)
+            except:
+                self._results.put((self._rank, indexes, FAILED, "".join(traceback.format_exception(*sys.exc_info()))))
+                break
+
+            # Wait for the master to have consumed the previous result stored in the buffer.
+            self._released.acquire()
+            try:
+                skeleton, _ = pack(result, buffer)
+            except SharedMemoryError:
+                self._released.release()
+                self._results.put((self._rank, indexes, PICKLED, result))
+            else:
+                self._results.put((self._rank, indexes, SHARED, skeleton))
+
+class SharedMemoryMaster(object):
+    '''
+    Master process of a shared memory master-slave setup.
+    '''
+
+    # The default size (in bytes) of the shared memory buffer allocated for each worker.
+    bufferSize = 16*1024*1024
+
+    # The interval (in seconds) at which the workers are checked while waiting for a result.
+    pollInterval = 1.0
+
+    def __init__(self, job, nWorkers, bufferSize=None):
+        '''
+        :param job: the job whose steps will be run by the workers. It must have been initialized.
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        :param nWorkers: the number of workers
+        :type nWorkers: int
+        :param bufferSize: the size (in bytes) of the shared memory buffer of each worker. If None the class default is used.
+        :type bufferSize: int
+        '''
+
+        if bufferSize is not None:
+            self.bufferSize = bufferSize
+
+        self._tasks = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+
+        bootstrap = job_bootstrap(job)
+
+        self._buffers = []
+        self._released = []
+        self._workers = []
+        for rank in range(nWorkers):
+            buffer = multiprocessing.RawArray(ctypes.c_char, self.bufferSize)
+            released = multiprocessing.Semaphore(1)
+            self._buffers.append(numpy.frombuffer(buffer, dtype=numpy.uint8))
+            self._released.append(released)
+            self._workers.append(SharedMemorySlave(rank, bootstrap, self._tasks, self._results, buffer, released))
+
+        self._pending = 0
+        
+        self._lastRank = None
+
+    @property
+    def nWorkers(self):
+        '''
+        Returns the number of workers.
+
+        :return: the number of workers
+        :rtype: int
+        '''
+
+        return len(self._workers)
+
+    def start(self):
+        '''
+        Starts the workers.
+        '''
+
+        for w in self._workers:
+            w.start()
+
+    def requestTask(self, indexes):
+        '''
+        Requests the run of a chunk of steps.
+
+        :param indexes: the indexes of the steps
+        :type indexes: list of int
+        '''
+
+        self._tasks.put(indexes)
+        self._pending += 1
+
+    def release(self):
+        '''
+        Releases the shared memory buffer holding the last retrieved result.
+        '''
+
+        if self._lastRank is not None:
+            self._released[self._lastRank].release()
+            self._lastRank = None
+
+    def retrieveResult(self):
+        '''
+        Retrieves the result of a chunk of steps in the order of completion.
+
+        The numpy arrays of the result are views on the shared memory buffer of the worker that produced it. They 
+        remain valid until the next result is retrieved.
+
+        A SharedMemoryError is raised if a worker dies (e.g. killed by the system or crashed in a C extension) 
+        while waiting for the result.
+
+        :return: the result of the chunk as returned by MDANSE.DistributedComputing.Scheduling.run_steps
+        :rtype: 3-tuple
+        '''
+
+        self.release()
+
+        while True:
+            try:
+                rank, indexes, status, value = self._results.get(timeout=self.pollInterval)
+            except Queue.Empty:
+                # The workers only exit on request, once all the results have been retrieved.
+                for rank, w in enumerate(self._workers):
+                    if not w.is_alive():
+                        raise SharedMemoryError("Worker %d died unexpectedly (exit code %s)" % (rank, w.exitcode))
+            else:
+                break
+
+        self._pending -= 1
+
+        if status == FAILED:
+            if indexes is None:
+                raise SharedMemoryError("Worker %d could not build the job:\n%s" % (rank, value))
+            raise SharedMemoryError("Steps %s failed on worker %d:\n%s" % (indexes, rank, value))
+
+        if status == SHARED:
+            self._lastRank = rank
+            return unpack(value, self._buffers[rank])
+        else:
+            return value
+
+    def shutdown(self):
+        '''
+        Stops the workers. If some tasks are still pending, the workers are terminated.
+        '''
+
+        self.release()
+
+        if self._pending > 0:
+            for w in self._workers:
+                if w.is_alive():
+                    w.terminate()
+        else:
+            for _ in self._workers:
+                self._tasks.put(None)
+
+        for w in self._workers:
+            w.join()
@@ -62,6 +62,8 @@ class Configurable(object):
                
         self._configuration = {}
 
+        self._parameters = {}
+
         settings = getattr(self,"settings",{})
         
         if not isinstance(settings,_abcoll.Mapping):
@@ -116,6 +118,8 @@ class Configurable(object):
                     parameters[k] = v.default
         else:
             raise ConfigurationError("Invalid type for configuration parameters")             
+
+        self._parameters = dict(parameters)
                         
         toBeConfigured = set(self._configurators.keys())
         configured = set()
@@ -253,6 +257,17 @@ class Configurable(object):
             
         return params
     
+    @property
+    def parameters(self):
+        '''
+        Return the input parameters of the last setup of this Configurable object, including the default ones
+        
+        :return: the input parameters
+        :rtype: dict 
+        '''
+        
+        return self._parameters
+    
     @property
     def configurators(self):
         '''
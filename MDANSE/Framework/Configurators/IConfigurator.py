@@ -96,6 +96,10 @@ class IConfigurator(dict):
     _default = None
     
     _doc_ = "undocumented"
+
+    # Whether or not configuring twice with the same input value gives the same result. The results of the configurators for
+    # which it does not hold are sent to the workers of a parallel job rather than being rebuilt by them.
+    deterministic = True
                             
     def __init__(self, name, dependencies=None, default=None, label=None, widget=None):
         '''
@@ -35,6 +35,10 @@ import os
 from MDANSE import PLATFORM, REGISTRY
 
 from MDANSE.Framework.Configurators.InputFileConfigurator import InputFileConfigurator
+from MDANSE.MolecularDynamics.CompressedTrajectory import is_compressed_trajectory
+from MDANSE.MolecularDynamics.DCDTrajectory import is_dcd_trajectory
+from MDANSE.MolecularDynamics.MemoryMappedTrajectory import is_memory_mapped_trajectory
+from MDANSE.MolecularDynamics.VirtualTrajectory import is_virtual_trajectory
 
 class MMTKNetCDFTrajectoryConfigurator(InputFileConfigurator):
     '''
@@ -45,6 +49,11 @@ class MMTKNetCDFTrajectoryConfigurator(InputFileConfigurator):
     
     To use trajectories derived from MD packages different from MMTK, it is compulsory to convert them before to a MMTK trajectory file.
     
+    Memory mapped trajectory files (see MDANSE.MolecularDynamics.MemoryMappedTrajectory), virtual trajectory files 
+    (see MDANSE.MolecularDynamics.VirtualTrajectory), compressed trajectory files (see 
+    MDANSE.MolecularDynamics.CompressedTrajectory) and DCD files, whose topology is read from the PDB file with the 
+    same name (see MDANSE.MolecularDynamics.DCDTrajectory), are also accepted.
+    
     :attention: once configured, the MMTK trajectory file will be opened for reading.    
     '''
     
@@ -64,7 +73,16 @@ class MMTKNetCDFTrajectoryConfigurator(InputFileConfigurator):
                 
         InputFileConfigurator.configure(self, configuration, value)
         
-        inputTraj = REGISTRY["input_data"]["mmtk_trajectory"](self['value'])
+        if is_memory_mapped_trajectory(self['value']):
+            inputTraj = REGISTRY["input_data"]["mmap_trajectory"](self['value'])
+        elif is_virtual_trajectory(self['value']):
+            inputTraj = REGISTRY["input_data"]["virtual_trajectory"](self['value'])
+        elif is_compressed_trajectory(self['value']):
+            inputTraj = REGISTRY["input_data"]["compressed_trajectory"](self['value'])
+        elif is_dcd_trajectory(self['value']):
+            inputTraj = REGISTRY["input_data"]["dcd_trajectory"](self['value'])
+        else:
+            inputTraj = REGISTRY["input_data"]["mmtk_trajectory"](self['value'])
         
         self['instance'] = inputTraj.trajectory
                 
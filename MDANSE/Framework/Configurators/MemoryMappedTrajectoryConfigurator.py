@@ -0,0 +1,80 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+from MDANSE.Framework.Configurators.IConfigurator import ConfiguratorError
+from MDANSE.Framework.Configurators.InputFileConfigurator import InputFileConfigurator
+from MDANSE.Framework.Configurators.MMTKTrajectoryConfigurator import MMTKNetCDFTrajectoryConfigurator
+from MDANSE.MolecularDynamics.MemoryMappedTrajectory import is_memory_mapped_trajectory
+
+class MemoryMappedTrajectoryConfigurator(MMTKNetCDFTrajectoryConfigurator):
+    '''
+    This configurator allow to input a memory mapped trajectory file (see MDANSE.MolecularDynamics.MemoryMappedTrajectory).
+    
+    A memory mapped trajectory can be built from a MMTK trajectory file using the 'mmap' converter.
+    
+    :attention: once configured, the memory mapped trajectory file will be opened for reading.    
+    '''
+    
+    type = 'mmap_trajectory'
+    
+    _default = 'waterbox_in_periodic_universe.mdt'
+                        
+    def configure(self, configuration, value):
+        '''
+        Configure a memory mapped trajectory file. 
+                
+        :param configuration: the current configuration.
+        :type configuration: a MDANSE.Framework.Configurable.Configurable object
+        :param value: the path for the memory mapped trajectory file.
+        :type value: str 
+        '''
+        
+        InputFileConfigurator.configure(self, configuration, value)
+        
+        if not is_memory_mapped_trajectory(self['value']):
+            raise ConfiguratorError("the file %r is not a memory mapped trajectory." % self['value'], self)
+                
+        MMTKNetCDFTrajectoryConfigurator.configure(self, configuration, value)
+                
+    def get_information(self):
+        '''
+        Returns some basic informations about the contents of the memory mapped trajectory file.
+        
+        :return: the informations about the contents of the memory mapped trajectory file.
+        :rtype: str
+        '''
+        
+        info = ["Memory mapped input trajectory: %r\n" % self["filename"]]
+        info.append("Number of steps: %d\n" % self["length"])
+        info.append("Size of the universe: %d\n" % self["universe"].numberOfAtoms())
+        if (self['has_velocities']):
+            info.append("The trajectory contains atomic velocities\n")
+        
+        return "".join(info)
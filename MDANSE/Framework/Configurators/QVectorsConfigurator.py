@@ -54,6 +54,9 @@ class QVectorsConfigurator(IConfigurator):
     """
     
     type = "q_vectors"
+
+    # The Q vectors may be generated randomly.
+    deterministic = False
     
     _default = ("spherical_lattice",{"shells":(0,5,0.1), "width" : 0.1, "n_vectors" : 50})
 
@@ -30,20 +30,27 @@ Created on May 22, 2015
 @author: Eric C. Pellegrini
 '''
 
-from MDANSE import PLATFORM
 from MDANSE.Framework.Configurators.IConfigurator import IConfigurator, ConfiguratorError
                         
 class RunningModeConfigurator(IConfigurator):
     """
     This configurator allows to choose the mode used to run the calculation.
     
-    MDANSE currently support monoprocessor or multiprocessor (SMP) running modes. In the laster case, you have to specify
-    the number of slots used for running the analysis.
+    MDANSE currently support monoprocessor, multiprocessor (SMP), multithread and remote running modes. In the three latter
+    cases, you have to specify the number of slots used for running the analysis. The multiprocessor mode forks one worker 
+    process per slot, the results of the steps being sent back to the master process through shared memory. The multithread 
+    mode runs one worker thread per slot sharing the trajectory of the master process. It is only available for the analysis 
+    whose computational kernels release the GIL, the other ones being run in monoprocessor mode.
+    
+    In the remote mode, the master listens on a TCP address (host:port) given as a third element to which the workers 
+    connect with "python -m MDANSE.DistributedComputing.Cluster host:port". The master and the workers authenticate each
+    other with the secret key found in their MDANSE_CLUSTER_KEY environment variable. If no address is given, the master
+    only listens on the local host and one worker per slot is spawned on the local host with a generated key.
     """
 
     type = 'running_mode'
     
-    availablesModes = ["monoprocessor","multiprocessor"]
+    availablesModes = ["monoprocessor","multiprocessor","multithread","remote"]
     
     _default = ("monoprocessor", 1)                
 
@@ -54,8 +61,9 @@ class RunningModeConfigurator(IConfigurator):
         :param configuration: the current configuration
         :type configuration: a MDANSE.Framework.Configurable.Configurable object
         :param value: the running mode specification. It can be "monoprocessor" string or a 2-tuple whose first element must 
-        be "multiprocessor" string and 2nd element the number of slots allocated for running the analysis.
-        :type value: "monoprocessor" or 2-tuple
+        be "multiprocessor", "multithread" or "remote" string and 2nd element the number of slots allocated for running the analysis. For the
+        remote mode, an optional 3rd element gives the "host:port" address on which the master listens.
+        :type value: "monoprocessor" or 2-tuple or 3-tuple
         '''
                 
         if isinstance(value,basestring):
@@ -66,17 +74,23 @@ class RunningModeConfigurator(IConfigurator):
         if not mode in self.availablesModes:
             raise ConfiguratorError("%r is not a valid running mode." % mode, self)
 
+        address = None
+
         if mode == "monoprocessor":
             slots = 1
 
         else:
 
-            import Pyro
-            Pyro.config.PYRO_STORAGE=PLATFORM.home_directory()
-
             slots = int(value[1])
+
+            if mode == "remote" and len(value) > 2 and value[2]:
+                from MDANSE.DistributedComputing.Cluster import ClusterError, parse_address
+                try:
+                    address = parse_address(value[2])
+                except ClusterError as e:
+                    raise ConfiguratorError(str(e), self)
                         
-            if mode == "multiprocessor":
+            if mode in ["multiprocessor","multithread"]:
                 import multiprocessing
                 maxSlots = multiprocessing.cpu_count()
                 del multiprocessing
@@ -90,6 +104,8 @@ class RunningModeConfigurator(IConfigurator):
         
         self['slots'] = slots
 
+        self['address'] = address
+
     def get_information(self):
         '''
         Returns string information about this configurator.
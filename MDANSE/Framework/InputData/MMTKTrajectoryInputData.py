@@ -34,7 +34,8 @@ import numpy
 
 from MDANSE.Framework.InputData.IInputData import InputDataError
 from MDANSE.Framework.InputData.InputFileData import InputFileData
-from MDANSE.MolecularDynamics.Trajectory import get_chemical_objects_size, get_chemical_objects_number, MMTKTrajectory
+from MDANSE.MolecularDynamics.FrameCache import FRAME_CACHE
+from MDANSE.MolecularDynamics.Trajectory import get_chemical_objects_size, get_chemical_objects_number, read_frame, MMTKTrajectory
 
 class MMTKTrajectoryInputData(InputFileData):
     
@@ -54,6 +55,17 @@ class MMTKTrajectoryInputData(InputFileData):
 
     def close(self):
         self._data.close()
+        FRAME_CACHE.discard(self._filename)
+        
+    def read_frame(self, frame):
+        '''
+        Sets the universe of the trajectory to a given frame. The frames are read through the frame cache.
+        
+        :param frame: the index of the frame
+        :type frame: int
+        '''
+        
+        read_frame(self._data, frame)
         
     def info(self):
         
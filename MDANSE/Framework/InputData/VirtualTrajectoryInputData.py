@@ -0,0 +1,52 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+from MDANSE.Framework.InputData.IInputData import InputDataError
+from MDANSE.Framework.InputData.MMTKTrajectoryInputData import MMTKTrajectoryInputData
+from MDANSE.MolecularDynamics.Trajectory import open_topology
+from MDANSE.MolecularDynamics.VirtualTrajectory import VirtualTrajectory, VirtualTrajectoryError
+
+class VirtualTrajectoryInputData(MMTKTrajectoryInputData):
+    
+    type = "virtual_trajectory"
+    
+    extension = "mvt"
+    
+    def load(self):
+        
+        try:
+            traj = VirtualTrajectory.open(self._filename)
+        except VirtualTrajectoryError as e:
+            raise InputDataError("The virtual trajectory %r could not be loaded properly: %s" % (self._filename,e))
+        
+        open_topology(traj.universe, traj.filename)
+        
+        self._data = traj
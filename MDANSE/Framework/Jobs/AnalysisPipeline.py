@@ -0,0 +1,166 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import collections
+import os
+
+import numpy
+
+from MDANSE import REGISTRY
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
+from MDANSE.Framework.Jobs.IJob import IJob, JobError
+from MDANSE.MolecularDynamics.Trajectory import preloaded_frame, read_frame
+
+class AnalysisPipeline(IJob):
+    """
+    Runs several frame-based analysis (e.g. pdf, cn, ssf, den, rog, ecc) over a single read of a trajectory. 
+    
+    Each frame is read once and is then passed to each analysis, each analysis writing its own output files. The 
+    analysis are given as a list of (job type, parameters) 2-tuples. The 'trajectory' and 'frames' parameters of an 
+    analysis default to those of the pipeline and must match them when they are given. By default, the output files 
+    of an analysis are those of the pipeline suffixed by the job type.
+    """
+
+    type = 'pipeline'
+    
+    label = "Analysis Pipeline"
+
+    category = ('Structure',)
+    
+    ancestor = "mmtk_trajectory"
+    
+    # The state of the pipeline is spread over the analysis it runs.
+    checkpointable = False
+
+    frameBased = True
+
+    settings = collections.OrderedDict()
+    settings['trajectory'] = ('mmtk_trajectory',{})
+    settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
+    settings['jobs'] = ('python_object', {'default':[('den',{}),('rog',{})]})
+    settings['output_files'] = ('output_files', {'formats':["netcdf","ascii"]})
+    settings['running_mode'] = ('running_mode',{})
+                
+    def initialize(self):
+        """
+        Sets up and initializes the analysis of the pipeline.
+        """
+
+        self.numberOfSteps = self.configuration['frames']['number']
+        
+        frames = self.configuration['frames']['value']
+        
+        filename = os.path.abspath(self.configuration['trajectory']['filename'])
+        
+        dirname, basename = os.path.split(self.configuration['output_files']['root'])
+        
+        self._jobs = []
+        
+        for jobType, parameters in self.configuration['jobs']['value']:
+            
+            try:
+                job = REGISTRY['job'][jobType]()
+            except KeyError:
+                raise JobError("Unknown job %r in the pipeline" % jobType)
+            
+            if not 'frames' in job.settings:
+                raise JobError("The job %r is not a frame-based analysis and can not be run in a pipeline" % jobType)
+            
+            parameters = dict(parameters)
+            parameters.setdefault('trajectory', self.configuration['trajectory']['filename'])
+            parameters.setdefault('frames', (frames[0], frames[-1]+1, self.configuration['frames']['step']))
+            parameters.setdefault('output_files', (dirname, "%s_%s" % (basename,jobType), self.configuration['output_files']['formats']))
+            parameters['running_mode'] = ('monoprocessor',1)
+            
+            job.setup(parameters)
+            
+            if os.path.abspath(job.configuration['trajectory']['filename']) != filename:
+                raise JobError("The job %r of the pipeline does not run on the trajectory of the pipeline" % jobType)
+            
+            if not numpy.array_equal(job.configuration['frames']['value'], frames):
+                raise JobError("The job %r of the pipeline does not run on the frames of the pipeline" % jobType)
+                        
+            job.initialize()
+            
+            # The step index of each analysis must match the index of the frame.
+            if job.numberOfSteps != self.numberOfSteps:
+                raise JobError("The steps of the job %r of the pipeline do not match its frames" % jobType)
+                        
+            self._jobs.append(job)
+            
+        if not self._jobs:
+            raise JobError("No job to run in the pipeline")
+                                
+    def run_step(self, index):
+        """
+        Runs a single step of the job.
+        
+        @param index: the index of the step.
+        @type index: int.
+        """
+
+        frameIndex = self.configuration['frames']['value'][index]
+        
+        trajectory = self.configuration['trajectory']['instance']
+        
+        read_frame(trajectory, frameIndex)
+        
+        configuration = trajectory.universe.copyConfiguration()
+        
+        results = []
+        
+        with preloaded_frame(trajectory, frameIndex, configuration):
+            for job in self._jobs:
+                with INSTRUMENTATION.section(job.type):
+                    results.append(job.run_step(index)[1])
+                                
+        return index, results
+    
+    def combine(self, index, x):
+        """
+        @param index: the index of the step.
+        @type index: int.
+        
+        @param x:
+        @type x: any.
+        """
+        
+        for job, result in zip(self._jobs, x):
+            job.combine(index, result)
+       
+    def finalize(self):
+        """
+        Finalize the job.
+        """        
+
+        for job in self._jobs:
+            job.finalize()
+        
+        self.configuration['trajectory']['instance'].close()
@@ -36,6 +36,7 @@ import numpy
 
 from MDANSE.Core.Error import Error
 from MDANSE.Framework.Jobs.IJob import IJob
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 class AreaPerMoleculeError(Error):
     pass
@@ -56,6 +57,8 @@ class AreaPerMolecule(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {"dependencies":{'trajectory':'trajectory'}})
@@ -103,7 +106,7 @@ class AreaPerMolecule(IJob):
 
         # Set the universe configuration to this frame index
         universe = self.configuration['trajectory']['instance'].universe        
-        universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex, universe)
 
         # Compute the area and then the area per molecule 
         basisVectors = universe.basisVectors()
@@ -36,11 +36,10 @@ import numpy
 
 from MMTK.Collections import Collection
 from MMTK.ParticleProperties import Configuration
-from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Geometry import center
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import open_output_trajectory, sorted_atoms, read_frame
 
 class BoxCenteredTrajectory(IJob):
     """
@@ -55,11 +54,16 @@ class BoxCenteredTrajectory(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    checkpointable = False
+
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
     settings['atom_selection'] = ('atom_selection',{'dependencies':{'trajectory':'trajectory'}})
     settings['output_files'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
                 
     def initialize(self):
         """
@@ -75,9 +79,11 @@ class BoxCenteredTrajectory(IJob):
         self._selectedAtoms = Collection([atoms[ind] for ind in self.configuration['atom_selection']['indexes']])
                         
         # The output trajectory is opened for writing.
-        self._btt = Trajectory(self._selectedAtoms, self.configuration['output_files']['files'][0], "w")        
+        self._btt, self._snapshot = open_output_trajectory(self._universe,
+                                                           self.configuration['output_files']['files'][0],
+                                                           self.configuration['compression']['value'],
+                                                           obj=self._selectedAtoms)
         self._btt.title = self.__class__.__name__
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._btt, "all", 0, None, 1)])
 
         # This will store the box coordinates of the previous configuration
         self._boxCoords = None
@@ -97,7 +103,7 @@ class BoxCenteredTrajectory(IJob):
         frameIndex = self.configuration['frames']['value'][index]
               
         # The configuration corresponding to this index is set to the universe.
-        self._universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex, self._universe)
 
         # Get a contiguous copy of the current configuration.
         conf = self._universe.contiguousObjectConfiguration()
@@ -34,10 +34,9 @@ import collections
 import copy
 
 from MMTK import Atom
-from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import partition_universe
+from MDANSE.MolecularDynamics.Trajectory import open_output_trajectory, partition_universe, read_frame
 
 class CenterOfMassesTrajectory(IJob):
     """
@@ -52,6 +51,10 @@ class CenterOfMassesTrajectory(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    checkpointable = False
+
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}, 'default':(0,1,1)})
@@ -59,6 +62,7 @@ class CenterOfMassesTrajectory(IJob):
                                                                          'grouping_level':'grouping_level'}})
     settings['grouping_level'] = ('grouping_level',{})
     settings['output_files'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
                 
     def initialize(self):
         """
@@ -80,13 +84,13 @@ class CenterOfMassesTrajectory(IJob):
             self._newUniverse.addObject(at)    
                             
         # The output trajectory is opened for writing.
-        self._comt = Trajectory(self._newUniverse, self.configuration['output_files']['files'][0], "w")
+        self._comt, self._snapshot = open_output_trajectory(self._newUniverse,
+                                                            self.configuration['output_files']['files'][0],
+                                                            self.configuration['compression']['value'],
+                                                            variables=("configuration","time"))
         
         # The title for the trajectory is set. 
         self._comt.title = self.__class__.__name__
-        
-        # Create the snapshot generator.
-        self._snapshot = SnapshotGenerator(self._newUniverse, actions = [TrajectoryOutput(self._comt, ("configuration","time"), 0, None, 1)])
 
     def run_step(self, index):
         """
@@ -103,7 +107,7 @@ class CenterOfMassesTrajectory(IJob):
         frameIndex = self.configuration['frames']['value'][index]
               
         # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
         comConf = self._newUniverse.configuration().array
 
@@ -0,0 +1,258 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Checkpointing of the running jobs
+
+A checkpoint stores the state of a job as it stands after the combination of the results of a set of steps
+together with the indexes of those steps. A job restored from a checkpoint only has to run the remaining steps.
+The checkpoint is written periodically in a file next to the output files of the job and removed once the job
+has been finalized.
+'''
+
+import cPickle
+import hashlib
+import os
+import time
+
+import numpy
+
+from MDANSE.Core.Error import Error
+
+class CheckpointError(Error):
+    pass
+
+def is_serializable(obj):
+    '''
+    Returns whether or not an object is only made of numbers, strings and numpy arrays, possibly nested in tuples,
+    lists and dictionaries. Only those objects are stored in a checkpoint.
+
+    :param obj: the object
+    :type obj: any python object
+
+    :return: True if the object can be stored in a checkpoint
+    :rtype: bool
+    '''
+
+    if obj is None or isinstance(obj, (bool,int,long,float,complex,basestring,numpy.generic)):
+        return True
+    elif isinstance(obj, numpy.ndarray):
+        return not obj.dtype.hasobject
+    elif isinstance(obj, (tuple,list,set)):
+        return all([is_serializable(v) for v in obj])
+    elif isinstance(obj, dict):
+        return all([is_serializable(k) and is_serializable(v) for k, v in obj.items()])
+    else:
+        return False
+
+def _canonical(obj):
+    '''
+    Returns a version of an object whose representation does not depend on the order of its dictionaries.
+    '''
+
+    if isinstance(obj, dict):
+        return sorted([(k,_canonical(v)) for k, v in obj.items()])
+    elif isinstance(obj, (tuple,list)):
+        return [_canonical(v) for v in obj]
+    elif isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    else:
+        return obj
+
+def job_signature(job):
+    '''
+    Returns the signature of the inputs of a job, which a checkpoint must share with the job it is restored to.
+
+    The signature is made of a hash of the parameters of the job, its running mode aside so that a job can be resumed
+    with another number of processes, and of the modification time and size of its input files.
+
+    :param job: the job
+    :type job: MDANSE.Framework.Jobs.IJob.IJob
+
+    :return: the signature of the job
+    :rtype: dict
+    '''
+
+    parameters = dict(job.parameters)
+    parameters.pop('running_mode', None)
+
+    inputs = {}
+    for name, conf in job.configuration.items():
+        filename = conf.get('filename')
+        if isinstance(filename, basestring) and os.path.isfile(filename):
+            st = os.stat(filename)
+            inputs[name] = (filename,st.st_mtime,st.st_size)
+
+    return {'parameters' : hashlib.sha1(repr(_canonical(parameters))).hexdigest(),
+            'inputs' : inputs}
+
+class Checkpoint(object):
+    '''
+    Handles the checkpoint file of a job.
+    '''
+
+    def __init__(self, filename, interval):
+        '''
+        :param filename: the name of the checkpoint file
+        :type filename: str
+        :param interval: the interval (in seconds) between two checkpoints. If 0, the checkpointing is off and the checkpoint is only written on request.
+        :type interval: int
+        '''
+
+        self._filename = filename
+
+        self._interval = interval
+
+        self._completed = set()
+
+        self._lastSave = time.time()
+
+    @property
+    def filename(self):
+        '''
+        Returns the name of the checkpoint file.
+
+        :return: the name of the checkpoint file
+        :rtype: str
+        '''
+
+        return self._filename
+
+    @property
+    def completed(self):
+        '''
+        Returns the indexes of the steps whose results have been combined.
+
+        :return: the indexes of the completed steps
+        :rtype: set
+        '''
+
+        return self._completed
+
+    @property
+    def enabled(self):
+        '''
+        Returns whether or not the checkpoints are written periodically.
+
+        :return: True if the checkpoint interval is not 0
+        :rtype: bool
+        '''
+
+        return self._interval > 0
+
+    def exists(self):
+        '''
+        Returns whether or not the checkpoint file exists.
+
+        :return: True if the checkpoint file exists
+        :rtype: bool
+        '''
+
+        return os.path.exists(self._filename)
+
+    def record(self, job, index):
+        '''
+        Records the completion of a step and writes the checkpoint if the checkpoint interval has elapsed.
+
+        :param job: the job
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        :param index: the index of the step whose result has just been combined
+        :type index: int
+        '''
+
+        self._completed.add(index)
+
+        if self.enabled and time.time() - self._lastSave >= self._interval:
+            self.save(job)
+
+    def save(self, job):
+        '''
+        Writes the checkpoint.
+
+        The checkpoint is first written in a temporary file which is then renamed so that a job killed while writing
+        its checkpoint leaves the previous one untouched.
+
+        :param job: the job
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+        '''
+
+        checkpoint = {'type' : job.type,
+                      'n_steps' : job.numberOfSteps,
+                      'signature' : job_signature(job),
+                      'completed' : sorted(self._completed),
+                      'state' : job.get_checkpoint_state()}
+
+        tempFile = self._filename + '.tmp'
+
+        try:
+            with open(tempFile, 'wb') as f:
+                cPickle.dump(checkpoint, f, protocol=cPickle.HIGHEST_PROTOCOL)
+            # os.rename can not overwrite an existing file on Windows.
+            if os.name == 'nt' and os.path.exists(self._filename):
+                os.remove(self._filename)
+            os.rename(tempFile, self._filename)
+        except (IOError,OSError) as e:
+            raise CheckpointError("Could not write the checkpoint file %r: %s" % (self._filename,e))
+
+        self._lastSave = time.time()
+
+    def restore(self, job):
+        '''
+        Restores the state of a job from the checkpoint file.
+
+        :param job: the job. It must have been initialized with the same parameters and input files as the checkpointed one.
+        :type job: MDANSE.Framework.Jobs.IJob.IJob
+
+        :return: the indexes of the steps completed by the checkpointed job
+        :rtype: set
+        '''
+
+        try:
+            with open(self._filename, 'rb') as f:
+                checkpoint = cPickle.load(f)
+        except (IOError,EOFError,cPickle.UnpicklingError) as e:
+            raise CheckpointError("Could not read the checkpoint file %r: %s" % (self._filename,e))
+
+        if checkpoint['type'] != job.type or checkpoint['n_steps'] != job.numberOfSteps:
+            raise CheckpointError("The checkpoint file %r does not match the job %r" % (self._filename,job.type))
+
+        signature = job_signature(job)
+        if checkpoint.get('signature') != signature:
+            raise CheckpointError("The checkpoint file %r was written for other parameters or input files than those of the job %r" % (self._filename,job.type))
+
+        job.set_checkpoint_state(checkpoint['state'])
+
+        self._completed = set(checkpoint['completed'])
+
+        return self._completed
+
+    def remove(self):
+        '''
+        Removes the checkpoint file.
+        '''
+
+        if os.path.exists(self._filename):
+            os.remove(self._filename)
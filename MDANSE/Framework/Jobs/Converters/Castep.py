@@ -36,12 +36,9 @@ import re
 
 import numpy
 
-from Scientific.Geometry import Vector
-
 from MMTK import Atom
 from MMTK import Units
 from MMTK.ParticleProperties import Configuration, ParticleVector
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
 from MMTK.Universe import ParallelepipedicPeriodicUniverse
 
 from MDANSE.Core.Error import Error
@@ -113,7 +110,7 @@ class MDFile(dict):
         
         self['instance'].seek(start+self._frameInfo["cell_data"][0])
         basisVectors = self['instance'].read(self._frameInfo["cell_data"][1]).splitlines()
-        basisVectors = tuple([Vector([float(bb) for bb in b.strip().split()[:3]])*Units.Bohr for b in basisVectors])
+        basisVectors = numpy.array([[float(bb) for bb in b.strip().split()[:3]] for b in basisVectors])*Units.Bohr
         
         self['instance'].seek(start+self._frameInfo["data"][0])
         config = numpy.array(self['instance'].read(self._frameInfo["data"][1]).split(),dtype=str)
@@ -147,6 +144,8 @@ class CASTEPConverter(Converter):
     settings = collections.OrderedDict()
     settings['castep_file'] = ('input_file', {})
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
+    settings['running_mode'] = ('running_mode',{})
                 
     def initialize(self):
         """
@@ -168,24 +167,35 @@ class CASTEPConverter(Converter):
 
         self._gradients = ParticleVector(self._universe)        
 
-        # A MMTK trajectory is opened for writing.
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], mode='w')
-
-        # A frame generator is created.
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._trajectory, ["all"], 0, None, 1)])
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = self.open_output(self._universe)
     
-    def run_step(self, index):
-        """Runs a single step of the job.
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the CASTEP file.
+        
+        :param index: the index of the frame
+        :type index: int
         
-        @param index: the index of the step.
-        @type index: int.
+        :return: the parsed frame
+        :rtype: 3-tuple
+        '''
+        
+        return self._castepFile.read_step(index)
 
-        @note: the argument index is the index of the loop note the index of the frame.      
-        """
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: 3-tuple
+        '''
                 
         nAtoms = self._castepFile["n_atoms"]
         
-        timeStep, basisVectors, config = self._castepFile.read_step(index)
+        timeStep, basisVectors, config = frame
         
         self._universe.setShape(basisVectors)
             
@@ -205,19 +215,6 @@ class CASTEPConverter(Converter):
 
         # Store a snapshot of the current configuration in the output trajectory.
         self._snapshot(data=data)                                          
-        
-        return index, None
-
-    def combine(self, index, x):
-        """
-        @param index: the index of the step.
-        @type index: int.
-        
-        @param x:
-        @type x: any.
-        """
-
-        pass
 
     def finalize(self):
         """
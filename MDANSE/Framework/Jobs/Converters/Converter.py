@@ -30,8 +30,166 @@ Created on May 27, 2015
 @author: Eric C. Pellegrini
 '''
 
+import os
+
+from MDANSE.DistributedComputing.Scheduling import copy_arrays, nbytes
 from MDANSE.Framework.Jobs.IJob import IJob
+from MDANSE.MolecularDynamics.Trajectory import open_output_trajectory
+
+def index_frames(filename, marker, blockSize=64*1024*1024):
+    '''
+    Builds the byte-offset index of the frames of a text trajectory file by scanning it for the marker that starts each frame.
+
+    The file is scanned by large blocks so that the scan runs at about the speed of the disk even for very large files.
+
+    :param filename: the name of the trajectory file
+    :type filename: str
+    :param marker: the string starting each frame
+    :type marker: str
+    :param blockSize: the size (in bytes) of the blocks read while scanning
+    :type blockSize: int
+
+    :return: the offsets of the frames followed by the size of the file such as frame i spans [offsets[i],offsets[i+1])
+    :rtype: list of int
+    '''
+
+    offsets = []
+
+    with open(filename, 'rb') as f:
+        position = 0
+        # The end of the previous block kept to find the markers overlapping two blocks.
+        tail = ''
+        while True:
+            block = f.read(blockSize)
+            if not block:
+                break
+            data = tail + block
+            start = position - len(tail)
+            i = data.find(marker)
+            while i != -1:
+                offsets.append(start + i)
+                i = data.find(marker, i + len(marker))
+            position += len(block)
+            tail = data[-(len(marker)-1):] if len(marker) > 1 else ''
+
+    offsets.append(os.path.getsize(filename))
+
+    return offsets
 
 class Converter(IJob):
+    '''
+    Base class of the converters.
+    
+    The converters whose frames can be read independently from each other split the conversion of a frame in two:
+    read_frame parses the frame from the input file and write_frame stores it in the output trajectory. When run in
+    parallel, the workers only read and parse the frames, the master writing them in order as they come back. Such
+    converters open their output trajectory through open_output so that the workers do not open it.
+    '''
+    
+    type = None
+
+    checkpointable = False
+    
+    def open_output(self, universe, comment=None):
+        '''
+        Opens the output trajectory of the converter for writing together with its frame generator.
+        
+        :param universe: the universe of the output trajectory
+        :type universe: MMTK.Universe
+        :param comment: if not None, the comment of the output trajectory
+        :type comment: str
+        
+        :return: the output trajectory and its frame generator, (None,None) for the copy of a worker
+        :rtype: 2-tuple
+        '''
+        
+        # The frames read but not written yet because some frames before them are still being read.
+        self._pendingFrames = {}
+        
+        # The memory (in bytes) held by those frames.
+        self._pendingSize = 0
+        
+        # The index of the next frame to write.
+        self._nextFrame = 0
+        
+        if self.isWorker:
+            return None, None
+        
+        return open_output_trajectory(universe, self.configuration['output_file']['files'][0], self.configuration['compression']['value'], comment)
+    
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the input file. This method must neither modify the universe nor the output
+        trajectory and its return value must be picklable.
+        
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the parsed frame
+        :rtype: any picklable object
+        '''
+        
+        raise NotImplementedError
+    
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: any picklable object
+        '''
+        
+        raise NotImplementedError
+    
+    def run_step(self, index):
+        '''
+        Runs a single step of the job, i.e. reads a frame.
+        
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the index of the frame and the parsed frame
+        :rtype: 2-tuple
+        '''
+        
+        return index, self.read_frame(index)
     
-    type = None
\ No newline at end of file
+    def combine(self, index, frame):
+        '''
+        Writes the frames in order as they come back from the workers.
+        
+        The frames that can not be written yet are copied before being kept: their arrays may be views on the shared 
+        memory buffer of a worker that will be overwritten by its next result (see MDANSE.DistributedComputing.SharedMemory).
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: any picklable object
+        '''
+        
+        if index != self._nextFrame:
+            frame = copy_arrays(frame)
+            self._pendingFrames[index] = frame
+            self._pendingSize += nbytes(frame)
+            return
+        
+        self.write_frame(index, frame)
+        self._nextFrame += 1
+        
+        while self._nextFrame in self._pendingFrames:
+            frame = self._pendingFrames.pop(self._nextFrame)
+            self._pendingSize -= nbytes(frame)
+            self.write_frame(self._nextFrame, frame)
+            self._nextFrame += 1
+            
+    def retained_size(self):
+        '''
+        Returns the memory held by the frames waiting for the frames before them.
+        
+        :return: the memory (in bytes) held by the waiting frames
+        :rtype: int
+        '''
+        
+        return self._pendingSize
@@ -38,7 +38,6 @@ import numpy
 from MMTK import Atom, AtomCluster
 from MMTK import Units
 from MMTK.ParticleProperties import Configuration, ParticleVector
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
 from MMTK.Universe import InfiniteUniverse, ParallelepipedicPeriodicUniverse
 
 from MDANSE import ELEMENTS
@@ -182,6 +181,13 @@ class FieldFile(dict):
             [universe.addObject(obj) for obj in self._mmtkObjects]
             
 class HistoryFile(dict):
+    '''
+    A DL_POLY HISTORY file.
+    
+    The records of a HISTORY file have a fixed width. The frames are read from their byte offsets and the
+    non numeric records (timestep and atom labels) are blanked in place such as all the values of the cells,
+    positions, velocities and forces are then decoded at once.
+    '''
     
     def __init__(self, filename, version="2"):
         
@@ -211,9 +217,17 @@ class HistoryFile(dict):
         if self["imcon"] not in range(4):
             raise HistoryFileError("Invalid value for periodic boundary conditions key.")
 
+        # The size of the timestep record of a frame, the cell records following it.
+        self._stepRecordSize = _HISTORY_FORMAT[self["version"]]["reci"] + offset
+
         self._configHeaderSize = _HISTORY_FORMAT[self["version"]]["reci"] + 3*_HISTORY_FORMAT[self["version"]]["recii"] + 4*offset
         
-        self._configSize = (_HISTORY_FORMAT[self["version"]]["reca"] + offset + (self["keytrj"]+1)*(_HISTORY_FORMAT[self["version"]]["recb"]+offset))*self["natms"]
+        # The size of the label record of an atom, the position, velocity and force records following it.
+        self._labelRecordSize = _HISTORY_FORMAT[self["version"]]["reca"] + offset
+
+        self._atomSize = self._labelRecordSize + (self["keytrj"]+1)*(_HISTORY_FORMAT[self["version"]]["recb"]+offset)
+
+        self._configSize = self._atomSize*self["natms"]
 
         self._frameSize = self._configHeaderSize + self._configSize
         
@@ -231,50 +245,85 @@ class HistoryFile(dict):
 
         self._timeStep = float(line[5])
 
-        self._maskStep = 3+3*(self["keytrj"]+1)+1
+        self._nColumns = 3*(self["keytrj"]+1)
+
+        # The factors converting the positions, velocities and forces to MMTK units.
+        self._units = numpy.array([Units.Ang]*3 + [Units.Ang/Units.ps]*3 + [-Units.amu*Units.Ang/Units.ps**2]*3)[:self._nColumns]
         
         self['instance'].seek(0)        
+
+    @property
+    def frame_size(self):
+        '''
+        Returns the size (in bytes) of a frame.
+        
+        :return: the size of a frame
+        :rtype: int
+        '''
+        
+        return self._frameSize
                         
     def read_step(self, step):
+        '''
+        Reads a frame.
+        
+        :param step: the index of the frame
+        :type step: int
         
-        self['instance'].seek(self._headerSize+step*self._frameSize)
+        :return: the time, the cell (in nm) and the positions, velocities and forces of the atoms of the frame
+        :rtype: 3-tuple
+        '''
+        
+        return self.read_steps(step, step+1)[0]
 
-        data = self['instance'].read(self._configHeaderSize).splitlines()
+    def read_steps(self, first, last):
+        '''
+        Reads a range of consecutive frames with a single read and parses them at once.
         
-        line = data[0].split()
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the frame following the last one
+        :type last: int
         
-        currentStep = int(line[1])
+        :return: the time, the cell (in nm) and the positions, velocities and forces of the atoms of each frame
+        :rtype: list of 3-tuples
+        '''
         
-        timeStep = (currentStep - self._firstStep)*self._timeStep
+        nFrames = last - first
         
-        cell = " ".join(data[1:]).split()
-
-        cell = numpy.array(cell,dtype=numpy.float64)
+        self['instance'].seek(self._headerSize+first*self._frameSize)
         
-        cell = numpy.reshape(cell,(3,3))*Units.Ang
-                
-        data = numpy.array(self['instance'].read(self._configSize).split())
+        data = self['instance'].read(nFrames*self._frameSize)
+        if len(data) != nFrames*self._frameSize:
+            raise HistoryFileError("Frames %d to %d are truncated" % (first,last-1))
         
-        mask = numpy.ones((len(data),), dtype=numpy.bool)
-        mask[0::self._maskStep] = False
-        mask[1::self._maskStep] = False
-        mask[2::self._maskStep] = False
-        mask[3::self._maskStep] = False
-                    
-        config = numpy.array(numpy.compress(mask,data),dtype=numpy.float64)
-                
-        config = numpy.reshape(config,(self["natms"],3*(self["keytrj"]+1)))
-                
-        config[:,0:3] *= Units.Ang
+        data = bytearray(data)
         
-        if self["keytrj"] == 1:
-            config[:,3:6] *= Units.Ang/Units.ps
-            
-        elif self["keytrj"] == 2:
-            config[:,3:6] *= Units.Ang/Units.ps
-            config[:,6:9] *= -Units.amu*Units.Ang/Units.ps**2
-
-        return timeStep, cell, config
+        frames = numpy.frombuffer(data, dtype=numpy.uint8).reshape(nFrames,self._frameSize)
+        
+        times = []
+        for f in frames[:,:self._stepRecordSize]:
+            line = f.tostring().split()
+            if not line or line[0] != "timestep":
+                raise HistoryFileError("Bad timestep record in frames %d to %d" % (first,last-1))
+            times.append((int(line[1]) - self._firstStep)*self._timeStep)
+        
+        # Blank the timestep and the atom label records. The remaining records are separated by line terminators.
+        frames[:,:self._stepRecordSize] = ord(" ")
+        frames[:,self._configHeaderSize:].reshape(nFrames,self["natms"],self._atomSize)[:,:,:self._labelRecordSize] = ord(" ")
+        
+        nValues = 9 + self["natms"]*self._nColumns
+        
+        values = numpy.fromstring(str(data), dtype=numpy.float64, sep=" ")
+        if values.size != nFrames*nValues:
+            raise HistoryFileError("Invalid numeric records in frames %d to %d" % (first,last-1))
+        values = values.reshape(nFrames,nValues)
+        
+        cells = values[:,:9].reshape(nFrames,3,3)*Units.Ang
+        
+        configs = values[:,9:].reshape(nFrames,self["natms"],self._nColumns)*self._units
+        
+        return zip(times,cells,configs)
     
     def close(self):
         self["instance"].close()
@@ -298,6 +347,11 @@ class DL_POLYConverter(Converter):
     settings['atom_aliases'] = ('python_object',{'default':{}})
     settings['version'] = ('single_choice', {'choices':_HISTORY_FORMAT.keys(), 'default':'2'})
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
+    settings['running_mode'] = ('running_mode',{})
+    
+    # The maximum size (in bytes) of the block of frames read at once.
+    readSize = 64*1024*1024
                     
     def initialize(self):
         '''
@@ -312,6 +366,10 @@ class DL_POLYConverter(Converter):
 
         # The number of steps of the analysis.
         self.numberOfSteps = self._historyFile['n_frames']
+        
+        # The frames announced by prefetch_steps and those read ahead of their step.
+        self._plannedFrames = set()
+        self._readFrames = {}
                 
         if self._historyFile["imcon"] == 0:
             self._universe = InfiniteUniverse()
@@ -335,23 +393,66 @@ class DL_POLYConverter(Converter):
             self._forces = ParticleVector(self._universe)
             
                         
-        # A MMTK trajectory is opened for writing.
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], mode='w', comment=self._fieldFile["title"])
-
-        # A frame generator is created.
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._trajectory, ["all"], 0, None, 1)])
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = self.open_output(self._universe, self._fieldFile["title"])
+        
+    def prefetch_steps(self, indexes):
+        '''
+        Announces the frames about to be read so that the runs of consecutive frames are read and parsed by blocks. The
+        frames announced or read ahead for the previous chunk and never consumed (e.g. after a stop) are forgotten.
+        
+        :param indexes: the indexes of the frames
+        :type indexes: list of int
+        '''
+        
+        Converter.prefetch_steps(self, indexes)
+        
+        self._readFrames.clear()
+        
+        self._plannedFrames = set(indexes)
+        
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the DL_POLY HISTORY file. The frame is read together with the announced frames
+        following it, up to readSize bytes.
+        
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the parsed frame
+        :rtype: 3-tuple
+        '''
+        
+        frame = self._readFrames.pop(index, None)
+        if frame is not None:
+            return frame
+        
+        maxFrames = max(1,self.readSize//self._historyFile.frame_size)
+        
+        last = index + 1
+        while last in self._plannedFrames and last - index < maxFrames:
+            last += 1
+            
+        frames = self._historyFile.read_steps(index, last)
+        
+        self._readFrames.update(zip(range(index+1,last),frames[1:]))
         
-    def run_step(self, index):
-        """Runs a single step of the job.
+        self._plannedFrames.difference_update(range(index,last))
         
-        @param index: the index of the step.
-        @type index: int.
+        return frames[0]
 
-        @note: the argument index is the index of the loop note the index of the frame.      
-        """
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: 3-tuple
+        '''
                                                 
         # The x, y and z values of the current frame.
-        time, cell, config = self._historyFile.read_step(index)
+        time, cell, config = frame
         
         # If the universe is periodic set its shape with the current dimensions of the unit cell.
         if self._universe.is_periodic:
@@ -373,19 +474,6 @@ class DL_POLYConverter(Converter):
                                         
         # Store a snapshot of the current configuration in the output trajectory.
         self._snapshot(data=data)
-                                                                        
-        return index, None
-        
-    def combine(self, index, x):
-        """
-        @param index: the index of the step.
-        @type index: int.
-        
-        @param x:
-        @type x: any.
-        """
-        
-        pass
     
     def finalize(self):
         """
@@ -38,7 +38,6 @@ import numpy
 
 from MMTK import Units
 from MMTK.ParticleProperties import Configuration, ParticleVector
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.Converters.Converter import Converter
 from MDANSE.Framework.Jobs.Converters.MaterialsStudio import XTDFile
@@ -238,6 +237,8 @@ class DiscoverConverter(Converter):
     settings['xtd_file'] = ('input_file',{})
     settings['his_file'] = ('input_file',{})
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
+    settings['running_mode'] = ('running_mode',{})
     
     def initialize(self):
         '''
@@ -268,23 +269,34 @@ class DiscoverConverter(Converter):
         
         self._universe.foldCoordinatesIntoBox()
             
-        # A MMTK trajectory is opened for writing.
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], mode='w', comment=self._hisfile["title"])
-
-        # A frame generator is created.
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._trajectory, ["all"], 0, None, 1)])
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = self.open_output(self._universe, self._hisfile["title"])
+        
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the Discover his file.
         
-    def run_step(self, index):
-        """Runs a single step of the job.
+        :param index: the index of the frame
+        :type index: int
         
-        @param index: the index of the step.
-        @type index: int.
+        :return: the parsed frame
+        :rtype: 4-tuple
+        '''
+        
+        return self._hisfile.read_step(index)
 
-        @note: the argument index is the index of the loop note the index of the frame.      
-        """
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: 4-tuple
+        '''
                                                 
         # The x, y and z values of the current frame.
-        time, cell, config, vel = self._hisfile.read_step(index)
+        time, cell, config, vel = frame
         
         # If the universe is periodic set its shape with the current dimensions of the unit cell.
         if self._universe.is_periodic:
@@ -303,19 +315,6 @@ class DiscoverConverter(Converter):
 
         # Store a snapshot of the current configuration in the output trajectory.
         self._snapshot(data=data)
-                                                                        
-        return index, None
-        
-    def combine(self, index, x):
-        """
-        @param index: the index of the step.
-        @type index: int.
-        
-        @param x:
-        @type x: any.
-        """
-        
-        pass
     
     def finalize(self):
         """
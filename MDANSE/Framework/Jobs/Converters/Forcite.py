@@ -37,7 +37,6 @@ import numpy
 
 from MMTK import Units
 from MMTK.ParticleProperties import ParticleVector
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
 
 from MDANSE.Externals.magnitude.magnitude import mg
 from MDANSE.Framework.Jobs.Converters.Converter import Converter
@@ -288,6 +287,8 @@ class ForciteConverter(Converter):
     settings['xtd_file'] = ('input_file',{})
     settings['trj_file'] = ('input_file',{})
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
+    settings['running_mode'] = ('running_mode',{})
                 
     def initialize(self):
         '''
@@ -316,23 +317,34 @@ class ForciteConverter(Converter):
             self._forces = ParticleVector(self._universe)
             self._forces.array[:,:] = 0.00
 
-        # A MMTK trajectory is opened for writing.
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], mode='w', comment=self._trjfile["title"])
-
-        # A frame generator is created.
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._trajectory, ["all"], 0, None, 1)])
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = self.open_output(self._universe, self._trjfile["title"])
                 
-    def run_step(self, index):
-        """Runs a single step of the job.
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the Forcite trj file.
         
-        @param index: the index of the step.
-        @type index: int.
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the parsed frame
+        :rtype: 5-tuple
+        '''
+        
+        return self._trjfile.read_step(index)
 
-        @note: the argument index is the index of the loop note the index of the frame.      
-        """
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: 5-tuple
+        '''
                                                 
         # The x, y and z values of the current frame.
-        time, cell, xyz, vel, forces = self._trjfile.read_step(index)
+        time, cell, xyz, vel, forces = frame
         
         # If the universe is periodic set its shape with the current dimensions of the unit cell.
         if self._universe.is_periodic and self._trjfile["defcel"]:
@@ -356,19 +368,6 @@ class ForciteConverter(Converter):
 
         # Store a snapshot of the current configuration in the output trajectory.
         self._snapshot(data=data)
-                                                                        
-        return index, None
-        
-    def combine(self, index, x):
-        """
-        @param index: the index of the step.
-        @type index: int.
-        
-        @param x:
-        @type x: any.
-        """
-        
-        pass
     
     def finalize(self):
         """
@@ -37,12 +37,11 @@ import numpy
 
 from MMTK import Atom, AtomCluster
 from MMTK import Units
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
 from MMTK.Universe import ParallelepipedicPeriodicUniverse
 
 from MDANSE import ELEMENTS
 from MDANSE.Core.Error import Error
-from MDANSE.Framework.Jobs.Converters.Converter import Converter
+from MDANSE.Framework.Jobs.Converters.Converter import Converter, index_frames
 from MDANSE.Mathematics.Graph import Graph
 
 class LAMMPSConfigFileError(Error):
@@ -131,79 +130,114 @@ class LAMMPSConverter(Converter):
     settings['config_file'] = ('input_file', {'label':"LAMMPS configuration file"})
     settings['trajectory_file'] = ('input_file', {'label':"LAMMPS trajectory file"})
     settings['time_step'] = ('float', {'label':"time step (fs)", 'default':1.0, 'mini':1.0e-9})        
-    settings['n_steps'] = ('integer', {'label':"number of time steps", 'default':1, 'mini':0})        
+    settings['n_steps'] = ('integer', {'label':"number of time steps (0 for all)", 'default':0, 'mini':0})        
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
+    settings['running_mode'] = ('running_mode',{})
     
     def initialize(self):
         '''
         Initialize the job.
         '''
                 
-        # The number of steps of the analysis.
-        self.numberOfSteps = self.configuration["n_steps"]["value"]
-        
         self._lammpsConfig = LAMMPSConfigFile(self.configuration["config_file"]["value"])
         
         self.parse_first_step()
         
-        # A MMTK trajectory is opened for writing.
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], mode='w')
-
-        self._nameToIndex = dict([(at.name,at.index) for at in self._universe.atomList()])
-
-        # A frame generator is created.
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._trajectory, ["all"], 0, None, 1)])
-
-        self._lammps.seek(0,0)
-
-        self._start = 0
+        # The byte offsets of the frames, the last one being the size of the file. The workers get them from the master.
+        if not self.isWorker:
+            self._offsets = index_frames(self.configuration["trajectory_file"]["value"], "ITEM: TIMESTEP")
+        
+        # The number of steps of the analysis. By default, all the frames are converted.
+        nFrames = len(self._offsets) - 1
+        nSteps = self.configuration["n_steps"]["value"]
+        self.numberOfSteps = nFrames if nSteps <= 0 else min(nSteps,nFrames)
+        
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = self.open_output(self._universe)
 
-    def run_step(self, index):
-        """Runs a single step of the job.
+        nameToIndex = dict([(at.name,at.index) for at in self._universe.atomList()])
         
-        @param index: the index of the step.
-        @type index: int.
+        # The permutation from the LAMMPS atom ids (starting at 0) to the indexes of the atoms in the universe.
+        self._idToIndex = numpy.zeros((max(self._idToName)+1,), dtype=numpy.int32) - 1
+        for idx, name in self._idToName.items():
+            self._idToIndex[idx] = nameToIndex[name]
 
-        @note: the argument index is the index of the loop note the index of the frame.      
-        """
+    def worker_data(self):
+        '''
+        Returns the index of the frames so that the workers do not scan the trajectory file again.
+        '''
+        
+        return {'_offsets' : self._offsets}
+                        
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the LAMMPS trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the time step, the cell parameters and the coordinates of the atoms ordered as in the universe
+        :rtype: 3-tuple
+        '''
+        
+        self._lammps.seek(self._offsets[index])
+        data = self._lammps.read(self._offsets[index+1] - self._offsets[index])
+        
+        atomsPosition = data.find("ITEM: ATOMS")
+        if atomsPosition == -1:
+            raise LAMMPSTrajectoryFileError("No atoms found in frame %d" % index)
+        
+        lines = data[:atomsPosition].splitlines()
+        timeStep = None
+        cellLines = None
+        for i, line in enumerate(lines):
+            if line.startswith("ITEM: TIMESTEP"):
+                timeStep = float(lines[i+1])
+            elif line.startswith("ITEM: BOX BOUNDS"):
+                cellLines = lines[i+1:i+4]
+        
+        if timeStep is None or cellLines is None or len(cellLines) != 3:
+            raise LAMMPSTrajectoryFileError("Bad header for frame %d" % index)
+        
+        # The whole ATOMS block is parsed at once. The keywords line is skipped.
+        block = data[data.index("\n",atomsPosition)+1:]
+        fields = numpy.fromstring(block, dtype=numpy.float64, sep=" ")
+        # Slower path for the dumps with non numeric columns (e.g. element).
+        if fields.size != self._nAtoms*self._nColumns:
+            fields = numpy.array(block.split())
+            if fields.size != self._nAtoms*self._nColumns:
+                raise LAMMPSTrajectoryFileError("Bad number of atom fields in frame %d" % index)
+        fields = fields.reshape(self._nAtoms,self._nColumns)
+        
+        coordinates = numpy.empty((self._nAtoms,3), dtype=numpy.float64)
+        coordinates[self._idToIndex[fields[:,self._id].astype(numpy.int64) - 1],:] = fields[:,[self._x,self._y,self._z]].astype(numpy.float64)
+        
+        return timeStep, self.parse_cell(cellLines), coordinates
 
-        for _ in range(self._itemsPosition["TIMESTEP"][0]):
-            line = self._lammps.readline()
-            if not line:
-                return index, None
+    def parse_cell(self, lines):
+        '''
+        Parses the BOX BOUNDS lines of a frame.
+        
+        :param lines: the 3 lines following the ITEM: BOX BOUNDS line
+        :type lines: list of str
+        
+        :return: the cell parameters in nm
+        :rtype: numpy.ndarray
+        '''
 
-        timeStep = Units.fs*float(self._lammps.readline())*self.configuration['time_step']['value']
+        bounds = []
+        for line, vector in zip(lines,"ABC"):
+            temp = [float(v) for v in line.split()]
+            if len(temp) == 2:
+                temp.append(0.0)
+            elif len(temp) != 3:
+                raise LAMMPSTrajectoryFileError("Bad format for %s vector components" % vector)
+            bounds.append(temp)
 
-        for _ in range(self._itemsPosition["TIMESTEP"][1], self._itemsPosition["BOX BOUNDS"][0]):
-            self._lammps.readline()
+        (xlo, xhi, xy), (ylo, yhi, xz), (zlo, zhi, yz) = bounds
 
         abcVectors = numpy.zeros((9), dtype=numpy.float64)
-        temp = [float(v) for v in self._lammps.readline().split()]
-        if len(temp) == 2:
-            xlo, xhi = temp
-            xy = 0.0
-        elif len(temp) == 3:
-            xlo, xhi, xy = temp
-        else:
-            raise LAMMPSTrajectoryFileError("Bad format for A vector components")
-
-        temp = [float(v) for v in self._lammps.readline().split()]
-        if len(temp) == 2:
-            ylo, yhi = temp
-            xz = 0.0
-        elif len(temp) == 3:
-            ylo, yhi, xz = temp
-        else:
-            raise LAMMPSTrajectoryFileError("Bad format for B vector components")
-
-        temp = [float(v) for v in self._lammps.readline().split()]
-        if len(temp) == 2:
-            zlo, zhi = temp
-            yz = 0.0
-        elif len(temp) == 3:
-            zlo, zhi, yz = temp
-        else:
-            raise LAMMPSTrajectoryFileError("Bad format for C vector components")
                       
         # The ax component.                                      
         abcVectors[0] = xhi - xlo
@@ -218,23 +252,31 @@ class LAMMPSConverter(Converter):
         abcVectors[8] = zhi - zlo
 
         abcVectors *= Units.Ang
+        
+        return abcVectors
 
-        for _ in range(self._itemsPosition["BOX BOUNDS"][1], self._itemsPosition["ATOMS"][0]):
-            self._lammps.readline()
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
+        
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: 3-tuple
+        '''
+
+        timeStep, abcVectors, coordinates = frame
+
+        timeStep = Units.fs*timeStep*self.configuration['time_step']['value']
 
         self._universe.setCellParameters(abcVectors)
 
         conf = self._universe.configuration()
 
-        for i,_ in enumerate(range(self._itemsPosition["ATOMS"][0], self._itemsPosition["ATOMS"][1])):
-            temp = self._lammps.readline().split()
-            idx = self._nameToIndex[self._rankToName[i]]
-            conf.array[idx,:] = numpy.array([temp[self._x],temp[self._y],temp[self._z]],dtype=numpy.float64)
-
         if self._fractionalCoordinates:
-            conf.array = self._universe._boxToRealPointArray(conf.array)
+            conf.array[:] = self._universe._boxToRealPointArray(coordinates)
         else:
-            conf.array *= Units.Ang
+            conf.array[:] = coordinates*Units.Ang
             
         # The whole configuration is folded in to the simulation box.
         self._universe.foldCoordinatesIntoBox()
@@ -242,21 +284,6 @@ class LAMMPSConverter(Converter):
         # A snapshot is created out of the current configuration.
         self._snapshot(data = {'time': timeStep})
 
-        self._start += self._last
-        
-        return index, None
-
-    def combine(self, index, x):
-        """
-        @param index: the index of the step.
-        @type index: int.
-        
-        @param x:
-        @type x: any.
-        """
-
-        pass
-
     def finalize(self):
         """
         Finalize the job.
@@ -264,7 +291,8 @@ class LAMMPSConverter(Converter):
         
         self._lammps.close()
 
-        if self._lammpsConfig["n_bonds"] is not None:
+        # The bonds are only stored in the NetCDF output trajectories.
+        if self._lammpsConfig["n_bonds"] is not None and hasattr(self._trajectory, "trajectory"):
             netcdf = self._trajectory.trajectory.file
             netcdf.createDimension("MDANSE_NBONDS",self._lammpsConfig["n_bonds"])
             netcdf.createDimension("MDANSE_TWO",2)
@@ -276,33 +304,23 @@ class LAMMPSConverter(Converter):
                         
     def parse_first_step(self):
 
-        self._lammps = open(self.configuration["trajectory_file"]["value"], 'r')        
-
-        self._itemsPosition = collections.OrderedDict()
+        self._lammps = open(self.configuration["trajectory_file"]["value"], 'rb')        
 
         self._universe = None
-        comp = -1
 
         while True:
 
             line = self._lammps.readline()
-            comp += 1
 
             if not line:
                 break
 
-            if line.startswith("ITEM: TIMESTEP"):
-                self._itemsPosition["TIMESTEP"] = [comp+1, comp+2]
-                continue
-
-            elif line.startswith("ITEM: BOX BOUNDS"):
-                self._itemsPosition["BOX BOUNDS"] = [comp+1, comp+4]
-                continue
-
-            elif line.startswith("ITEM: ATOMS"):
+            if line.startswith("ITEM: ATOMS"):
                 
                 keywords = line.split()[2:]
                 
+                self._nColumns = len(keywords)
+                
                 self._id = keywords.index("id")
                 self._type = keywords.index("type")
                 
@@ -323,17 +341,16 @@ class LAMMPSConverter(Converter):
                 else:
                     self._fractionalCoordinates = False
                     
-                self._rankToName = {}
+                self._idToName = {}
                 
                 g = Graph()
                 self._universe = ParallelepipedicPeriodicUniverse()
-                self._itemsPosition["ATOMS"] = [comp+1,comp+self._nAtoms+1]                                
                 for i in range(self._nAtoms):
                     temp = self._lammps.readline().split()
                     idx = int(temp[self._id])-1
                     ty = temp[self._type]
                     name = "%s%s" % (self._lammpsConfig["elements"][ty],idx)
-                    self._rankToName[i] = name
+                    self._idToName[idx] = name
                     g.add_node(idx, element=self._lammpsConfig["elements"][ty], name=name)
                     
                 if self._lammpsConfig["n_bonds"] is not None:
@@ -355,11 +372,9 @@ class LAMMPSConverter(Converter):
                         obj = AtomCluster(atList, name=name)
                         
                     self._universe.addObject(obj)
-                self._last = comp + self._nAtoms + 1
 
                 break
                     
             elif line.startswith("ITEM: NUMBER OF ATOMS"):
                 self._nAtoms = int(self._lammps.readline())
-                comp += 1
-                continue            
\ No newline at end of file
+                continue
@@ -0,0 +1,146 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import collections
+import os
+
+import numpy
+
+from MDANSE import PLATFORM
+from MDANSE.Framework.Jobs.Converters.Converter import Converter
+from MDANSE.MolecularDynamics.MemoryMappedTrajectory import MemoryMappedTrajectoryWriter
+from MDANSE.MolecularDynamics.Trajectory import read_configuration
+
+class MemoryMappedConverter(Converter):
+    """
+    Converts a MMTK trajectory to a memory mapped trajectory (see MDANSE.MolecularDynamics.MemoryMappedTrajectory).
+    
+    All the numeric variables of the trajectory are converted. The per-atom variables are stored in the selected precision.
+    """
+    
+    type = 'mmap'
+    
+    label = "Memory Mapped Trajectory"
+
+    category = ('Converters',)
+    
+    ancestor = "mmtk_trajectory"
+    
+    settings = collections.OrderedDict()
+    settings['trajectory'] = ('mmtk_trajectory',{})
+    settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
+    settings['precision'] = ('single_choice', {'choices':['float32','float64'], 'default':'float32'})
+    settings['output_directory'] = ('output_directory', {})
+    settings['basename'] = ('string', {'default':'output', 'acceptNullString':False})
+    
+    def initialize(self):
+        """
+        Initialize the input parameters and analysis self variables
+        """
+        
+        self.numberOfSteps = self.configuration['frames']['number']
+        
+        trajectory = self.configuration['trajectory']['instance']
+        
+        firstFrame = self.configuration['frames']['value'][0]
+        
+        # The shape of a frame of each variable is taken from the first frame.
+        self._variables = collections.OrderedDict()
+        for name in trajectory.variables():
+            if name == 'box_size':
+                continue
+            value = read_configuration(trajectory, firstFrame, name)
+            try:
+                value = numpy.asarray(getattr(value, 'array', value), dtype=numpy.float64)
+            except (TypeError,ValueError):
+                continue
+            self._variables[name] = value.shape
+        
+        if not 'time' in self._variables:
+            self._variables['time'] = ()
+
+        cell = read_configuration(trajectory, firstFrame).cell_parameters
+        if cell is not None:
+            self._variables['box_size'] = numpy.shape(cell)
+        
+        PLATFORM.create_directory(self.configuration['output_directory']['value'])
+        
+        self._filename = os.path.join(self.configuration['output_directory']['value'], self.configuration['basename']['value'] + '.mdt')
+        
+        self._writer = MemoryMappedTrajectoryWriter(self._filename,
+                                                    self.configuration['trajectory']['universe'],
+                                                    self.numberOfSteps,
+                                                    self._variables,
+                                                    self.configuration['precision']['value'])
+                
+    def run_step(self, index):
+        """
+        Runs a single step of the job.\n
+ 
+        :Parameters:
+            #. index (int): The index of the step.
+        :Returns:
+            #. index (int): The index of the step. 
+            #. values (dict): the values of the variables for the frame of the step
+        """
+        
+        trajectory = self.configuration['trajectory']['instance']
+        
+        frameIndex = self.configuration['frames']['value'][index]
+        
+        values = {'time' : self.configuration['frames']['time'][index]}
+        
+        for name in self._variables:
+            if name in ('box_size','time'):
+                continue
+            value = read_configuration(trajectory, frameIndex, name)
+            if name == 'configuration' and 'box_size' in self._variables:
+                values['box_size'] = value.cell_parameters
+            values[name] = getattr(value, 'array', value)
+            
+        return index, values
+    
+    def combine(self, index, x):
+        """
+        Writes the frame of a step to the memory mapped trajectory.
+        
+        :Parameters:
+            #. index (int): The index of the step.\n
+            #. x (dict): The returned result(s) of run_step
+        """
+        
+        self._writer.write_frame(index, x)
+    
+    def finalize(self):
+        """
+        Finalizes the calculations (e.g. averaging the total term, output files creations ...).
+        """ 
+        
+        self._writer.close()
@@ -32,11 +32,120 @@ Created on Apr 10, 2015
 
 import collections
 
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
+import numpy
+
+from MMTK import Units
 from MMTK.PDB import PDBFile
-from MMTK.ParticleProperties import Configuration
 
+from MDANSE.Core.Error import Error
 from MDANSE.Framework.Jobs.Converters.Converter import Converter
+from MDANSE.MolecularDynamics.Trajectory import open_output_trajectory
+
+class PDBConverterError(Error):
+    pass
+
+class PDBModelReader(object):
+    '''
+    Reads the coordinates of the successive models of a PDB file in a single pass over the file.
+    
+    As for MMTK.PDB.PDBFile, the model n is the one whose MODEL record has the serial number n, the model 0 being the first
+    model of the file. The models are expected to be read by increasing numbers, otherwise the file is read again from its
+    beginning.
+    '''
+    
+    def __init__(self, filename, alternate_code='A'):
+        '''
+        :param filename: the name of the PDB file
+        :type filename: str
+        :param alternate_code: the alternate location of the atoms to read, the other ones being skipped
+        :type alternate_code: str
+        '''
+        
+        self._filename = filename
+        
+        self._alternateCodes = (' ',alternate_code)
+        
+        self._file = None
+        
+        self.rewind()
+        
+    def rewind(self):
+        '''
+        Restarts the reading from the beginning of the file.
+        '''
+        
+        if self._file is not None:
+            self._file.close()
+        
+        self._file = open(self._filename, 'r')
+        
+        # The serial number of the last model read, None if no model has been read yet.
+        self._serial = None
+        
+    def _next_model(self):
+        '''
+        Reads the next model of the file.
+        
+        :return: the serial number of the model and the coordinates (in nm) of its atoms in the order of the file, None at the end of the file
+        :rtype: 2-tuple
+        '''
+        
+        serial = None
+        coordinates = []
+        
+        for line in self._file:
+            record = line[:6]
+            if record.startswith('MODEL'):
+                serial = int(line[6:].split()[0])
+            elif record in ('ATOM  ','HETATM'):
+                if line[16] in self._alternateCodes:
+                    coordinates.append(line[30:38])
+                    coordinates.append(line[38:46])
+                    coordinates.append(line[46:54])
+            # ENDMDL or END records.
+            elif record.startswith('END'):
+                if coordinates:
+                    break
+                
+        if not coordinates:
+            return None
+        
+        # The files without MODEL records hold a single model.
+        if serial is None:
+            serial = 1 if self._serial is None else self._serial + 1
+            
+        # The fixed width fields are parsed at once.
+        coordinates = numpy.fromstring(" ".join(coordinates), dtype=numpy.float64, sep=" ")
+                
+        self._serial = serial
+        
+        return serial, numpy.reshape(coordinates,(-1,3))*Units.Ang
+    
+    def read_model(self, number):
+        '''
+        Reads a model of the PDB file.
+        
+        :param number: the serial number of the model, 0 for the first model of the file
+        :type number: int
+        
+        :return: the coordinates (in nm) of the atoms of the model in the order of the file
+        :rtype: numpy.ndarray
+        '''
+        
+        if number == 0 or (self._serial is not None and number <= self._serial):
+            self.rewind()
+            
+        while True:
+            model = self._next_model()
+            if model is None:
+                raise PDBConverterError("Model %d not found in %r" % (number,self._filename))
+            serial, coordinates = model
+            if number == 0 or serial == number:
+                return coordinates
+            
+    def close(self):
+        
+        self._file.close()
 
 class PDBConverter(Converter):
     """
@@ -55,6 +164,7 @@ class PDBConverter(Converter):
     settings['nb_frame'] = ('range', {'valueType':int, 'includeLast':True, 'mini':0.0, 'default':(0,1,1)})
     settings['time_step'] = ('float', {'mini':1.0e-6, 'default':1.0})
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
      
     def initialize(self):
         """
@@ -73,11 +183,24 @@ class PDBConverter(Converter):
         # Construct system
         self._universe.addObject(pdb_config.createAll(None, 1))
         
-        # Open the new trajectory 
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], "w", "Converted from PDB")
+        self._pdbReader = PDBModelReader(self.configuration['pdb_file']['filename'])
         
-        # Make a snapshot generator for saving.
-        self._snapshot = SnapshotGenerator(self._universe,actions = [TrajectoryOutput(self._trajectory, None, 0, None, 1)])
+        # MMTK may not store the atoms in the order of the file. The atoms of the first model are matched by position.
+        coordinates = self._pdbReader.read_model(0)
+        
+        records = collections.defaultdict(list)
+        for i, xyz in enumerate(numpy.round(coordinates/Units.Ang,3)):
+            records[tuple(xyz)].append(i)
+            
+        self._recordIndexes = numpy.empty((self._universe.numberOfAtoms(),), dtype=numpy.int32)
+        for i, xyz in enumerate(numpy.round(self._universe.configuration().array/Units.Ang,3)):
+            try:
+                self._recordIndexes[i] = records[tuple(xyz)].pop(0)
+            except IndexError:
+                raise PDBConverterError("The atoms of the universe could not be matched to the records of %r" % self.configuration['pdb_file']['filename'])
+        
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = open_output_trajectory(self._universe, self.configuration['output_file']['files'][0], self.configuration['compression']['value'], "Converted from PDB", variables=None)
         
     def run_step(self, index):
         """
@@ -91,12 +214,10 @@ class PDBConverter(Converter):
     
         frame = self.frame_list[index]
 
-        pdb_config = PDBFile(self.configuration['pdb_file']['filename'], model = frame)
-        uni = pdb_config.createUnitCellUniverse()
-        uni.addObject(pdb_config.createAll(None, 1))
-        univ_config  = Configuration(self._universe, uni.configuration().array)
+        coordinates = self._pdbReader.read_model(frame)
         
-        self._universe.setConfiguration(univ_config)
+        # The configuration of the universe is updated in place.
+        self._universe.configuration().array[:,:] = coordinates[self._recordIndexes,:]
         self._universe.foldCoordinatesIntoBox()
         self._snapshot(data = {'time':frame})
 
@@ -112,5 +233,7 @@ class PDBConverter(Converter):
         """
         Finalizes the calculations (e.g. averaging the total term, output files creations ...).
         """ 
+        self._pdbReader.close()
+        
         # Close the output trajectory.
         self._trajectory.close()
@@ -37,7 +37,6 @@ import numpy
 from MMTK import Atom
 from MMTK import Units
 from MMTK.ParticleProperties import Configuration
-from MMTK.Trajectory import Trajectory, SnapshotGenerator, TrajectoryOutput
 from MMTK.Universe import ParallelepipedicPeriodicUniverse
 
 from MDANSE.Core.Error import Error
@@ -131,6 +130,8 @@ class VASPConverter(Converter):
     settings['xdatcar_file'] = ('input_file',{})
     settings['time_step'] = ('float', {'label':"time step", 'default':1.0, 'mini':1.0e-9})        
     settings['output_file'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
+    settings['running_mode'] = ('running_mode',{})
                 
     def initialize(self):
         '''
@@ -149,25 +150,33 @@ class VASPConverter(Converter):
             for i in range(number):
                 self._universe.addObject(Atom(symbol, name="%s_%d" % (symbol,i)))        
 
-        # A MMTK trajectory is opened for writing.
-        self._trajectory = Trajectory(self._universe, self.configuration['output_file']['files'][0], mode='w')
+        # The output trajectory is opened for writing together with its frame generator.
+        self._trajectory, self._snapshot = self.open_output(self._universe)
 
-        # A frame generator is created.
-        self._snapshot = SnapshotGenerator(self._universe, actions = [TrajectoryOutput(self._trajectory, ["all"], 0, None, 1)])
-
-    def run_step(self, index):
-        """Runs a single step of the job.
+    def read_frame(self, index):
+        '''
+        Reads and parses a frame of the XDATCAR file.
         
-        @param index: the index of the step.
-        @type index: int.
-
-        @note: the argument index is the index of the loop note the index of the frame.      
-        """
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the parsed frame
+        :rtype: numpy.ndarray
+        '''
+        
+        return self._xdatcarFile.read_step(index)
 
-        # Read the current step in the xdatcar file.
-        config = self._xdatcarFile.read_step(index)
+    def write_frame(self, index, frame):
+        '''
+        Stores a frame parsed by read_frame in the output trajectory.
         
-        conf = Configuration(self._universe,config)
+        :param index: the index of the frame
+        :type index: int
+        :param frame: the parsed frame
+        :type frame: numpy.ndarray
+        '''
+
+        conf = Configuration(self._universe,frame)
         
         conf.convertFromBoxCoordinates()
         
@@ -181,19 +190,6 @@ class VASPConverter(Converter):
         # A call to the snapshot generator produces the step corresponding to the current frame.
         self._snapshot(data = {'time': time})
 
-        return index, None
-
-    def combine(self, index, x):
-        """
-        @param index: the index of the step.
-        @type index: int.
-        
-        @param x:
-        @type x: any.
-        """
-
-        pass
-
     def finalize(self):
         """
         Finalize the job.
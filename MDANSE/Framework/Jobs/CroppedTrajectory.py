@@ -36,11 +36,16 @@ from MMTK.Collections import Collection
 from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import sorted_atoms, read_frame
+from MDANSE.MolecularDynamics.VirtualTrajectory import write_virtual_trajectory, VirtualTrajectory
 
 class CroppedTrajectory(IJob):
     """
     Crop a trajectory as well in term of universe contents as in trajectory length..
+    
+    If the virtual option is set, no trajectory is written: a virtual trajectory file (.mvt) referencing the frames and 
+    atoms of the input trajectory is written instead (see MDANSE.MolecularDynamics.VirtualTrajectory). It takes the 
+    basename of the output files with a .mvt extension and can be used as the input trajectory of any analysis.
     """
     
     type = 'ct'
@@ -51,17 +56,29 @@ class CroppedTrajectory(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    checkpointable = False
+
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
     settings['atom_selection'] = ('atom_selection',{'dependencies':{'trajectory':'trajectory'}})
     settings['output_files'] = ('output_files', {'formats':["netcdf"]})
+    settings['virtual'] = ('boolean', {'label':'write a virtual trajectory', 'default':False})
                 
     def initialize(self):
         """
         Initialize the input parameters and analysis self variables
         """
 
+        if self.configuration['virtual']['value']:
+            # The virtual trajectory file is written at once by finalize.
+            self.numberOfSteps = 1
+            # The output file reported by the job is the virtual trajectory file, not the declared netcdf one.
+            self.configuration['output_files']['files'] = [self.configuration['output_files']['root'] + '.mvt']
+            return
+
         self.numberOfSteps = self.configuration['frames']['number']
                 
         atoms = sorted_atoms(self.configuration['trajectory']['instance'].universe)
@@ -89,11 +106,14 @@ class CroppedTrajectory(IJob):
             #. None
         """
 
+        if self.configuration['virtual']['value']:
+            return index, None
+
         # get the Frame index
         frameIndex = self.configuration['frames']['value'][index]
               
         # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
                                         
         # The times corresponding to the running index.
         t = self.configuration['frames']['time'][index]
@@ -116,8 +136,35 @@ class CroppedTrajectory(IJob):
         """
         Finalizes the calculations (e.g. averaging the total term, output files creations ...).
         """ 
+        if self.configuration['virtual']['value']:
+            self._write_virtual_trajectory()
+            
         # The input trajectory is closed.
         self.configuration['trajectory']['instance'].close()
+        
+        if self.configuration['virtual']['value']:
+            return
                                                     
         # The output trajectory is closed.
         self._ct.close()   
+
+    def _write_virtual_trajectory(self):
+        """
+        Writes the virtual trajectory file of the crop.
+        """
+        
+        traj = self.configuration['trajectory']['instance']
+        
+        first = self.configuration['frames']['first']
+        last = self.configuration['frames']['last'] + 1
+        step = self.configuration['frames']['step']
+        
+        atoms = self.configuration['atom_selection']['indexes']
+        
+        # A crop of a virtual trajectory is a view on its parent trajectory.
+        if isinstance(traj, VirtualTrajectory):
+            first, last, step = traj.parent_frames(first, last, step)
+            atoms = traj.parent_atoms(atoms)
+            traj = traj.parent
+
+        write_virtual_trajectory(self.configuration['output_files']['files'][0], traj.filename, first, last, step, atoms)
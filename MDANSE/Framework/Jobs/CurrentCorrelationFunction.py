@@ -39,6 +39,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation, normalize, get_spectrum
+from MDANSE.MolecularDynamics.Trajectory import read_configuration
 
 class CurrentCorrelationFunction(IJob):
     """
@@ -106,6 +107,15 @@ class CurrentCorrelationFunction(IJob):
         self._outputData.add("j(q,t)_trans_total","surface", (nQShells,self._nFrames), axis="q|times"    , units="au")                                                 
         self._outputData.add("J(q,f)_trans_total","surface", (nQShells,self._nFrequencies), axis="q|frequency", units="au") 
          
+    def step_costs(self):
+        """
+        Returns the estimated cost of each step, i.e. the number of Q vectors of its shell.
+        """
+        
+        qVectors = self.configuration["q_vectors"]
+        
+        return [qVectors["value"][shell]["n_q_vectors"] if shell in qVectors["value"] else 0 for shell in qVectors["shells"]]
+
     def run_step(self, index):
         """
         Runs a single step of the job.\n
@@ -148,8 +158,8 @@ class CurrentCorrelationFunction(IJob):
 
             # loop over the trajectory time steps
             for i, frame in enumerate(self.configuration['frames']['value']):
-                conf = traj.configuration[frame]
-                vel = traj.velocities[frame]
+                conf = read_configuration(traj, frame)
+                vel = read_configuration(traj, frame, "velocities")
                 
                 for element,idxs in self.configuration['atom_selection']['contents'].items():
                     selectedCoordinates = conf.array[idxs,:]
@@ -34,7 +34,7 @@ import collections
 
 from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob, JobError
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import sorted_atoms, read_frame
 
 class Density(IJob):
     """
@@ -49,6 +49,8 @@ class Density(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -84,7 +86,7 @@ class Density(IJob):
         # get the Frame index
         frameIndex = self.configuration['frames']['value'][index]
                         
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
                 
         cellVolume = self.configuration['trajectory']['instance'].universe.cellVolume()
                 
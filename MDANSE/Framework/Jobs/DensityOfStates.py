@@ -36,7 +36,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation, differentiate, get_spectrum
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class DensityOfStates(IJob):
     """
@@ -69,13 +69,19 @@ class DensityOfStates(IJob):
     settings['weights'] = ('weights',{})
     settings['output_files'] = ('output_files', {'formats':["netcdf","ascii"]})
     settings['running_mode'] = ('running_mode',{})
-    
+    
     def initialize(self):
         """
         Initialize the input parameters and analysis self variables
         """
 
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'],
+                                                    variable=self.configuration['interpolation_order']["variable"])
 
         instrResolution = self.configuration["instrument_resolution"]        
                 
@@ -103,15 +109,7 @@ class DensityOfStates(IJob):
             #. atomicVACF (numpy.array): The calculated velocity auto-correlation function for atom of index=index
         """
 
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]    
-                        
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'],
-                                       variable=self.configuration['interpolation_order']["variable"])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
 
         val = self.configuration["interpolation_order"]["value"]
         
@@ -38,6 +38,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Core.Error import Error
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 class DensityProfileError(Error):
     pass
@@ -54,6 +55,8 @@ class DensityProfile(IJob):
     category = ('Structure',)
     
     ancestor = "mmtk_trajectory"
+
+    frameBased = True
     
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
@@ -105,7 +108,7 @@ class DensityProfile(IJob):
         # get the Frame index
         frameIndex = self.configuration['frames']['value'][index]
                   
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
                         
         conf = self.configuration['trajectory']['instance'].universe.configuration()
 
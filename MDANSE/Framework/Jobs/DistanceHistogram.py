@@ -38,7 +38,7 @@ import numpy
 from MDANSE.Core.Error import Error 
 from MDANSE.Extensions import distance_histogram
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import atomindex_to_moleculeindex
+from MDANSE.MolecularDynamics.Trajectory import atomindex_to_moleculeindex, read_frame, read_lock
 
 class DistanceHistogram(IJob):
     """
@@ -47,6 +47,10 @@ class DistanceHistogram(IJob):
     
     type = None
     
+    threadSafe = True
+
+    frameBased = True
+    
     settings = collections.OrderedDict()    
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -111,17 +115,24 @@ class DistanceHistogram(IJob):
 
         universe = self.configuration['trajectory']['instance'].universe
         
-        universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        # The universe may be shared with other threads: it is locked until the data needed by the step have been copied.
+        with read_lock(self.configuration['trajectory']['instance']):
+        
+            read_frame(self.configuration['trajectory']['instance'], frameIndex, universe)
     
-        directCell = numpy.array(universe.basisVectors()).astype(numpy.float64)
-        reverseCell = numpy.array(universe.reciprocalBasisVectors()).astype(numpy.float64)
+            directCell = numpy.array(universe.basisVectors()).astype(numpy.float64)
+            reverseCell = numpy.array(universe.reciprocalBasisVectors()).astype(numpy.float64)
         
-        cellVolume = universe.cellVolume()
+            cellVolume = universe.cellVolume()
+            
+            config = universe.configuration().array[self.configuration['atom_selection']['indexes'],:]
             
         hIntraTemp = numpy.zeros(self.hIntra.shape, dtype=numpy.float64)
         hInterTemp = numpy.zeros(self.hInter.shape, dtype=numpy.float64)
+        
+        scaleconfig = numpy.zeros(self.scaleconfig.shape, dtype=numpy.float64)
                 
-        distance_histogram.distance_histogram(universe.configuration().array[self.configuration['atom_selection']['indexes'],:],
+        distance_histogram.distance_histogram(config,
                                               directCell,
                                               reverseCell,
                                               self.configuration['atom_selection']['indexes'],
@@ -129,7 +140,7 @@ class DistanceHistogram(IJob):
                                               self.indexToSymbol,
                                               hIntraTemp,
                                               hInterTemp,
-                                              self.scaleconfig,
+                                              scaleconfig,
                                               self.configuration['r_values']['first'],
                                               self.configuration['r_values']['step'])
 
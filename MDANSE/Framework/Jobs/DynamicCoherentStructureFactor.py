@@ -40,6 +40,7 @@ from MDANSE.Core.Error import Error
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation, get_spectrum
+from MDANSE.MolecularDynamics.Trajectory import read_configuration
 
 class DynamicCoherentStructureFactorError(Error):
     pass
@@ -67,6 +68,8 @@ class DynamicCoherentStructureFactor(IJob):
     settings['transmutated_atoms'] = ('atom_transmutation', {'dependencies':{'trajectory':'trajectory',
                                                                                   'atom_selection':'atom_selection'}})
     settings['weights'] = ('weights', {'default':'b_coherent'})
+    settings['loop_order'] = ('single_choice', {'label':"loop order", 'choices':['shells','frames'], 'default':'shells'})
+    settings['frames_block_size'] = ('integer', {'label':"number of frames per block (frames loop order)", 'mini':1, 'default':100})
     settings['output_files'] = ('output_files', {'formats':["netcdf","ascii"]})
     settings['running_mode'] = ('running_mode',{})
     
@@ -81,11 +84,16 @@ class DynamicCoherentStructureFactor(IJob):
         if not self.configuration['q_vectors']['is_lattice']:
             raise DynamicCoherentStructureFactorError('The Q vectors must be generated on a lattice to run %s analysis'%self.label)
         
-        self.numberOfSteps = self.configuration['q_vectors']['n_shells']
-        
         nQShells = self.configuration["q_vectors"]["n_shells"]
 
         self._nFrames = self.configuration['frames']['number']
+
+        self._frameMajor = self.configuration['loop_order']['value'] == 'frames'
+        
+        if self._frameMajor:
+            self.initialize_frame_major()
+        else:
+            self.numberOfSteps = nQShells
         
         self._instrResolution = self.configuration["instrument_resolution"]
         
@@ -107,7 +115,45 @@ class DynamicCoherentStructureFactor(IJob):
 
         self._outputData.add("f(q,t)_total","surface", (nQShells,self._nFrames), axis="q|time", units="au")                                                 
         self._outputData.add("s(q,f)_total","surface", (nQShells,self._nFrequencies), axis="q|frequency", units="nm2/ps") 
+
+    def initialize_frame_major(self):
+        """
+        Initialize the frame-major loop order. In that mode, a step corresponds to a block of frames. Each frame is read 
+        only once and the rho(q,t) of all the Q shells are computed from it. The correlations are performed shell by 
+        shell once all the frames have been processed.
+        """
+
+        traj = self.configuration['trajectory']['instance']
+
+        self._blockSize = self.configuration['frames_block_size']['value']
+
+        self.numberOfSteps = (self._nFrames + self._blockSize - 1)/self._blockSize
+
+        # The Q vectors (in real coordinates) of the shells for which some Q vectors could be generated.
+        self._qVectors = collections.OrderedDict()
+        for index, shell in enumerate(self.configuration["q_vectors"]["shells"]):
+            if not shell in self.configuration["q_vectors"]["value"]:
+                continue
+            qVectors = self.configuration["q_vectors"]["value"][shell]["q_vectors"]
+            self._qVectors[index] = traj.universe._boxToRealPointArray(qVectors.T).T
+
+        # The rho(q,t) of each shell, filled block by block in combine and correlated in finalize. The arrays are 
+        # allocated on first use so that they are not shipped to the slaves in multiprocessor mode.
+        self._rho = {}
  
+    def step_costs(self):
+        """
+        Returns the estimated cost of each step. In the shells loop order, the cost of a step is the number of Q vectors
+        of its shell. In the frames loop order, all the blocks have about the same cost.
+        """
+        
+        if self._frameMajor:
+            return None
+        
+        qVectors = self.configuration["q_vectors"]
+        
+        return [qVectors["value"][shell]["n_q_vectors"] if shell in qVectors["value"] else 0 for shell in qVectors["shells"]]
+
     def run_step(self, index):
         """
         Runs a single step of the job.\n
@@ -119,6 +165,9 @@ class DynamicCoherentStructureFactor(IJob):
             #. rho (numpy.array): The exponential part of I(k,t)
         """
         
+        if self._frameMajor:
+            return self.run_frames_block(index)
+        
         shell = self.configuration["q_vectors"]["shells"][index]
         
         if not shell in self.configuration["q_vectors"]["value"]:
@@ -140,7 +189,7 @@ class DynamicCoherentStructureFactor(IJob):
             # loop over the trajectory time steps
             for i, frame in enumerate(self.configuration['frames']['value']):
                 
-                conf = traj.configuration[frame]
+                conf = read_configuration(traj, frame)
 
                 conf.convertToBoxCoordinates()
 
@@ -150,6 +199,39 @@ class DynamicCoherentStructureFactor(IJob):
 
             return index, rho
     
+    def run_frames_block(self, index):
+        """
+        Computes the rho(q,t) of all the Q shells for a block of frames (frame-major loop order).\n
+ 
+        :Parameters:
+            #. index (int): The index of the frames block.
+        :Returns:
+            #. index (int): The index of the frames block. 
+            #. rho (dict): for each Q shell index, the exponential part of I(k,t) for the frames of the block
+        """
+
+        traj = self.configuration['trajectory']['instance']
+        
+        frames = self.configuration['frames']['value'][index*self._blockSize:(index+1)*self._blockSize]
+        
+        rho = {}
+        for shellIndex, qVectors in self._qVectors.items():
+            rho[shellIndex] = {}
+            for element in self.configuration['atom_selection']['contents'].keys():
+                rho[shellIndex][element] = numpy.zeros((len(frames), qVectors.shape[1]), dtype = numpy.complex64)
+
+        for i, frame in enumerate(frames):
+
+            conf = read_configuration(traj, frame)
+
+            conf.convertToBoxCoordinates()
+
+            for element,idxs in self.configuration['atom_selection']['contents'].items():
+                selectedCoordinates = numpy.take(conf.array, idxs, axis=0)
+                for shellIndex, qVectors in self._qVectors.items():
+                    rho[shellIndex][element][i,:] = numpy.sum(numpy.exp(1j*numpy.dot(selectedCoordinates, qVectors)),axis=0)
+
+        return index, rho
     
     def combine(self, index, x):
         """
@@ -158,9 +240,31 @@ class DynamicCoherentStructureFactor(IJob):
             #. index (int): The index of the step.\n
             #. x (any): The returned result(s) of run_step
         """
+        
+        if x is None:
+            return
+        
+        if self._frameMajor:
+            first = index*self._blockSize
+            for shellIndex, rho in x.items():
+                shellRho = self._rho.setdefault(shellIndex, {})
+                for element, v in rho.items():
+                    if not shellRho.has_key(element):
+                        shellRho[element] = numpy.zeros((self._nFrames, v.shape[1]), dtype = numpy.complex64)
+                    shellRho[element][first:first+v.shape[0],:] = v
+        else:
+            self.correlate(index, x)
+
+    def correlate(self, index, rho):
+        """
+        Computes the partial f(q,t) of a given Q shell out of its rho(q,t).\n
+        :Parameters:
+            #. index (int): The index of the Q shell.\n
+            #. rho (dict): The exponential part of I(k,t) for each selected element
+        """
                
         for pair in self._elementsPairs:
-            corr = correlation(x[pair[0]],x[pair[1]], reduce=1)/x[pair[0]].shape[1]
+            corr = correlation(rho[pair[0]],rho[pair[1]], reduce=1)/rho[pair[0]].shape[1]
             self._outputData["f(q,t)_%s%s" % pair][index,:] += corr
             
     def finalize(self):
@@ -168,6 +272,10 @@ class DynamicCoherentStructureFactor(IJob):
         Finalizes the calculations (e.g. averaging the total term, output files creations ...)
         """
         
+        if self._frameMajor:
+            for shellIndex in sorted(self._rho.keys()):
+                self.correlate(shellIndex, self._rho.pop(shellIndex))
+        
         for pair in self._elementsPairs:
             ni = self.configuration['atom_selection']['n_atoms_per_element'][pair[0]]
             nj = self.configuration['atom_selection']['n_atoms_per_element'][pair[1]]
@@ -38,7 +38,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation, get_spectrum
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class DynamicIncoherentStructureFactor(IJob):
     """
@@ -65,13 +65,18 @@ class DynamicIncoherentStructureFactor(IJob):
     settings['weights']=('weights',{"default" : "b_incoherent"})
     settings['output_files']=('output_files', {"formats":["netcdf","ascii"]})
     settings['running_mode']=('running_mode',{})
-                    
+                    
     def initialize(self):
         """
         Initialize the input parameters and analysis self variables
         """
 
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'])
 
         self._nQShells = self.configuration["q_vectors"]["n_shells"]
 
@@ -96,6 +101,13 @@ class DynamicIncoherentStructureFactor(IJob):
         self._outputData.add("f(q,t)_total","surface", (self._nQShells,self._nFrames)     , axis="q|time", units="au")                                                 
         self._outputData.add("s(q,f)_total","surface", (self._nQShells,self._nFrequencies), axis="q|frequency", units="nm2/ps") 
     
+    def step_costs(self):
+        """
+        Returns the estimated cost of each step, i.e. the number of atoms of its group.
+        """
+        
+        return [len(g) for g in self.configuration['atom_selection']["groups"]]
+
     def run_step(self, index):
         """
         Runs a single step of the job.\n
@@ -107,14 +119,7 @@ class DynamicIncoherentStructureFactor(IJob):
             #. atomicSF (numpy.array): The atomic structure factor
         """
         
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]                                                                          
-                
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
         
         series = self.configuration['projection']["projector"](series)
 
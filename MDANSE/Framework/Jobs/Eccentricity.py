@@ -37,6 +37,7 @@ import numpy
 from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Geometry import center_of_mass
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 class Eccentricity(IJob):
     """
@@ -90,6 +91,8 @@ class Eccentricity(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -142,7 +145,7 @@ class Eccentricity(IJob):
         """
         # get the Frame index
         frameIndex = self.configuration['frames']['value'][index]  
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
         # read frame atoms coordinates                                                                             
         series = self.configuration['trajectory']['instance'].universe.configuration().array
@@ -37,7 +37,7 @@ import numpy
 from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class ElasticIncoherentStructureFactor(IJob):
     """
@@ -81,6 +81,11 @@ class ElasticIncoherentStructureFactor(IJob):
         """
         
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'])
 
         self._nQShells = self.configuration["q_vectors"]["n_shells"]
                 
@@ -104,14 +109,7 @@ class ElasticIncoherentStructureFactor(IJob):
             #. atomicEISF (numpy.array): The atomic elastic incoherent structure factor
         """
 
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]                                                                          
-                
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
         
         series = self.configuration['projection']["projector"](series)
 
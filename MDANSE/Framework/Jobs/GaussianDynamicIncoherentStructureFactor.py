@@ -39,7 +39,7 @@ from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import get_spectrum
 from MDANSE.MolecularDynamics.Analysis import mean_square_displacement
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class GaussianDynamicIncoherentStructureFactor(IJob):
     """
@@ -76,6 +76,11 @@ class GaussianDynamicIncoherentStructureFactor(IJob):
         """
 
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'])
 
         self._nQShells = self.configuration["q_shells"]["number"]
         
@@ -115,14 +120,7 @@ class GaussianDynamicIncoherentStructureFactor(IJob):
             #. atomicSF (numpy.array): The atomic structure factor
         """
 
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]                                                                          
-                
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
         
         series = self.configuration['projection']["projector"](series)
 
@@ -36,7 +36,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class GeneralAutoCorrelationFunction(IJob):
     """
@@ -72,6 +72,12 @@ class GeneralAutoCorrelationFunction(IJob):
 
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
         
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'],
+                                                    variable=self.configuration["trajectory_variable"]["value"])
+        
         # Will store the time.
         self._outputData.add("time","line", self.configuration['frames']['time'], units='ps')
 
@@ -92,14 +98,7 @@ class GeneralAutoCorrelationFunction(IJob):
             #. atomicGACF (numpy.array): the calculated auto-correlation function for the index
         """
 
-        indexes = self.configuration['atom_selection']["groups"][index]
-
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'],
-                                       variable=self.configuration["trajectory_variable"]["value"])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
                 
         atomicGACF = correlation(series,axis=0,reduce=1)
         
@@ -33,10 +33,9 @@ Created on Apr 10, 2015
 import collections
 
 from MMTK.Collections import Collection
-from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import open_output_trajectory, sorted_atoms, read_frame
 
 class GlobalMotionFilteredTrajectory(IJob):
     """
@@ -71,6 +70,10 @@ class GlobalMotionFilteredTrajectory(IJob):
     category = ('Trajectory',)
     
     ancestor = "mmtk_trajectory"
+
+    checkpointable = False
+
+    frameBased = True
         
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
@@ -79,6 +82,7 @@ class GlobalMotionFilteredTrajectory(IJob):
     settings['reference_selection'] = ('atom_selection', {'dependencies':{'trajectory':'trajectory'}})
     settings['contiguous'] = ('boolean', {'default':False, 'label':"Make the chemical object contiguous"})
     settings['output_files'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
     
     def initialize(self):
         """
@@ -103,13 +107,13 @@ class GlobalMotionFilteredTrajectory(IJob):
         self._referenceAtoms = Collection([atoms[ind] for ind in self.configuration['reference_selection']['indexes']])
                         
         # The output trajectory is opened for writing.
-        self._gmft = Trajectory(self._selectedAtoms, self.configuration['output_files']['files'][0], "w")
+        self._gmft, self.snapshot = open_output_trajectory(self.configuration['trajectory']['instance'].universe,
+                                                           self.configuration['output_files']['files'][0],
+                                                           self.configuration['compression']['value'],
+                                                           obj=self._selectedAtoms)
         
         # The title for the trajectory is set. 
         self._gmft.title = self.__class__.__name__
-
-        # Create the snapshot generator.
-        self.snapshot = SnapshotGenerator(self.configuration['trajectory']['instance'].universe, actions = [TrajectoryOutput(self._gmft, "all", 0, None, 1)])
                 
         # This will store the configuration used as the reference for the following step. 
         self._referenceConfig = None
@@ -129,7 +133,7 @@ class GlobalMotionFilteredTrajectory(IJob):
         frameIndex = self.configuration['frames']['value'][index]   
       
         # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
         if self.configuration['contiguous']["value"]:
             # The configuration is made contiguous.
@@ -31,19 +31,25 @@ Created on Mar 30, 2015
 '''
 
 import abc
+import collections
 import glob
 import os
 import random
 import stat
 import string
-import subprocess
 import sys
 
-from MDANSE import LOGGER, PLATFORM, REGISTRY
+import numpy
+
+from MDANSE import LOGGER, PLATFORM, PREFERENCES, REGISTRY
 from MDANSE.Core.Error import Error
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
 from MDANSE.Framework.Configurable import Configurable
+from MDANSE.Framework.Jobs.Checkpoint import Checkpoint, CheckpointError, is_serializable
 from MDANSE.Framework.Jobs.JobStatus import JobStatus
 from MDANSE.Framework.OutputVariables.IOutputVariable import OutputData
+from MDANSE.MolecularDynamics.FrameCache import FRAME_CACHE
+from MDANSE.MolecularDynamics.Trajectory import FramePrefetcher
 
 class JobError(Error):
     pass
@@ -69,6 +75,21 @@ class IJob(Configurable):
     type = "job"
     
     section = "job"
+
+    # Whether or not the job can be resumed from a checkpoint. Jobs writing their output while running their steps can not.
+    checkpointable = True
+    
+    # The attributes set by initialize that are not stored in the checkpoints, e.g. because they can not be pickled.
+    checkpointExcluded = ('_groupsReader',)
+    
+    # Whether or not the steps of the job can be run concurrently by several threads sharing its trajectory and universe.
+    threadSafe = False
+    
+    # Whether or not the step of index i of the job reads the i-th frame of its 'frames' configuration through read_frame.
+    frameBased = False
+    
+    # Whether or not the job is the copy built by a worker of a parallel run (see from_worker_state).
+    isWorker = False
         
     @staticmethod
     def set_name():
@@ -108,6 +129,8 @@ class IJob(Configurable):
             self._status = JobStatus(self)
         else:
             self._status = None
+            
+        self._checkpoint = None
                                 
     def build_documentation(self):
                 
@@ -196,30 +219,6 @@ class IJob(Configurable):
         
         os.chmod(testFile,stat.S_IRWXU)
 
-    @staticmethod
-    def set_pyro_server():
-    
-        import Pyro.errors
-        import Pyro.naming
-    
-        # Gets a Pyro proxy for the name server.
-        locator = Pyro.naming.NameServerLocator()
-    
-        # Try to get an existing name server.        
-        try:
-            ns = locator.getNS()
-            
-        # Otherwise, start a new one.        
-        except Pyro.errors.NamingError:
-            
-            subprocess.Popen([sys.executable, '-O', '-c', "import Pyro.naming; Pyro.naming.main([])"], stdout = subprocess.PIPE)
-            ns = None
-            while ns is None:
-                try:
-                    ns = locator.getNS()
-                except Pyro.errors.NamingError:
-                    pass
-                            
     @property
     def name(self):
         return self._name
@@ -267,6 +266,7 @@ class IJob(Configurable):
         f.write('#######################################################\n\n')
                                     
         # Write the import.
+        f.write("import optparse\n\n")
         f.write("from MDANSE import REGISTRY\n\n")
                         
         f.write('################################################################\n')
@@ -290,8 +290,12 @@ class IJob(Configurable):
     
         # Sets |analysis| variable to an instance analysis to save. 
         f.write('job = REGISTRY[%r][%r](status=False)\n' % ('job',cls.type))
-        f.write('job.setup(parameters)\n')
-        f.write('job.run()')
+        f.write('job.setup(parameters)\n\n')
+        f.write('parser = optparse.OptionParser()\n')
+        f.write("parser.add_option('--resume', action='store_true', default=False, help='Resume the job from its checkpoint.')\n")
+        f.write("parser.add_option('--trace', default=None, help='Write the timing of the job as a JSON trace in that file.')\n")
+        f.write('options, _ = parser.parse_args()\n\n')
+        f.write('job.run(resume=options.resume, trace=options.trace)')
          
         f.close()
         
@@ -352,14 +356,241 @@ class IJob(Configurable):
         
         os.chmod(testFile,stat.S_IRWXU)
         
+    def step_costs(self):
+        """
+        Returns the estimated cost of each step of the job, used to schedule the most expensive steps first when running
+        in parallel. Only the ratios between the costs matter.
+        
+        By default, all the steps are assumed to have the same cost. Jobs whose steps have heterogeneous costs should
+        override this method.
+        
+        :return: the estimated cost of each step, indexed by the step index, or None if all steps have the same cost
+        :rtype: list of float
+        """
+        
+        return None
+
+    def retained_size(self):
+        """
+        Returns the memory held by the results of the steps that have been combined but are still kept by the job, e.g.
+        the frames of a converter waiting for the frames before them. It is counted in the memory budget of the results
+        in flight.
+        
+        :return: the memory (in bytes) held by the kept results
+        :rtype: int
+        """
+        
+        return 0
+
+    def prefetch_steps(self, indexes):
+        """
+        Announces the steps about to be run, in the order they will be run, so that the job can read their data at once.
+        
+        By default, the steps are announced to the groups reader of the job, if any (see 
+        MDANSE.MolecularDynamics.Trajectory.GroupsTrajectoryReader). For the frame-based jobs, the frames of the steps
+        are read ahead by a background thread (see MDANSE.MolecularDynamics.Trajectory.FramePrefetcher).
+        
+        :param indexes: the indexes of the steps
+        :type indexes: list of int
+        """
+        
+        reader = getattr(self, '_groupsReader', None)
+        if reader is not None:
+            reader.prefetch(indexes)
+            
+        if self.frameBased:
+            depth = PREFERENCES.get_preferences_item("prefetch_depth").value
+            if depth > 0 and len(indexes) > 1:
+                frames = self.configuration['frames']['value']
+                FramePrefetcher(self.configuration['trajectory']['instance'], [frames[i] for i in indexes], depth).install()
+
+    def get_checkpoint_state(self):
+        """
+        Returns the state of the job to be stored in a checkpoint.
+        
+        By default, the state is made of the output data and of the attributes of the job, but those listed in 
+        checkpointExcluded. Those attributes must only hold numbers, strings and numpy arrays. Jobs whose combined 
+        results are stored differently should override this method and set_checkpoint_state.
+        
+        :return: the state of the job
+        :rtype: dict
+        """
+        
+        excluded = ('_configuration','_configurators','_configured','_parameters','_status','_checkpoint','_steps','_name','_info')
+        excluded += tuple(self.checkpointExcluded)
+        
+        state = {}
+        for k, v in self.__dict__.items():
+            if k in excluded:
+                continue
+            if isinstance(v, OutputData):
+                state[k] = collections.OrderedDict([(name, numpy.asarray(var)) for name, var in v.items()])
+            elif is_serializable(v):
+                state[k] = v
+            else:
+                raise CheckpointError("The attribute %r of job %r can not be stored in a checkpoint: add it to checkpointExcluded or override get_checkpoint_state" % (k,self.type))
+                
+        return state
+    
+    def set_checkpoint_state(self, state):
+        """
+        Restores the state of the job stored in a checkpoint. The job must have been initialized.
+        
+        The output variables and the numpy arrays are updated in place.
+        
+        :param state: the state of the job as returned by get_checkpoint_state
+        :type state: dict
+        """
+        
+        for k, v in state.items():
+            current = getattr(self, k, None)
+            if isinstance(current, OutputData):
+                for name, value in v.items():
+                    current[name][...] = value
+            elif isinstance(current, numpy.ndarray) and isinstance(v, numpy.ndarray) and current.shape == v.shape:
+                current[...] = v
+            else:
+                setattr(self, k, v)
+
+    def worker_state(self):
+        """
+        Returns what a worker of a parallel run needs to build its own copy of the job.
+        
+        The state is made of the type of the job, of its input parameters, of the configurations that can not be 
+        rebuilt identically from those parameters (e.g. randomly generated Q vectors) and of the data returned by 
+        worker_data. Neither the opened trajectory nor the data derived from it are part of the state: the worker opens 
+        the trajectory by itself.
+        
+        :return: the state of the job for its workers
+        :rtype: 4-tuple
+        """
+        
+        configurations = {}
+        for name, conf in self._configuration.items():
+            if not conf.deterministic:
+                configurations[name] = dict(conf)
+        
+        return (self.type, dict(self._parameters), configurations, self.worker_data())
+
+    def worker_data(self):
+        """
+        Returns the data computed by the master while initializing the job that the workers can reuse instead of 
+        computing it again (e.g. the index of the frames of a large file). The data are set as attributes of the 
+        job of the worker before it is initialized.
+        
+        :return: the data, as a mapping between the name of the attributes and their values
+        :rtype: dict
+        """
+        
+        return {}
+
+    @staticmethod
+    def from_worker_state(state):
+        """
+        Builds and initializes a job from the state returned by worker_state. The job is run in monoprocessor mode.
+        
+        :param state: the state of the job as returned by worker_state
+        :type state: 4-tuple
+        
+        :return: the job
+        :rtype: MDANSE.Framework.Jobs.IJob.IJob
+        """
+        
+        jobType, parameters, configurations, data = state
+        
+        job = REGISTRY['job'][jobType]()
+        
+        parameters = dict(parameters)
+        if parameters.has_key('running_mode'):
+            parameters['running_mode'] = ('monoprocessor',1)
+            
+        job.setup(parameters)
+        
+        for name, conf in configurations.items():
+            job.configuration[name].update(conf)
+            
+        job.isWorker = True
+        
+        for name, value in data.items():
+            setattr(job, name, value)
+            
+        job.initialize()
+        
+        return job
+                
+    def _combine(self, index, x):
+        """
+        Combines the result of a step and records its completion in the checkpoint of the job.
+        """
+        
+        with INSTRUMENTATION.section("combine"):
+            self.combine(index, x)
+        
+        if self._checkpoint is not None:
+            self._checkpoint.record(self, index)
+        
+    def _setup_checkpoint(self, resume):
+        """
+        Sets up the checkpoint of the job and the steps that remain to be run.
+        
+        :param resume: if True, the state of the job and its completed steps are restored from its checkpoint file
+        :type resume: bool
+        """
+        
+        self._steps = range(self.numberOfSteps)
+        
+        self._checkpoint = None
+        
+        try:
+            filename = self.configuration['output_files']['root'] + '.chk'
+        except KeyError:
+            filename = None
+            
+        if not self.checkpointable or filename is None:
+            if resume:
+                raise JobError("The job %r can not be resumed" % self.type)
+            return
+        
+        interval = PREFERENCES.get_preferences_item("checkpoint_interval").value
+        
+        # An interval of 0 turns the checkpointing off.
+        if interval == 0 and not resume:
+            return
+
+        self._checkpoint = Checkpoint(filename, interval)
+        
+        # The state of the job is built once such as a job whose state can not be stored fails before running its steps.
+        try:
+            self.get_checkpoint_state()
+        except CheckpointError as e:
+            raise JobError(str(e))
+        
+        if not resume:
+            return
+        
+        if not self._checkpoint.exists():
+            LOGGER("No checkpoint found for job %s: running all steps." % self._name, "warning")
+            return
+        
+        try:
+            completed = self._checkpoint.restore(self)
+        except CheckpointError as e:
+            raise JobError("The job %s can not be resumed: %s" % (self._name,e))
+        
+        self._steps = [i for i in self._steps if i not in completed]
+
+        LOGGER("Resuming job %s from %r: %d steps out of %d remaining." % (self._name,self._checkpoint.filename,len(self._steps),self.numberOfSteps))
+
     def _run_monoprocessor(self):
 
         if self._status is not None:
-            self._status.start(self.numberOfSteps,rate=0.1)
+            self._status.start(len(self._steps),rate=0.1)
+            
+        self.prefetch_steps(self._steps)
 
-        for index in range(self.numberOfSteps):
-            idx, x = self.run_step(index)                            
-            self.combine(idx, x)
+        for index in self._steps:
+            idx, x = INSTRUMENTATION.run_step(self, index)
+            self._combine(idx, x)
             
             if self._status is not None:
                 if self._status.is_stopped():
@@ -368,74 +599,151 @@ class IJob(Configurable):
                 else:
                     self._status.update()
         
-    def _run_multiprocessor(self):
+    def _run_tasks(self, requestTask, retrieveResult, nWorkers):
+        """
+        Runs the steps of the job by chunks over a set of workers and combines their results.
+        
+        The size of the chunks adapts to the measured duration of a step. If the job provides the estimated costs of its
+        steps, the most expensive steps are run first. Up to two chunks per worker are kept in flight
+        so that a worker never waits for the master to send its next chunk. The chunks are dispatched as long as the
+        results in flight do not exceed the 'results_memory_budget' preferences item and the results are combined as 
+        soon as they are retrieved.
+        
+        :param requestTask: the callable used to request the run of a chunk of steps. It takes the list of the step indexes.
+        :type requestTask: callable
+        :param retrieveResult: the callable used to retrieve the result of a chunk as returned by MDANSE.DistributedComputing.Scheduling.run_steps
+        :type retrieveResult: callable
+        :param nWorkers: the number of workers
+        :type nWorkers: int
+        """
 
-        import MDANSE.DistributedComputing.MasterSlave as MasterSlave
+        from MDANSE.DistributedComputing.Scheduling import AdaptiveChunker, ResultsWindow, nbytes
 
-        script = os.path.abspath(os.path.join(PLATFORM.package_directory(),'DistributedComputing','Slave.py'))
+        chunker = AdaptiveChunker(self._steps, nWorkers, costs=self.step_costs())
+        
+        budget = PREFERENCES.get_preferences_item("results_memory_budget").value*1024*1024
+        
+        window = ResultsWindow(2*nWorkers, budget)
+        
+        if self._status is not None:
+            self._status.start(len(self._steps),rate=0.1)
+        
+        while True:
+            
+            while window.is_open():
+                chunk = chunker.next_chunk(window.available_steps())
+                if chunk is None:
+                    break
+                requestTask(chunk)
+                window.push(len(chunk))
                 
-        master = MasterSlave.initializeMasterProcess(self._name, slave_script=script, use_name_server=False)
+            if window.empty:
+                break
 
-        master.setGlobalState(job=self)
-        master.launchSlaveJobs(n=self.configuration['running_mode']['slots'],port=master.pyro_daemon.port)
+            results, duration, events = retrieveResult()
+            
+            INSTRUMENTATION.add_events(events)
+            
+            window.pop(len(results), nbytes(results))
+            
+            chunker.update([idx for idx, _ in results], duration)
+            
+            for idx, x in results:
+                self._combine(idx, x)
+    
+                if self._status is not None:
+                    if self._status.is_stopped():
+                        self._status.cleanup()
+                        return
+                    else:
+                        self._status.update()
+                        
+            window.retain(self.retained_size())
+        
+    def _run_multiprocessor(self):
 
-        if self._status is not None:
-            self._status.start(self.numberOfSteps,rate=0.1)
+        from MDANSE.DistributedComputing.SharedMemory import SharedMemoryMaster
 
-        for index in range(self.numberOfSteps):
-            master.requestTask('run_step',MasterSlave.GlobalStateValue(1,'job'),index)
+        master = SharedMemoryMaster(self, self.configuration['running_mode']['slots'])
         
-        for index in range(self.numberOfSteps):
-            _, _, (idx, x) = master.retrieveResult('run_step')
-            self.combine(idx, x)
+        master.start()
 
-            if self._status is not None:
-                if self._status.is_stopped():
-                    self._status.cleanup()
-                    return
-                else:
-                    self._status.update()
-            
-        master.shutdown()
+        try:
+            self._run_tasks(master.requestTask, master.retrieveResult, master.nWorkers)
+        finally:
+            master.shutdown()
         
-    def _run_remote(self):
+    def _run_multithread(self):
 
-        IJob.set_pyro_server()
+        if not self.threadSafe:
+            LOGGER("The job %r can not be run in multithread mode: running it in monoprocessor mode." % self.type, "warning")
+            self._run_monoprocessor()
+            return
 
-        import MDANSE.DistributedComputing.MasterSlave as MasterSlave
+        from MDANSE.DistributedComputing.MultiThread import ThreadMaster
 
-        tasks = MasterSlave.initializeMasterProcess(self._name, slave_module='MDANSE.DistributedComputing.Slave')
-             
-        tasks.setGlobalState(job=self)
+        master = ThreadMaster(self, self.configuration['running_mode']['slots'])
+        
+        master.start()
 
-        if self._status is not None:
-            self._status.start(self.numberOfSteps,rate=0.1)
-                
-        for  index in range(self.numberOfSteps):
-            tasks.requestTask('run_step',MasterSlave.GlobalStateValue(1,'job'),index)
+        try:
+            self._run_tasks(master.requestTask, master.retrieveResult, master.nWorkers)
+        finally:
+            master.shutdown()
+        
+    def _run_remote(self):
 
-        for index in range(self.numberOfSteps):
-            _, _, (idx, x) = tasks.retrieveResult("run_step")
-            self.combine(idx, x)
+        from MDANSE.DistributedComputing.Cluster import ClusterMaster
 
-        if self._status is not None:
-            if self._status.is_stopped():
-                self._status.cleanup()
-                return
-            else:
-                self._status.update()
+        runningMode = self.configuration['running_mode']
+
+        # Without an address, the workers are spawned on the local host.
+        master = ClusterMaster(self, runningMode['slots'], runningMode['address'])
+        
+        master.start(local=runningMode['address'] is None)
+        
+        try:
+            self._run_tasks(master.requestTask, master.retrieveResult, master.nWorkers)
+        finally:
+            master.shutdown()
             
-    _runner = {"monoprocessor" : _run_monoprocessor, "multiprocessor" : _run_multiprocessor, "remote" : _run_remote}
+    _runner = {"monoprocessor" : _run_monoprocessor, "multiprocessor" : _run_multiprocessor, "multithread" : _run_multithread, "remote" : _run_remote}
 
-    def run(self, parameters=None):
+    def run(self, parameters=None, resume=False, trace=None):
         """
         Run the job.
+        
+        :param parameters: if not None, the parameters with which the job will be set up
+        :type parameters: dict
+        :param resume: if True, the job is resumed from its checkpoint file by skipping the steps already completed
+        :type resume: bool
+        :param trace: if not None, the name of the file in which the timing of the job will be written as a JSON trace 
+        readable by the Chrome trace viewer or Perfetto. A summary of the timing is also logged at the end of the job.
+        :type trace: str
         """
         
+        if trace is None:
+            self._run(parameters, resume)
+            return
+
+        INSTRUMENTATION.enable()
+        INSTRUMENTATION.set_worker("master")
+        
+        try:
+            self._run(parameters, resume)
+        finally:
+            INSTRUMENTATION.write_trace(trace)
+            LOGGER("Timing of job %s (trace written in %r):\n%s" % (self._name,trace,INSTRUMENTATION.summary()))
+            LOGGER("Frame cache of the master process: %(hits)d hits, %(misses)d misses, %(frames)d frames cached (%(size)d bytes)" % FRAME_CACHE.stats())
+            INSTRUMENTATION.disable()
+            
+    def _run(self, parameters, resume):
+        
         if parameters is not None:
             self.setup(parameters)
         
-        self.initialize()
+        with INSTRUMENTATION.section("initialize"):
+            self.initialize()
 
         self._info = 'Information about %s job.\n' % self._name
         self._info += str(self)
@@ -445,16 +753,33 @@ class IJob(Configurable):
         if getattr(self,'numberOfSteps', 0) <= 0:
             raise JobError("Invalid number of steps for job %s" % self)
 
+        self._setup_checkpoint(resume)
+
         try:
             mode = self.configuration['running_mode']['mode']
         except:
             raise JobError("Invalid running mode")
         else:                        
-            IJob._runner[mode](self)
-
-        self.finalize()
+            try:
+                IJob._runner[mode](self)
+            finally:
+                # A stopped or failed job leaves frames to be read ahead.
+                FramePrefetcher.uninstall()
+
+        # When the checkpointing is on, a stopped job is not finalized: its checkpoint is written such as it can be resumed later.
+        if self._checkpoint is not None and self._checkpoint.enabled and len(self._checkpoint.completed) < self.numberOfSteps:
+            self._checkpoint.save(self)
+            LOGGER("Job %s stopped after %d steps out of %d: it can be resumed from %r." % (self._name,len(self._checkpoint.completed),self.numberOfSteps,self._checkpoint.filename))
+            return
+
+        with INSTRUMENTATION.section("finalize"):
+            self.finalize()
+        
+        if self._checkpoint is not None:
+            self._checkpoint.remove()
 
-        if self._status is not None:
+        # The other stopped jobs are finalized such as their output is closed but they are not reported as finished.
+        if self._status is not None and not self._status.is_stopped():
             self._status.finish()
 
     @property
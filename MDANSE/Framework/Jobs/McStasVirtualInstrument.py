@@ -47,7 +47,7 @@ from MDANSE.Core.Error import Error
 from MDANSE.Externals.magnitude import magnitude
 from MDANSE.Framework.Configurable import Configurable
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import sorted_atoms, read_frame
 
 MCSTAS_UNITS_LUT = {'THz': magnitude.mg(1,"THz","meV_eq").toval(), 
                     'nm**2' : magnitude.mg(1,"nm2","b").toval(),
@@ -135,7 +135,7 @@ class McStasVirtualInstrument(IJob):
         self._mcStasPhysicalParameters["sigma_coh"] = sum([ELEMENTS[s,'xs_coherent']   for s in symbols])*MCSTAS_UNITS_LUT['nm**2']
         self._mcStasPhysicalParameters["sigma_inc"] = sum([ELEMENTS[s,'xs_incoherent'] for s in symbols])*MCSTAS_UNITS_LUT['nm**2']
         for frameIndex in self.configuration['frames']['value']:
-            self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)                
+            read_frame(self.configuration['trajectory']['instance'], frameIndex)                
             cellVolume = self.configuration['trajectory']['instance'].universe.cellVolume()
             self._mcStasPhysicalParameters["density"] += self._mcStasPhysicalParameters["weight"]/cellVolume
         self._mcStasPhysicalParameters["density"] /= self.configuration['frames']['n_frames']
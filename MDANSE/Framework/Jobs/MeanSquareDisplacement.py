@@ -36,7 +36,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.MolecularDynamics.Analysis import mean_square_displacement
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class MeanSquareDisplacement(IJob):
     """
@@ -85,6 +85,11 @@ class MeanSquareDisplacement(IJob):
         """
 
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'])
                         
         # Will store the time.
         self._outputData.add("times", "line", self.configuration['frames']['time'], units='ps')
@@ -105,14 +110,7 @@ class MeanSquareDisplacement(IJob):
             #. atomicMSD (numpy.array): The calculated mean square displacement for atom index
         """
                 
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]
-                        
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
          
         series = self.configuration['projection']["projector"](series)
  
@@ -34,8 +34,10 @@ import collections
 
 import numpy 
 
+from MDANSE import LOGGER
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Extensions import mt_fast_calc
+from MDANSE.MolecularDynamics.Trajectory import read_frame, read_lock
 
 class MolecularTrace(IJob):
     """
@@ -58,6 +60,10 @@ class MolecularTrace(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    threadSafe = True
+
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -80,7 +86,7 @@ class MolecularTrace(IJob):
         minx, miny, minz = 10**9,10**9,10**9
         for i in range(self.numberOfSteps):
             frameIndex = self.configuration['frames']['value'][i]
-            self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+            read_frame(self.configuration['trajectory']['instance'], frameIndex)
             conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
             
             minx_loc = conf.array[:,0].min()
@@ -110,6 +116,9 @@ class MolecularTrace(IJob):
         spacing = self.configuration['spatial_resolution']['value']
         self._outputData.add('spacing',"line",numpy.array([spacing, spacing, spacing]), units = 'nm')
         self.grid = numpy.zeros(self.gdim, dtype = numpy.int32)
+        
+        # The number of atom positions that fell out of the grid.
+        self._skipped = 0
 
         self._outputData.add('molecular_trace',"volume", tuple(numpy.ceil(numpy.array([dimx, dimy, dimz])/self.resolution)))
         
@@ -124,17 +133,20 @@ class MolecularTrace(IJob):
         # This is the actual index of the frame corresponding to the loop index.
         frameIndex = self.configuration['frames']['value'][index]
                             
-        # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        # The universe may be shared with other threads: it is locked until the data needed by the step have been copied.
+        with read_lock(self.configuration['trajectory']['instance']):
+
+            # The configuration corresponding to this index is set to the universe.
+            read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
-        conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
+            conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
 
         grid = numpy.zeros(self.gdim, dtype = numpy.int32)
 
         # Loop over the indexes of the selected atoms for the molecular trace calculation.
-        mt_fast_calc.mt(conf.array[self.configuration['atom_selection']['indexes'],:], grid, self.configuration['spatial_resolution']['value'], self.min)
+        skipped = mt_fast_calc.mt(conf.array[self.configuration['atom_selection']['indexes'],:], grid, self.configuration['spatial_resolution']['value'], self.min)
 
-        return index, grid
+        return index, (grid, skipped)
     
     def combine(self, index, x):
         """
@@ -145,13 +157,20 @@ class MolecularTrace(IJob):
         @type x: no specific type.
         """
 
-        numpy.add(self.grid,x,self.grid)
+        grid, skipped = x
+
+        numpy.add(self.grid,grid,self.grid)
+        
+        self._skipped += skipped
     
     def finalize(self):
         """
         Finalize the job.
         """
         
+        if self._skipped > 0:
+            LOGGER("%d atom positions fell out of the grid of the molecular trace and were not counted." % self._skipped, "warning")
+        
         self._outputData['molecular_trace'][:] = self.grid
                 
         # Write the output variables.
@@ -86,6 +86,8 @@ class OrderParameter(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    checkpointExcluded = IJob.checkpointExcluded + ('_zAxis',)
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory', {})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
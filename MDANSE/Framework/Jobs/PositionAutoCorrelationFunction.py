@@ -36,7 +36,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class PositionAutoCorrelationFunction(IJob):
     """
@@ -70,6 +70,11 @@ class PositionAutoCorrelationFunction(IJob):
         Initialize the input parameters and analysis self variables
         """
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'])
                         
         # Will store the time.
         self._outputData.add("time","line", self.configuration['frames']['time'], units='ps')
@@ -89,14 +94,7 @@ class PositionAutoCorrelationFunction(IJob):
             #. atomicPACF (numpy.array): The calculated position auto-correlation function for atom index
         """
         
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]                                                                          
-
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'])    
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
 
         series = self.configuration['projection']["projector"](series)
         
@@ -37,6 +37,7 @@ import numpy
 from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.MolecularDynamics.Analysis import radius_of_gyration
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 class RadiusOfGyration(IJob):
     """
@@ -55,6 +56,8 @@ class RadiusOfGyration(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -93,7 +96,7 @@ class RadiusOfGyration(IJob):
         # get the Frame index
         frameIndex = self.configuration['frames']['value'][index] 
         
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
         # read the particle trajectory                                              
         series = self.configuration['trajectory']['instance'].universe.configuration().array[self._indexes,:]
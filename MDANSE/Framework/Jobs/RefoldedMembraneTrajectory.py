@@ -38,6 +38,7 @@ from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Geometry import center
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 class RefoldedMembraneTrajectory(IJob):
     """
@@ -54,6 +55,10 @@ class RefoldedMembraneTrajectory(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    checkpointable = False
+
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -105,7 +110,7 @@ class RefoldedMembraneTrajectory(IJob):
         frameIndex = self.configuration['frames']['value'][index]
               
         # The configuration corresponding to this index is set to the universe.
-        self._universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex, self._universe)
 
         conf = self._universe.contiguousObjectConfiguration()
 
@@ -38,6 +38,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.MolecularDynamics.Analysis import mean_square_deviation
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 class RootMeanSquareDeviation(IJob):
     """
@@ -56,6 +57,8 @@ class RootMeanSquareDeviation(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    frameBased = True
+
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -97,7 +100,7 @@ class RootMeanSquareDeviation(IJob):
         # get the Frame index
         frameIndex = self.configuration['frames']['value'][index] 
         
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
         conf1 = self.configuration['trajectory']['instance'].configuration[self.referenceFrame]
         conf2 = self.configuration['trajectory']['instance'].universe.configuration()
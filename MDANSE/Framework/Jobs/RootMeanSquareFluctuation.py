@@ -34,7 +34,7 @@ import collections
 
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.MolecularDynamics.Analysis import mean_square_fluctuation
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class RootMeanSquareFluctuation(IJob):
     """
@@ -64,6 +64,11 @@ class RootMeanSquareFluctuation(IJob):
         """
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
         
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'])
+        
         # Will store the indexes.
         
         self._outputData.add('indexes',"line",self.configuration['atom_selection']['indexes'])
@@ -81,15 +86,7 @@ class RootMeanSquareFluctuation(IJob):
             #. index (int): The index of the step. 
             #. rmsf (numpy.array): the calculated root mean square fluctuation for atom index
         """
-        # read the particle trajectory  
-        atomIndex = self.configuration['atom_selection']['groups'][index]   
-        
-        # read the particle trajectory                                              
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                               atomIndex,
-                               first=self.configuration['frames']['first'],
-                               last=self.configuration['frames']['last']+1,
-                               step=self.configuration['frames']['step'])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
         
         rmsf = mean_square_fluctuation(series,root=True)
 
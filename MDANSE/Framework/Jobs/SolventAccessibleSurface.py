@@ -38,6 +38,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Geometry import generate_sphere_points
 from MDANSE.Extensions import sas_fast_calc
+from MDANSE.MolecularDynamics.Trajectory import read_frame, read_lock
 
 class SolventAccessibleSurface(IJob):
     """
@@ -68,6 +69,10 @@ class SolventAccessibleSurface(IJob):
     
     ancestor = "mmtk_trajectory"
     
+    threadSafe = True
+
+    frameBased = True
+    
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}, 'default':(0,2,1)})
@@ -109,18 +114,22 @@ class SolventAccessibleSurface(IJob):
         # This is the actual index of the frame corresponding to the loop index.
         frameIndex = self.configuration['frames']['value'][index]                        
         
-        # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        # The universe may be shared with other threads: it is locked until the data needed by the step have been copied.
+        with read_lock(self.configuration['trajectory']['instance']):
+
+            # The configuration corresponding to this index is set to the universe.
+            read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
-        # The configuration is made contiguous.
-        conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
+            # The configuration is made contiguous.
+            conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
         
-        # And set to the universe.
-        self.configuration['trajectory']['instance'].universe.setConfiguration(conf)
+            # And set to the universe.
+            self.configuration['trajectory']['instance'].universe.setConfiguration(conf)
         
-        # Loop over the indexes of the selected atoms for the sas calculation.
+        # Loop over the indexes of the selected atoms for the sas calculation. The selected atoms and the VDW radii are
+        # given by their universe indexes hence the configuration of the whole universe is passed.
         sas = sas_fast_calc.sas(index,
-                                conf.array[self.configuration['atom_selection']['indexes'],:],
+                                conf.array,
                                 numpy.array(self.configuration['atom_selection']['groups'], dtype=numpy.int32).ravel(),
                                 self.vdwRadii_list,
                                 self.spherePoints,
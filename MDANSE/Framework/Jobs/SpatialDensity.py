@@ -37,6 +37,7 @@ import numpy
 from MDANSE.Extensions import sd_fast_calc
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Geometry import build_cartesian_axes, center_of_mass
+from MDANSE.MolecularDynamics.Trajectory import read_frame, read_lock
 
 class SpatialDensity(IJob):
     """
@@ -61,6 +62,10 @@ class SpatialDensity(IJob):
     
     ancestor = "mmtk_trajectory"
     
+    threadSafe = True
+
+    frameBased = True
+    
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory', {})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
@@ -84,7 +89,7 @@ class SpatialDensity(IJob):
         minx, miny, minz = 10**9,10**9,10**9
         for i in range(self.numberOfSteps):
             frameIndex = self.configuration['frames']['value'][i]
-            self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+            read_frame(self.configuration['trajectory']['instance'], frameIndex)
             conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
             
             minx_loc, miny_loc, minz_loc = conf.array.min(axis=0)
@@ -127,14 +132,17 @@ class SpatialDensity(IJob):
         # This is the actual index of the frame corresponding to the loop index.
         frameIndex = self.configuration['frames']['value'][index]                        
         
-        # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        # The universe may be shared with other threads: it is locked until the data needed by the step have been copied.
+        with read_lock(self.configuration['trajectory']['instance']):
+
+            # The configuration corresponding to this index is set to the universe.
+            read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
-        directCell = numpy.array(self.configuration['trajectory']['instance'].universe.basisVectors()).astype(numpy.float64)
-        reverseCell = numpy.array(self.configuration['trajectory']['instance'].universe.reciprocalBasisVectors()).astype(numpy.float64)
-        # The configuration is made contiguous.
+            directCell = numpy.array(self.configuration['trajectory']['instance'].universe.basisVectors()).astype(numpy.float64)
+            reverseCell = numpy.array(self.configuration['trajectory']['instance'].universe.reciprocalBasisVectors()).astype(numpy.float64)
+            # The configuration is made contiguous.
         
-        conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
+            conf = self.configuration['trajectory']['instance'].universe.contiguousObjectConfiguration()
 
         origins = numpy.zeros((self.configuration['reference_basis']['n_basis'],3), dtype = numpy.float64)
         bases = numpy.zeros((self.configuration['reference_basis']['n_basis'],3,3), dtype = numpy.float64)
@@ -39,7 +39,7 @@ from MMTK import Units
 from MDANSE import ELEMENTS
 from MDANSE.Mathematics.Signal import differentiate
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory, sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader, sorted_atoms
 
 class Temperature(IJob):
     """
@@ -53,6 +53,8 @@ class Temperature(IJob):
     category = ('Thermodynamics',)
     
     ancestor = "mmtk_trajectory"
+    
+    checkpointExcluded = IJob.checkpointExcluded + ('_atoms',)
             
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
@@ -68,6 +70,14 @@ class Temperature(IJob):
         self.numberOfSteps = self.configuration['trajectory']['instance'].universe.numberOfAtoms()
         
         self._nFrames = self.configuration['frames']['number']
+        
+        self._atoms = sorted_atoms(self.configuration['trajectory']['instance'].universe)
+        
+        self._groupsReader = GroupsTrajectoryReader([[at.index] for at in self._atoms],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'],
+                                                    variable=self.configuration['interpolation_order']["variable"])
 
         self._outputData.add("time","line", self.configuration['frames']['time'], units='ps')
         self._outputData.add("kinetic_energy","line", (self._nFrames,), axis="time",units='kJ_per_mole')
@@ -84,20 +94,13 @@ class Temperature(IJob):
             #. kineticEnergy (numpy.array): The calculated kinetic energy
         """
         
-        atoms = sorted_atoms(self.configuration['trajectory']['instance'].universe)
-
-        atom = atoms[index]
+        atom = self._atoms[index]
 
         symbol = atom.symbol
                                                                                     
         mass = ELEMENTS[symbol,'atomic_weight']
                 
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       [atom],
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'],
-                                       variable=self.configuration['interpolation_order']["variable"])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
              
         order = self.configuration["interpolation_order"]["value"]
         
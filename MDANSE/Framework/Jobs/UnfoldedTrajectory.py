@@ -38,10 +38,9 @@ import numpy
 from MMTK import Atom
 from MMTK.ChemicalObjects import isChemicalObject
 from MMTK.Collections import Collection
-from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 
 from MDANSE.Framework.Jobs.IJob import IJob
-from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+from MDANSE.MolecularDynamics.Trajectory import ensure_connectivity, open_output_trajectory, sorted_atoms, read_frame
 
 def contiguous_configuration(seed,atoms,boxCoords):
 
@@ -64,12 +63,17 @@ class UnfoldedTrajectory(IJob):
     category = ('Trajectory',)
     
     ancestor = "mmtk_trajectory"
+
+    checkpointable = False
+
+    frameBased = True
         
     settings = collections.OrderedDict()
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}})
     settings['atom_selection'] = ('atom_selection', {'dependencies':{'trajectory':'trajectory'}})
     settings['output_files'] = ('output_files', {'formats':["netcdf"]})
+    settings['compression'] = ('float', {'label':"compression precision (nm, 0 for none)", 'default':0.0, 'mini':0.0})
         
     def initialize(self):
         """
@@ -77,6 +81,9 @@ class UnfoldedTrajectory(IJob):
         """
 
         self.numberOfSteps = self.configuration['frames']['number']
+        
+        # The molecules are made contiguous by following their bonds.
+        ensure_connectivity(self.configuration['trajectory']['instance'].universe)
          
         atoms = sorted_atoms(self.configuration['trajectory']['instance'].universe)
          
@@ -86,13 +93,13 @@ class UnfoldedTrajectory(IJob):
         self._chemicalObjects = set([at.topLevelChemicalObject() for at in self._selectedAtoms])
                                          
         # The output trajectory is opened for writing.
-        self._outputTraj = Trajectory(self._selectedAtoms, self.configuration['output_files']['files'][0], "w")
+        self._outputTraj, self.snapshot = open_output_trajectory(self.configuration['trajectory']['instance'].universe,
+                                                                 self.configuration['output_files']['files'][0],
+                                                                 self.configuration['compression']['value'],
+                                                                 obj=self._selectedAtoms)
          
         # The title for the trajectory is set. 
         self._outputTraj.title = self.__class__.__name__
- 
-        # Create the snapshot generator.
-        self.snapshot = SnapshotGenerator(self.configuration['trajectory']['instance'].universe, actions = [TrajectoryOutput(self._outputTraj, "all", 0, None, 1)])
                  
         # This will store the configuration used as the reference for the following step. 
         self._refCoords = None
@@ -118,7 +125,7 @@ class UnfoldedTrajectory(IJob):
         universe = self.configuration['trajectory']['instance'].universe 
       
         # The configuration corresponding to this index is set to the universe.
-        universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex, universe)
                 
         # Case of the first frame.
         if self._refCoords is None:
@@ -36,7 +36,7 @@ from MDANSE import ELEMENTS
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import weight
 from MDANSE.Mathematics.Signal import correlation, differentiate, normalize
-from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectory
+from MDANSE.MolecularDynamics.Trajectory import GroupsTrajectoryReader
 
 class VelocityAutoCorrelationFunction(IJob):
     """
@@ -94,6 +94,12 @@ class VelocityAutoCorrelationFunction(IJob):
         """
 
         self.numberOfSteps = self.configuration['atom_selection']['n_groups']
+        
+        self._groupsReader = GroupsTrajectoryReader(self.configuration['atom_selection']['groups'],
+                                                    self.configuration['frames']['first'],
+                                                    self.configuration['frames']['last']+1,
+                                                    self.configuration['frames']['step'],
+                                                    variable=self.configuration['interpolation_order']["variable"])
                         
         # Will store the time.
         self._outputData.add("time","line", self.configuration['frames']['time'], units='ps')
@@ -116,15 +122,7 @@ class VelocityAutoCorrelationFunction(IJob):
             #. atomicVACF (numpy.array): The calculated velocity auto-correlation function for atom of index=index
         """
 
-        # get atom index
-        indexes = self.configuration['atom_selection']["groups"][index]
-                                
-        series = read_atoms_trajectory(self.configuration["trajectory"]["instance"],
-                                       indexes,
-                                       first=self.configuration['frames']['first'],
-                                       last=self.configuration['frames']['last']+1,
-                                       step=self.configuration['frames']['step'],
-                                       variable=self.configuration['interpolation_order']["variable"])
+        series = self._groupsReader.read(self.configuration["trajectory"]["instance"], index)
              
         val = self.configuration["interpolation_order"]["value"]
         
@@ -37,6 +37,7 @@ import numpy
 from MDANSE.Extensions import mic_fast_calc, qhull
 from MDANSE.Framework.Jobs.IJob import IJob
 from MDANSE.Mathematics.Arithmetic import factorial
+from MDANSE.MolecularDynamics.Trajectory import read_frame
 
 def no_exc_min(l):
     try:
@@ -63,6 +64,8 @@ class Voronoi(IJob):
     
     ancestor = "mmtk_trajectory"
 
+    frameBased = True
+
     settings = collections.OrderedDict()   
     settings['trajectory'] = ('mmtk_trajectory',{})
     settings['frames'] = ('frames', {'dependencies':{'trajectory':'trajectory'}, 'default':(0,5,1)})
@@ -103,7 +106,7 @@ class Voronoi(IJob):
         frameIndex = self.configuration['frames']['value'][index]
                                              
         # The configuration corresponding to this index is set to the universe.
-        self.configuration['trajectory']['instance'].universe.setFromTrajectory(self.configuration['trajectory']['instance'], frameIndex)
+        read_frame(self.configuration['trajectory']['instance'], frameIndex)
         
         conf = self.configuration['trajectory']['instance'].universe.configuration().array.astype(numpy.float64)
 
@@ -41,6 +41,8 @@ class Amine(ISelector):
 
     section = "chemical groups"
 
+    connectivity = True
+
     def select(self, *args):
 
         sel = set()
@@ -38,6 +38,8 @@ class HeteroHydrogenBound(ISelector):
     
     section = "hydrogens"
 
+    connectivity = True
+
     def select(self, *args):
 
         sel = set()
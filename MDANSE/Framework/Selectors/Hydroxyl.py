@@ -38,6 +38,8 @@ class Hydroxyl(ISelector):
 
     section = "chemical groups"
 
+    connectivity = True
+
     def select(self, *args):
         '''
          Returns the hydroxyl atoms.
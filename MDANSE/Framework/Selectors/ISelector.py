@@ -34,6 +34,7 @@ import abc
 
 from MDANSE import REGISTRY
 from MDANSE.Core.Error import Error
+from MDANSE.MolecularDynamics.Trajectory import ensure_connectivity
 
 class SelectorError(Error):
     pass
@@ -43,10 +44,16 @@ class ISelector(object):
     __metaclass__ = REGISTRY
     
     type = "selector"
+    
+    # Whether or not the selector needs the bonds of the universe.
+    connectivity = False
         
     def __init__(self,universe):
         
         self._universe = universe
+        
+        if self.connectivity:
+            ensure_connectivity(universe)
                 
         self._choices = ["*"]
 
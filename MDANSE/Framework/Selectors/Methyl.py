@@ -38,6 +38,8 @@ class Methyl(ISelector):
 
     section = "chemical groups"
 
+    connectivity = True
+
     def select(self, *args):
         '''
         Returns the methyl atoms.
@@ -38,6 +38,8 @@ class OxyHydrogen(ISelector):
     
     section = "hydrogens"
 
+    connectivity = True
+
     def select(self, *args):
 
         sel = set()
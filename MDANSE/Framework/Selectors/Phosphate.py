@@ -38,6 +38,8 @@ class Phosphate(ISelector):
 
     section = "chemical groups"
 
+    connectivity = True
+
     def select(self, *args):
         '''
         Returns the phosphate atoms.
@@ -38,6 +38,8 @@ class Sulphate(ISelector):
 
     section = "chemical groups"
 
+    connectivity = True
+
     def select(self, *args):
         '''
         Returns the sulphate atoms.
@@ -38,6 +38,8 @@ class Thiol(ISelector):
 
     section = "chemical groups"
 
+    connectivity = True
+
     def select(self, *args):
         '''
         Returns the thiol atoms.
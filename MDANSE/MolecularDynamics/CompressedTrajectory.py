@@ -0,0 +1,701 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Compressed trajectories
+
+A compressed trajectory stores the positions of the atoms quantized to a user-set precision, in the manner of the 
+XTC format of GROMACS. It is a single binary file made of:
+
+    #. a magic string and the length of the header
+    #. a JSON header giving the number of atoms, the precision and the maximum error on the coordinates
+    #. the topology of the trajectory, stored as the MMTK description of its universe right after the header
+    #. the frames, each one being a sequence of compressed blocks, one per per-atom variable
+    #. a JSON footer giving the offset of each frame and the values of the per-frame variables (time, cell, energies ...)
+    #. the offset and the length of the footer followed by the magic string
+
+The positions are rounded to the closest multiple of the precision, hence an error of at most half the precision on
+each coordinate. The integer positions are stored as differences between consecutive atoms, which are small for 
+the atoms of a molecule, in the smallest integer type holding them. Each frame is compressed independently so that 
+any frame can be read without decoding the previous ones. The other per-atom variables (velocities, forces ...) are 
+stored in float32. The blocks are byte-shuffled and then compressed with zlib at its fastest level.
+
+A CompressedTrajectory provides the subset of the MMTK.Trajectory.Trajectory interface used by the MDANSE jobs
+so that they run unchanged on compressed trajectories.
+'''
+
+import json
+import os
+import struct
+import zlib
+
+import numpy
+
+from MMTK.ParticleProperties import Configuration, ParticleVector
+
+from MDANSE.Core.Error import Error
+
+class CompressedTrajectoryError(Error):
+    pass
+
+# The string starting and ending a compressed trajectory file.
+MAGIC = "MDANSECT"
+
+# The version of the file layout.
+VERSION = 1
+
+# The extension of the compressed trajectory files.
+EXTENSION = ".mct"
+
+# The zlib compression level of the blocks.
+COMPRESSION_LEVEL = 1
+
+# The integer types in which the quantized positions can be stored, from the smallest one.
+_INTEGER_TYPES = [numpy.dtype(t) for t in (numpy.int8,numpy.int16,numpy.int32,numpy.int64)]
+
+# The header of a block: the type code of its values and the length of its compressed payload.
+_BLOCK_HEADER = struct.Struct('<cI')
+
+def compressed_filename(filename):
+    '''
+    Returns the name of the compressed trajectory file corresponding to a trajectory file name.
+    
+    :param filename: the name of the trajectory file
+    :type filename: str
+    
+    :return: the name of the file with the compressed trajectory extension
+    :rtype: str
+    '''
+    
+    return os.path.splitext(filename)[0] + EXTENSION
+
+def is_compressed_trajectory(filename):
+    '''
+    Returns whether or not a file is a compressed trajectory.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: True if the file starts with the compressed trajectory magic string
+    :rtype: bool
+    '''
+    
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+def _shuffle(array):
+    '''
+    Groups the bytes of the values of an array by significance, which makes the array more compressible.
+    '''
+    
+    itemsize = array.dtype.itemsize
+    
+    return numpy.ascontiguousarray(array.reshape(-1).view(numpy.uint8).reshape(-1,itemsize).T).tostring()
+    
+def _unshuffle(data, dtype):
+    '''
+    Reverts _shuffle.
+    '''
+    
+    dtype = numpy.dtype(dtype)
+    
+    return numpy.ascontiguousarray(numpy.fromstring(data, dtype=numpy.uint8).reshape(dtype.itemsize,-1).T).view(dtype).reshape(-1)
+
+def encode_positions(positions, precision):
+    '''
+    Quantizes and compresses a set of positions.
+    
+    :param positions: the positions
+    :type positions: (n,3) numpy array
+    :param precision: the precision of the quantization
+    :type precision: float
+    
+    :return: the compressed block
+    :rtype: str
+    '''
+    
+    quantized = numpy.rint(numpy.asarray(positions, dtype=numpy.float64)/precision).astype(numpy.int64)
+    
+    # One stream per coordinate, each one storing the differences between consecutive atoms.
+    quantized = quantized.T
+    deltas = numpy.empty_like(quantized)
+    deltas[:,:1] = quantized[:,:1]
+    deltas[:,1:] = numpy.diff(quantized, axis=1)
+    
+    lo, hi = (deltas.min(), deltas.max()) if deltas.size else (0, 0)
+    for dtype in _INTEGER_TYPES:
+        info = numpy.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            break
+        
+    payload = zlib.compress(_shuffle(deltas.astype(dtype)), COMPRESSION_LEVEL)
+    
+    return _BLOCK_HEADER.pack(dtype.char, len(payload)) + payload
+
+def encode_array(array):
+    '''
+    Compresses an array in float32.
+    
+    :param array: the array
+    :type array: numpy array
+    
+    :return: the compressed block
+    :rtype: str
+    '''
+    
+    payload = zlib.compress(_shuffle(numpy.asarray(array, dtype=numpy.float32)), COMPRESSION_LEVEL)
+    
+    return _BLOCK_HEADER.pack('f', len(payload)) + payload
+
+def decode_block(block, shape, precision=None):
+    '''
+    Decodes a block encoded by encode_positions or encode_array.
+    
+    :param block: the block
+    :type block: str
+    :param shape: the shape of the encoded array
+    :type shape: tuple
+    :param precision: the precision of the quantization for the blocks encoded by encode_positions
+    :type precision: float
+    
+    :return: the decoded array
+    :rtype: numpy array of float64
+    '''
+    
+    code, length = _BLOCK_HEADER.unpack_from(block)
+    
+    values = _unshuffle(zlib.decompress(block[_BLOCK_HEADER.size:_BLOCK_HEADER.size+length]), code)
+    
+    if code == 'f':
+        return values.astype(numpy.float64).reshape(shape)
+    
+    quantized = numpy.cumsum(values.astype(numpy.int64).reshape((shape[1],shape[0])), axis=1)
+    
+    return (precision*quantized).T
+    
+def read_header(filename):
+    '''
+    Reads the header of a compressed trajectory.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: the header
+    :rtype: dict
+    '''
+    
+    try:
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise CompressedTrajectoryError("%r is not a compressed trajectory" % filename)
+            length, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(length))
+            header['topology_offset'] = f.tell()
+    except (IOError,ValueError,struct.error) as e:
+        raise CompressedTrajectoryError("Could not read the header of the compressed trajectory %r: %s" % (filename,e))
+    
+    if header.get('version') != VERSION:
+        raise CompressedTrajectoryError("Unsupported version of compressed trajectory: %r" % header.get('version'))
+    
+    return header
+
+def read_footer(filename):
+    '''
+    Reads the footer of a compressed trajectory.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: the footer
+    :rtype: dict
+    '''
+    
+    try:
+        with open(filename, 'rb') as f:
+            f.seek(-16-len(MAGIC), os.SEEK_END)
+            offset, length = struct.unpack('<QQ', f.read(16))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise CompressedTrajectoryError("The compressed trajectory %r has not been closed properly" % filename)
+            f.seek(offset)
+            footer = json.loads(f.read(length))
+    except (IOError,ValueError,struct.error) as e:
+        raise CompressedTrajectoryError("Could not read the footer of the compressed trajectory %r: %s" % (filename,e))
+    
+    return footer
+        
+class CompressedTrajectoryWriter(object):
+    '''
+    Writes a compressed trajectory frame by frame. The variables are fixed by the first frame.
+    '''
+    
+    def __init__(self, filename, universe, precision, comment=None, atoms=None):
+        '''
+        :param filename: the name of the file
+        :type filename: str
+        :param universe: the universe of the trajectory
+        :type universe: MMTK.Universe.Universe
+        :param precision: the precision (in nm) of the positions
+        :type precision: float
+        :param comment: the comment stored in the file
+        :type comment: str
+        :param atoms: the indexes of the atoms of the universe written in the trajectory. If None, all the atoms are written.
+        :type atoms: list of int
+        '''
+        
+        if precision <= 0.0:
+            raise CompressedTrajectoryError("Invalid precision for a compressed trajectory: %r" % precision)
+        
+        self._precision = float(precision)
+        
+        if atoms is None:
+            self.atoms = None
+            self._nAtoms = universe.numberOfAtoms()
+            topology = universe.description()
+        else:
+            # As MMTK does for a trajectory written for a collection of atoms.
+            from MMTK.Collections import Collection
+            from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+            self.atoms = numpy.array(sorted(atoms), dtype=numpy.int32)
+            self._nAtoms = len(self.atoms)
+            indexMap = numpy.zeros((universe.numberOfAtoms(),), dtype=numpy.int32) - 1
+            indexMap[self.atoms] = numpy.arange(self._nAtoms, dtype=numpy.int32)
+            universeAtoms = sorted_atoms(universe)
+            topology = universe.description(Collection([universeAtoms[idx] for idx in self.atoms]), indexMap)
+        
+        header = {'version' : VERSION, 
+                  'n_atoms' : self._nAtoms,
+                  'precision' : self._precision,
+                  'max_error' : 0.5*self._precision,
+                  'compressor' : 'zlib',
+                  'topology_length' : len(topology)}
+        
+        encodedHeader = json.dumps(header)
+        
+        try:
+            self._file = open(filename, 'wb')
+            self._file.write(MAGIC)
+            self._file.write(struct.pack('<Q', len(encodedHeader)))
+            self._file.write(encodedHeader)
+            self._file.write(topology)
+        except IOError as e:
+            raise CompressedTrajectoryError("Could not create the compressed trajectory %r: %s" % (filename,e))
+            
+        self.filename = filename
+        
+        self.title = comment
+        
+        self._offsets = []
+        
+        self._atomVariables = None
+        
+        self._frameVariables = {}
+        
+    def write_frame(self, values):
+        '''
+        Appends a frame.
+        
+        :param values: the values of the variables for that frame. The (nAtoms,3) arrays are per-atom variables, the 
+        other values are stored as per-frame variables.
+        :type values: dict
+        '''
+        
+        atomVariables = {}
+        frameVariables = {}
+        for name, value in values.items():
+            value = numpy.asarray(value, dtype=numpy.float64)
+            if value.shape == (self._nAtoms,3):
+                atomVariables[name] = value
+            else:
+                frameVariables[name] = value.tolist()
+                
+        if self._atomVariables is None:
+            self._atomVariables = sorted(atomVariables)
+            self._frameVariables = dict([(name,[]) for name in frameVariables])
+            
+        if sorted(atomVariables) != self._atomVariables or sorted(frameVariables) != sorted(self._frameVariables):
+            raise CompressedTrajectoryError("The variables of a frame do not match those of the compressed trajectory %r" % self.filename)
+        
+        self._offsets.append(self._file.tell())
+        
+        for name in self._atomVariables:
+            if name == 'configuration':
+                self._file.write(encode_positions(atomVariables[name], self._precision))
+            else:
+                self._file.write(encode_array(atomVariables[name]))
+                
+        for name, value in frameVariables.items():
+            self._frameVariables[name].append(value)
+        
+    def close(self):
+        '''
+        Writes the footer and closes the file.
+        '''
+        
+        if self._file is None:
+            return
+        
+        offset = self._file.tell()
+        
+        footer = json.dumps({'n_frames' : len(self._offsets),
+                             'offsets' : self._offsets + [offset],
+                             'atom_variables' : self._atomVariables or [],
+                             'frame_variables' : self._frameVariables,
+                             'title' : self.title})
+        
+        self._file.write(footer)
+        self._file.write(struct.pack('<QQ', offset, len(footer)))
+        self._file.write(MAGIC)
+        self._file.close()
+        
+        self._file = None
+        
+class CompressedSnapshotGenerator(object):
+    '''
+    Writes the current state of a universe into a compressed trajectory. This is the counterpart of the 
+    MMTK.Trajectory.SnapshotGenerator writing all the variables of the universe.
+    '''
+    
+    def __init__(self, universe, writer):
+        '''
+        :param universe: the universe
+        :type universe: MMTK.Universe.Universe
+        :param writer: the writer of the compressed trajectory
+        :type writer: MDANSE.MolecularDynamics.CompressedTrajectory.CompressedTrajectoryWriter
+        '''
+        
+        self._universe = universe
+        
+        self._writer = writer
+        
+    def __call__(self, data=None):
+        '''
+        Writes a frame.
+        
+        :param data: additional per-frame or per-atom data (time, energies, forces ...)
+        :type data: dict
+        '''
+        
+        values = {'configuration' : self._universe.configuration().array}
+        
+        velocities = self._universe.velocities()
+        if velocities is not None:
+            values['velocities'] = velocities.array
+            
+        if data is not None:
+            for name, value in data.items():
+                values[name] = getattr(value, 'array', value)
+        
+        atoms = self._writer.atoms
+        if atoms is not None:
+            nAtoms = self._universe.numberOfAtoms()
+            for name, value in values.items():
+                if numpy.shape(value) == (nAtoms,3):
+                    values[name] = numpy.asarray(value)[atoms]
+                
+        cell = self._universe.cellParameters()
+        if cell is not None:
+            values['box_size'] = cell
+            
+        self._writer.write_frame(values)
+
+class ParticleTrajectory(object):
+    '''
+    The trajectory of a single atom, as returned by CompressedTrajectory.readParticleTrajectory.
+    '''
+    
+    def __init__(self, array):
+        
+        self.array = array
+            
+class CompressedVariable(object):
+    '''
+    A variable of a compressed trajectory. Indexing a per-atom variable by a frame index returns a configuration or a 
+    particle vector. Other indexes return arrays.
+    '''
+    
+    def __init__(self, trajectory, name):
+        
+        self._trajectory = trajectory
+        
+        self._name = name
+        
+    def __len__(self):
+        
+        return len(self._trajectory)
+        
+    def __getitem__(self, index):
+        
+        traj = self._trajectory
+        
+        if not self._name in traj.atom_variables():
+            value = traj.frame_array(self._name)[index]
+            return float(value) if value.ndim == 0 else value.copy()
+        
+        if not isinstance(index, (int,long,numpy.integer)):
+            return numpy.array([traj.read_variable(self._name, i) for i in range(len(traj))[index]])
+        
+        value = traj.read_variable(self._name, index)
+        
+        if self._name == "configuration":
+            return Configuration(traj.universe, value, traj.cell_parameters(index))
+        else:
+            return ParticleVector(traj.universe, value)
+
+class CompressedTrajectory(object):
+    '''
+    Read-only trajectory stored in a compressed trajectory file.
+    '''
+    
+    def __init__(self, filename, universe=None):
+        '''
+        :param filename: the name of the file
+        :type filename: str
+        :param universe: the universe of the trajectory. If None, it is built from the topology stored in the file.
+        :type universe: MMTK.Universe.Universe
+        '''
+        
+        self.filename = filename
+        
+        self._header = read_header(filename)
+        
+        footer = read_footer(filename)
+        
+        self._offsets = footer['offsets']
+        
+        self._atomVariables = [str(name) for name in footer['atom_variables']]
+        
+        self._frameVariables = dict([(str(name),numpy.array(values, dtype=numpy.float64)) for name, values in footer['frame_variables'].items()])
+        
+        self.title = footer['title']
+        
+        self._file = open(filename, 'rb')
+        
+        if universe is None:
+            universe = self._build_universe()
+            
+        self.universe = universe
+        
+    @property
+    def precision(self):
+        '''
+        Returns the precision (in nm) to which the positions have been quantized.
+        
+        :return: the precision
+        :rtype: float
+        '''
+        
+        return self._header['precision']
+        
+    @property
+    def max_error(self):
+        '''
+        Returns the maximum error (in nm) on each coordinate of the positions.
+        
+        :return: the maximum error
+        :rtype: float
+        '''
+        
+        return self._header['max_error']
+        
+    def _build_universe(self):
+        '''
+        Builds the universe of the trajectory from its topology.
+        '''
+        
+        import MMTK.Skeleton
+        
+        self._file.seek(self._header['topology_offset'])
+        description = self._file.read(self._header['topology_length'])
+
+        conf = None
+        if 'configuration' in self._atomVariables and len(self) > 0:
+            conf = self.read_variable('configuration', 0)
+            
+        skeleton = eval(description, vars(MMTK.Skeleton), {})
+        universe = skeleton.make({}, conf)
+
+        cell = self.cell_parameters(0) if len(self) > 0 else None
+        if cell is not None:
+            universe.setCellParameters(cell)
+            
+        return universe
+    
+    def __len__(self):
+        
+        return len(self._offsets) - 1
+    
+    def __getattr__(self, name):
+        
+        if name.startswith('_') or not name in self.variables():
+            raise AttributeError(name)
+        
+        return CompressedVariable(self, name)
+    
+    def variables(self):
+        '''
+        Returns the names of the variables of the trajectory.
+        
+        :return: the names of the variables
+        :rtype: list of str
+        '''
+        
+        return sorted(self.__dict__.get('_atomVariables', []) + self.__dict__.get('_frameVariables', {}).keys())
+    
+    def atom_variables(self):
+        '''
+        Returns the names of the per-atom variables of the trajectory.
+        
+        :return: the names of the per-atom variables
+        :rtype: list of str
+        '''
+        
+        return list(self._atomVariables)
+    
+    def frame_array(self, name):
+        '''
+        Returns the array storing a per-frame variable.
+        
+        :param name: the name of the variable
+        :type name: str
+        
+        :return: the values of the variable, indexed first by the frame
+        :rtype: numpy array
+        
+        :raise KeyError: if the variable is not a per-frame variable
+        '''
+        
+        return self._frameVariables[name]
+    
+    def read_variable(self, name, frame):
+        '''
+        Reads a frame of a per-atom variable.
+        
+        :param name: the name of the variable
+        :type name: str
+        :param frame: the index of the frame
+        :type frame: int
+        
+        :return: the values of the variable for that frame
+        :rtype: (nAtoms,3) numpy array
+        '''
+        
+        try:
+            position = self._atomVariables.index(name)
+        except ValueError:
+            raise CompressedTrajectoryError("Unknown per-atom variable %r in compressed trajectory %r" % (name,self.filename))
+        
+        if frame < 0:
+            frame += len(self)
+        
+        start, end = self._offsets[frame], self._offsets[frame+1]
+        
+        self._file.seek(start)
+        record = self._file.read(end - start)
+        
+        # Skips the blocks of the preceding variables.
+        offset = 0
+        for _ in range(position):
+            offset += _BLOCK_HEADER.size + _BLOCK_HEADER.unpack_from(record, offset)[1]
+            
+        shape = (self._header['n_atoms'],3)
+        
+        return decode_block(record[offset:], shape, self._header['precision'])
+        
+    def read_atoms(self, indexes, first, last, step=1, variable="configuration"):
+        '''
+        Reads the values of a per-atom variable for a set of atoms over a range of frames. Each frame is decoded once.
+        
+        :param indexes: the indexes of the atoms
+        :type indexes: list of int
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the last frame (excluded)
+        :type last: int
+        :param step: the step between two frames
+        :type step: int
+        :param variable: the per-atom variable to read
+        :type variable: str
+        
+        :return: the values of the variable, as stored in the file
+        :rtype: (nFrames,nAtoms,3) numpy array
+        '''
+        
+        frames = range(first, last, step)
+        
+        series = numpy.empty((len(frames),len(indexes),3), dtype=numpy.float64)
+        for i, frame in enumerate(frames):
+            series[i] = self.read_variable(variable, frame)[indexes]
+            
+        return series
+        
+    def cell_parameters(self, frame):
+        '''
+        Returns the cell parameters of a frame.
+        
+        :param frame: the index of the frame
+        :type frame: int
+        
+        :return: the cell parameters or None if the trajectory is not periodic
+        :rtype: numpy array
+        '''
+        
+        if not 'box_size' in self._frameVariables:
+            return None
+        
+        return self._frameVariables['box_size'][frame].copy()
+    
+    def readParticleTrajectory(self, atom, first=0, last=None, skip=1, variable="configuration"):
+        '''
+        Reads the trajectory of a single atom. The jumps due to the periodic boundary conditions are removed from the 
+        configurations.
+        
+        :return: the trajectory of the atom
+        :rtype: MDANSE.MolecularDynamics.CompressedTrajectory.ParticleTrajectory
+        '''
+        
+        from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+        
+        return ParticleTrajectory(read_atoms_trajectories(self, [atom], first, last, skip, variable)[:,0,:])
+    
+    def reopen(self):
+        '''
+        Returns a new handle on the trajectory file sharing the universe of this one.
+        
+        :return: the new handle
+        :rtype: MDANSE.MolecularDynamics.CompressedTrajectory.CompressedTrajectory
+        '''
+        
+        return CompressedTrajectory(self.filename, self.universe)
+        
+    def close(self):
+        '''
+        Closes the trajectory.
+        '''
+        
+        self._file.close()
@@ -0,0 +1,540 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+'''
+DCD trajectories
+
+A DCD file (CHARMM, NAMD, XPLOR) is a Fortran unformatted file made of three header records followed by the frames.
+Each frame is made of an optional unit cell record of 6 float64 (A, gamma, B, beta, alpha, C), of one record of
+float32 per coordinate axis and of an optional 4th dimension record. All the frames having the same size, the file is
+read through numpy.memmap with a structured dtype describing the records of a frame, record markers included, so that
+any frame or any set of atoms over a range of frames can be read without parsing the file.
+
+A DCDTrajectory exposes a DCD file as a read-only trajectory providing the subset of the MMTK.Trajectory.Trajectory
+interface used by the MDANSE jobs. As the DCD format stores no topology, the universe is built from a PDB file.
+'''
+
+import os
+import struct
+
+import numpy
+
+from MMTK import Units
+from MMTK.ParticleProperties import Configuration
+
+from MDANSE.Core.Error import Error
+
+class DCDTrajectoryError(Error):
+    pass
+
+def _byte_order(data):
+    '''
+    Returns the byte order of a DCD file from its first 4 bytes, which hold the length (84) of its first record.
+    '''
+    
+    for order in ['<','>']:
+        if struct.unpack(order + 'i', data)[0] == 84:
+            return order
+        
+    return None
+
+def is_dcd_trajectory(filename):
+    '''
+    Returns whether or not a file is a DCD file.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: True if the file is a DCD file
+    :rtype: bool
+    '''
+    
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read(8)
+    except IOError:
+        return False
+    
+    return len(data) == 8 and data[4:] == 'CORD' and _byte_order(data[:4]) is not None
+
+def _read_record(f, byteOrder):
+    '''
+    Reads a Fortran record.
+    '''
+    
+    data = f.read(4)
+    if len(data) != 4:
+        raise DCDTrajectoryError("Unexpected end of file")
+    
+    length = struct.unpack(byteOrder + 'i', data)[0]
+    data = f.read(length)
+    end = f.read(4)
+    if len(data) != length or len(end) != 4 or struct.unpack(byteOrder + 'i', end)[0] != length:
+        raise DCDTrajectoryError("Invalid Fortran record")
+    
+    return data
+
+def cell_basis_vectors(cells):
+    '''
+    Returns the basis vectors of the simulation cells stored in the unit cell records of a DCD file.
+    
+    :param cells: the unit cell records (A, gamma, B, beta, alpha, C), lengths in Angstrom
+    :type cells: (n,6) numpy array
+    
+    :return: the basis vectors (rows) in nm
+    :rtype: (n,3,3) numpy array
+    '''
+    
+    cells = numpy.asarray(cells, dtype=numpy.float64)
+    
+    lengths = cells[:,[0,2,5]]*Units.Ang
+    
+    angles = cells[:,[4,3,1]]
+    
+    # CHARMM and NAMD > 2.5 store the cosines of the alpha, beta and gamma angles. The angles computed as pi/2 - asin 
+    # end up at precisely 90 degrees for orthogonal cells. NAMD <= 2.5 stores the angles in degrees.
+    cosines = numpy.all(numpy.abs(angles) <= 1.0, axis=1)
+    angles = numpy.where(cosines[:,numpy.newaxis], 0.5*numpy.pi - numpy.arcsin(numpy.clip(angles,-1.0,1.0)), angles*Units.deg)
+    
+    cosAlpha, cosBeta, cosGamma = numpy.cos(angles).T
+    sinGamma = numpy.sin(angles[:,2])
+    
+    basis = numpy.zeros((len(cells),3,3), dtype=numpy.float64)
+    
+    # By construction the a vector is aligned with the x axis and the b vector is in the xy plane.
+    basis[:,0,0] = 1.0
+    basis[:,1,0] = cosGamma
+    basis[:,1,1] = sinGamma
+    basis[:,2,0] = cosBeta
+    basis[:,2,1] = (cosAlpha - cosBeta*cosGamma)/sinGamma
+    basis[:,2,2] = numpy.sqrt(numpy.maximum(0.0,1.0 - basis[:,2,0]**2 - basis[:,2,1]**2))
+    
+    return basis*lengths[:,:,numpy.newaxis]
+
+class DCDFile(dict):
+    '''
+    Memory mapped reader of a DCD file.
+    
+    The header values are stored as items of the reader.
+    '''
+    
+    def __init__(self, filename):
+        '''
+        :param filename: the name of the DCD file
+        :type filename: str
+        '''
+        
+        self['filename'] = filename
+        
+        with open(filename, 'rb') as f:
+            self.byteOrder = _byte_order(f.read(4))
+            if self.byteOrder is None:
+                raise DCDTrajectoryError("Invalid byte order. %s is not a valid DCD file" % filename)
+            f.seek(0)
+            self._read_header(f)
+            headerSize = f.tell()
+            
+        fileSize = os.path.getsize(filename)
+        
+        self.dtype = self._frame_dtype()
+
+        # The number of frames is taken from the size of the file rather than from the header which is not updated
+        # until the end of the simulation.
+        self['n_frames'] = (fileSize - headerSize)//self.dtype.itemsize
+
+        if self['n_frames'] > 0:
+            self._frames = numpy.memmap(filename, dtype=self.dtype, mode='r', offset=headerSize, shape=(self['n_frames'],))
+            self._check_records(self._frames[0])
+        else:
+            self._frames = numpy.empty((0,), dtype=self.dtype)
+        
+    def _read_header(self, f):
+        '''
+        Reads the three header records of the file.
+        '''
+        
+        data = _read_record(f, self.byteOrder)
+        
+        if data[:4] != 'CORD':
+            raise DCDTrajectoryError("Unrecognized DCD format")
+
+        temp = struct.unpack(self.byteOrder + '20i', data[4:])
+        
+        self['charmm'] = temp[-1]
+                
+        if self['charmm']:
+            temp = struct.unpack(self.byteOrder + '9if10i', data[4:])
+        else:
+            temp = struct.unpack(self.byteOrder + '9id9i', data[4:])
+
+        # Store the number of sets of coordinates
+        self['nset'] = temp[0]
+        
+        # Store the starting time step
+        self['istart'] = temp[1]
+        
+        # Store the number of timesteps between dcd saves
+        self['nsavc'] = temp[2]
+        
+        # Stores the number of fixed atoms
+        self['namnf'] = temp[8]
+
+        # Stop if there are fixed atoms.
+        if self['namnf'] > 0:
+            raise DCDTrajectoryError('Can not handle fixed atoms yet.')
+                                        
+        self['delta'] = temp[9]
+                                            
+        self["time_step"] = self['nsavc']*self['delta']*Units.akma_time           
+
+        self['has_pbc_data'] = temp[10]
+
+        self['has_4d'] = temp[11]
+        
+        data = _read_record(f, self.byteOrder)
+                
+        nLines = struct.unpack(self.byteOrder + 'i', data[0:4])[0]
+        
+        self["title"] = "\n".join([data[4+80*i:4+80*(i+1)].strip() for i in range(nLines)])
+        
+        data = _read_record(f, self.byteOrder)
+        
+        # Read the number of atoms.
+        self['natoms'] = struct.unpack(self.byteOrder + 'i', data)[0]
+        
+    def _frame_dtype(self):
+        '''
+        Returns the structured dtype describing the records of a frame.
+        '''
+        
+        marker = self.byteOrder + 'i4'
+        
+        records = []
+        if self['has_pbc_data']:
+            records.append(('cell', self.byteOrder + 'f8', (6,)))
+        records.extend([(axis, self.byteOrder + 'f4', (self['natoms'],)) for axis in 'xyz'])
+        if self['has_4d']:
+            records.append(('w', self.byteOrder + 'f4', (self['natoms'],)))
+            
+        fields = []
+        for name, dtype, shape in records:
+            fields.append((name + '_start', marker))
+            fields.append((name, dtype, shape))
+            fields.append((name + '_end', marker))
+        
+        return numpy.dtype(fields)
+        
+    def _check_records(self, frame):
+        '''
+        Checks the record markers of a frame against the layout deduced from the header.
+        '''
+        
+        for name in self.dtype.names:
+            if name.endswith('_start'):
+                length = self.dtype.fields[name[:-6]][0].itemsize
+                if frame[name] != length or frame[name[:-6] + '_end'] != length:
+                    raise DCDTrajectoryError("The frames of %s do not match the layout given by its header" % self['filename'])
+
+    def read_cells(self, first=0, last=None, step=1):
+        '''
+        Reads the simulation cells of a range of frames.
+        
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the last frame (excluded). If None, the file is read until its end.
+        :type last: int
+        :param step: the step between two frames
+        :type step: int
+        
+        :return: the basis vectors (rows) in nm or None if the file has no unit cell record
+        :rtype: (n,3,3) numpy array
+        '''
+        
+        if not self['has_pbc_data']:
+            return None
+        
+        return cell_basis_vectors(self._frames['cell'][first:last:step])
+        
+    def read_configurations(self, first=0, last=None, step=1, indexes=None):
+        '''
+        Reads the coordinates of a set of atoms over a range of frames.
+        
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the last frame (excluded). If None, the file is read until its end.
+        :type last: int
+        :param step: the step between two frames
+        :type step: int
+        :param indexes: the indexes of the atoms. If None, all the atoms are read.
+        :type indexes: list of int
+        
+        :return: the coordinates in nm
+        :rtype: (n,nAtoms,3) numpy array
+        '''
+        
+        frames = self._frames[first:last:step]
+        
+        if indexes is None:
+            indexes = slice(None)
+        
+        return numpy.stack([frames[axis][:,indexes] for axis in 'xyz'], axis=-1).astype(numpy.float64)*Units.Ang
+        
+    def read_step(self, index):
+        """
+        Reads a frame of the DCD file.
+        
+        :param index: the index of the frame
+        :type index: int
+        
+        :return: the basis vectors (rows) of the cell in nm (None if the file has no unit cell record) and the coordinates in nm
+        :rtype: 2-tuple
+        """
+        
+        cells = self.read_cells(index, index+1)
+        
+        return None if cells is None else cells[0], self.read_configurations(index, index+1)[0]
+    
+    def close(self):
+        '''
+        Closes the file.
+        '''
+        
+        self._frames = numpy.empty((0,), dtype=self.dtype)
+
+class DCDVariable(object):
+    '''
+    A variable of a DCD trajectory. Indexing the configuration by a frame index returns a configuration. Other indexes 
+    return arrays.
+    '''
+    
+    def __init__(self, trajectory, name):
+        
+        self._trajectory = trajectory
+        
+        self._name = name
+        
+    def __len__(self):
+        
+        return len(self._trajectory)
+        
+    def __getitem__(self, index):
+        
+        traj = self._trajectory
+        
+        if self._name != "configuration":
+            value = traj.frame_array(self._name)[index]
+            return float(value) if value.ndim == 0 else value.copy()
+        
+        if isinstance(index, slice):
+            return traj.dcd.read_configurations(*index.indices(len(traj)))
+
+        if not isinstance(index, (int,long,numpy.integer)):
+            return numpy.array([traj.dcd.read_configurations(i, i+1)[0] for i in range(len(traj))[index]])
+            
+        if index < 0:
+            index += len(traj)
+        
+        return Configuration(traj.universe, traj.dcd.read_configurations(index, index+1)[0], traj.cell_parameters(index))
+
+class ParticleTrajectory(object):
+    '''
+    The trajectory of a single atom, as returned by DCDTrajectory.readParticleTrajectory.
+    '''
+    
+    def __init__(self, array):
+        
+        self.array = array
+            
+class DCDTrajectory(object):
+    '''
+    Read-only trajectory stored in a DCD file.
+    '''
+    
+    def __init__(self, filename, universe=None, pdbFilename=None):
+        '''
+        :param filename: the name of the DCD file
+        :type filename: str
+        :param universe: the universe of the trajectory. If None, it is built from the PDB file.
+        :type universe: MMTK.Universe.Universe
+        :param pdbFilename: the PDB file giving the topology of the trajectory. If None, the PDB file with the same name as the DCD file is used.
+        :type pdbFilename: str
+        '''
+        
+        self.filename = filename
+        
+        self.dcd = DCDFile(filename)
+        
+        if universe is None:
+            if pdbFilename is None:
+                pdbFilename = os.path.splitext(filename)[0] + '.pdb'
+            universe = self._build_universe(pdbFilename)
+        
+        if universe.numberOfAtoms() != self.dcd['natoms']:
+            raise DCDTrajectoryError("The universe of %s has %d atoms instead of %d" % (filename,universe.numberOfAtoms(),self.dcd['natoms']))
+            
+        self.universe = universe
+        
+        self._frameVariables = {'time' : (numpy.arange(len(self)) + 1)*self.dcd['time_step']}
+        if self.dcd['has_pbc_data']:
+            self._frameVariables['box_size'] = self.dcd.read_cells().reshape((len(self),9))
+            
+    def _build_universe(self, pdbFilename):
+        '''
+        Builds the universe of the trajectory from a PDB file.
+        '''
+        
+        from MMTK.PDB import PDBConfiguration
+        from MMTK.Universe import InfiniteUniverse, ParallelepipedicPeriodicUniverse
+        
+        from MDANSE.MolecularDynamics.Trajectory import resolve_undefined_molecules_name
+        
+        if not os.path.exists(pdbFilename):
+            raise DCDTrajectoryError("No PDB file %s giving the topology of %s" % (pdbFilename,self.filename))
+        
+        molecules = PDBConfiguration(pdbFilename).createAll()
+        
+        if self.dcd['has_pbc_data']:
+            universe = ParallelepipedicPeriodicUniverse()
+        else:
+            universe = InfiniteUniverse()
+            
+        universe.addObject(molecules)
+        
+        resolve_undefined_molecules_name(universe)
+        
+        if len(self) > 0:
+            if self.dcd['has_pbc_data']:
+                universe.setShape(self.dcd.read_cells(0,1)[0])
+            universe.setConfiguration(Configuration(universe, self.dcd.read_configurations(0,1)[0]))
+            
+        return universe
+    
+    def __len__(self):
+        
+        return self.dcd['n_frames']
+    
+    def __getattr__(self, name):
+        
+        if name.startswith('_') or not name in self.variables():
+            raise AttributeError(name)
+        
+        return DCDVariable(self, name)
+    
+    def variables(self):
+        '''
+        Returns the names of the variables of the trajectory.
+        
+        :return: the names of the variables
+        :rtype: list of str
+        '''
+        
+        return sorted(['configuration'] + self.__dict__.get('_frameVariables', {}).keys())
+    
+    def frame_array(self, name):
+        '''
+        Returns the array storing a per-frame variable.
+        
+        :param name: the name of the variable
+        :type name: str
+        
+        :return: the values of the variable, indexed first by the frame
+        :rtype: numpy array
+        
+        :raise KeyError: if the variable is not a per-frame variable
+        '''
+        
+        return self._frameVariables[name]
+        
+    def read_atoms(self, indexes, first, last, step=1, variable="configuration"):
+        '''
+        Reads the coordinates of a set of atoms over a range of frames. Only the coordinates of those atoms are read.
+        
+        :param indexes: the indexes of the atoms
+        :type indexes: list of int
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the last frame (excluded)
+        :type last: int
+        :param step: the step between two frames
+        :type step: int
+        :param variable: the per-atom variable to read
+        :type variable: str
+        
+        :return: the coordinates of the atoms
+        :rtype: (nFrames,nAtoms,3) numpy array
+        '''
+        
+        if variable != "configuration":
+            raise DCDTrajectoryError("Unknown per-atom variable %r in DCD trajectory %r" % (variable,self.filename))
+        
+        return self.dcd.read_configurations(first, last, step, list(indexes))
+        
+    def cell_parameters(self, frame):
+        '''
+        Returns the cell parameters of a frame.
+        
+        :param frame: the index of the frame
+        :type frame: int
+        
+        :return: the cell parameters or None if the trajectory is not periodic
+        :rtype: numpy array
+        '''
+        
+        if not 'box_size' in self._frameVariables:
+            return None
+        
+        return self._frameVariables['box_size'][frame].copy()
+    
+    def readParticleTrajectory(self, atom, first=0, last=None, skip=1, variable="configuration"):
+        '''
+        Reads the trajectory of a single atom. The jumps due to the periodic boundary conditions are removed from the 
+        configurations.
+        
+        :return: the trajectory of the atom
+        :rtype: MDANSE.MolecularDynamics.DCDTrajectory.ParticleTrajectory
+        '''
+        
+        from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+        
+        return ParticleTrajectory(read_atoms_trajectories(self, [atom], first, last, skip, variable)[:,0,:])
+    
+    def reopen(self):
+        '''
+        Returns a new handle on the trajectory file sharing the universe of this one.
+        
+        :return: the new handle
+        :rtype: MDANSE.MolecularDynamics.DCDTrajectory.DCDTrajectory
+        '''
+        
+        return DCDTrajectory(self.filename, self.universe)
+        
+    def close(self):
+        '''
+        Closes the trajectory.
+        '''
+        
+        self.dcd.close()
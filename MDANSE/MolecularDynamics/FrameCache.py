@@ -0,0 +1,218 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+'''
+Cache of the frames read from the trajectory files
+
+The frames decoded from a trajectory file are kept in a least recently used cache shared by all the trajectories
+opened in the process, so that the analysis run one after the other on the same trajectory or a viewer going back
+and forth through a trajectory do not decode the same frames again. The memory held by the cache is bounded by the 
+'frame_cache_memory' preferences item. The cache is opt-in: that item is 0 by default, which disables it.
+
+The frames are keyed by the trajectory file, the trajectory variable and the frame index. Each frame also records the
+modification time and the size of its file so that a frame read from a file modified since then is never returned.
+'''
+
+import collections
+import os
+import threading
+
+from MDANSE import PREFERENCES
+
+def file_stamp(filename):
+    '''
+    Returns the modification time and the size of a file.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: the modification time and the size of the file, None if the file does not exist
+    :rtype: 2-tuple
+    '''
+    
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    
+    return (stat.st_mtime,stat.st_size)
+
+class FrameCache(object):
+    '''
+    Least recently used cache of the frames read from the trajectory files.
+    
+    A frame is stored as a tuple of numpy arrays (typically the configuration and the cell parameters). The arrays
+    are made read-only so that a frame can not be modified once in the cache.
+    '''
+    
+    def __init__(self, budget=None):
+        '''
+        :param budget: the maximum memory (in bytes) held by the cache. If None, it is given by the 'frame_cache_memory' preferences item.
+        :type budget: int
+        '''
+        
+        self._budget = budget
+        
+        self._frames = collections.OrderedDict()
+        
+        self._size = 0
+        
+        self._hits = 0
+        
+        self._misses = 0
+        
+        self._lock = threading.Lock()
+        
+    @property
+    def budget(self):
+        '''
+        Returns the maximum memory (in bytes) held by the cache.
+        
+        :return: the memory budget of the cache
+        :rtype: int
+        '''
+        
+        if self._budget is not None:
+            return self._budget
+        
+        return PREFERENCES.get_preferences_item("frame_cache_memory").value*1024*1024
+        
+    def get(self, filename, variable, frame):
+        '''
+        Returns a frame from the cache.
+        
+        :param filename: the name of the trajectory file
+        :type filename: str
+        :param variable: the trajectory variable
+        :type variable: str
+        :param frame: the index of the frame
+        :type frame: int
+        
+        :return: the frame or None if it is not in the cache or if the file has been modified since it was cached
+        :rtype: tuple of numpy arrays
+        '''
+        
+        key = (os.path.abspath(filename),variable,frame)
+        
+        stamp = file_stamp(key[0])
+        
+        with self._lock:
+            
+            entry = self._frames.pop(key, None)
+            
+            if entry is None or entry[0] != stamp:
+                if entry is not None:
+                    self._size -= entry[2]
+                self._misses += 1
+                return None
+            
+            # Moves the frame to the most recently used end.
+            self._frames[key] = entry
+            
+            self._hits += 1
+            
+            return entry[1]
+        
+    def put(self, filename, variable, frame, arrays):
+        '''
+        Stores a frame in the cache, evicting the least recently used frames to remain within the memory budget.
+        
+        :param filename: the name of the trajectory file
+        :type filename: str
+        :param variable: the trajectory variable
+        :type variable: str
+        :param frame: the index of the frame
+        :type frame: int
+        :param arrays: the frame. The arrays are stored as is and must not be modified afterwards.
+        :type arrays: tuple of numpy arrays
+        '''
+        
+        budget = self.budget
+        
+        size = sum([a.nbytes for a in arrays if a is not None])
+        
+        if size > budget:
+            return
+        
+        for a in arrays:
+            if a is not None:
+                a.setflags(write=False)
+        
+        key = (os.path.abspath(filename),variable,frame)
+        
+        stamp = file_stamp(key[0])
+        
+        with self._lock:
+            
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            
+            while self._frames and self._size + size > budget:
+                _, entry = self._frames.popitem(last=False)
+                self._size -= entry[2]
+                
+            self._frames[key] = (stamp,tuple(arrays),size)
+            self._size += size
+        
+    def discard(self, filename):
+        '''
+        Removes from the cache the frames of a trajectory file.
+        
+        :param filename: the name of the trajectory file
+        :type filename: str
+        '''
+        
+        filename = os.path.abspath(filename)
+        
+        with self._lock:
+            for key in [k for k in self._frames if k[0] == filename]:
+                self._size -= self._frames.pop(key)[2]
+        
+    def clear(self):
+        '''
+        Empties the cache and resets its statistics.
+        '''
+        
+        with self._lock:
+            self._frames.clear()
+            self._size = 0
+            self._hits = 0
+            self._misses = 0
+        
+    def stats(self):
+        '''
+        Returns the statistics of the cache.
+        
+        :return: the number of hits, misses and cached frames and the memory (in bytes) held by the cache
+        :rtype: dict
+        '''
+        
+        with self._lock:
+            return {'hits' : self._hits, 'misses' : self._misses, 'frames' : len(self._frames), 'size' : self._size}
+
+FRAME_CACHE = FrameCache()
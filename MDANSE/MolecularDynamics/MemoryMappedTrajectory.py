@@ -0,0 +1,400 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+'''
+Memory mapped trajectories
+
+A memory mapped trajectory is a single binary file made of:
+
+    #. a magic string and the length of the header
+    #. a JSON header giving the number of frames and atoms and the layout of the file
+    #. the topology of the trajectory, stored as the MMTK description of its universe
+    #. one array per trajectory variable, storing all the frames of the variable with a fixed stride
+
+The per-atom variables (configuration, velocities ...) are stored in float32 or float64 as (frame, atom, xyz)
+arrays, the cell as a (frame, 3) or (frame, 9) array and the other variables (time, energies ...) as (frame,) arrays 
+of float64. Each array starts on a page boundary and is read through numpy.memmap so that any frame can be accessed 
+without decoding the file.
+
+A MemoryMappedTrajectory provides the subset of the MMTK.Trajectory.Trajectory interface used by the MDANSE jobs
+so that they run unchanged on memory mapped trajectories.
+'''
+
+import json
+import os
+import struct
+
+import numpy
+
+from MMTK.ParticleProperties import Configuration, ParticleVector
+
+from MDANSE.Core.Error import Error
+
+class MemoryMappedTrajectoryError(Error):
+    pass
+
+# The string starting a memory mapped trajectory file.
+MAGIC = "MDANSEMM"
+
+# The version of the file layout.
+VERSION = 1
+
+# The alignment (in bytes) of the topology and of the arrays in the file.
+ALIGNMENT = 4096
+
+def _align(offset):
+    
+    return (offset + ALIGNMENT - 1)//ALIGNMENT*ALIGNMENT
+
+def is_memory_mapped_trajectory(filename):
+    '''
+    Returns whether or not a file is a memory mapped trajectory.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: True if the file starts with the memory mapped trajectory magic string
+    :rtype: bool
+    '''
+    
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+    
+def read_header(filename):
+    '''
+    Reads the header of a memory mapped trajectory.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: the header
+    :rtype: dict
+    '''
+    
+    try:
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise MemoryMappedTrajectoryError("%r is not a memory mapped trajectory" % filename)
+            length, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(length))
+    except (IOError,ValueError,struct.error) as e:
+        raise MemoryMappedTrajectoryError("Could not read the header of the memory mapped trajectory %r: %s" % (filename,e))
+    
+    if header.get('version') != VERSION:
+        raise MemoryMappedTrajectoryError("Unsupported version of memory mapped trajectory: %r" % header.get('version'))
+    
+    return header
+        
+class MemoryMappedTrajectoryWriter(object):
+    '''
+    Writes a memory mapped trajectory. The number of frames and the variables are fixed once the file is created.
+    '''
+    
+    def __init__(self, filename, universe, nFrames, variables, dtype=numpy.float32):
+        '''
+        :param filename: the name of the file
+        :type filename: str
+        :param universe: the universe of the trajectory
+        :type universe: MMTK.Universe.Universe
+        :param nFrames: the number of frames
+        :type nFrames: int
+        :param variables: the shape of a frame of each variable. The variables whose frames are (nAtoms,3) arrays are per-atom variables.
+        :type variables: dict
+        :param dtype: the type in which the per-atom variables are stored
+        :type dtype: numpy dtype
+        '''
+        
+        nAtoms = universe.numberOfAtoms()
+        
+        topology = universe.description()
+        
+        dtype = numpy.dtype(dtype)
+        
+        header = {'version' : VERSION, 'n_frames' : nFrames, 'n_atoms' : nAtoms, 'variables' : {}}
+
+        layout = {}
+        for name in variables:
+            shape = tuple(variables[name])
+            varType = dtype if shape == (nAtoms,3) else numpy.dtype(numpy.float64)
+            layout[name] = (shape, varType)
+            
+        # The header is written at the beginning of the file and the topology at the first page boundary following it.
+        # A first pass with offsets larger than any actual one gives an upper bound for the size of the header.
+        for name, (shape, varType) in layout.items():
+            header['variables'][name] = {'offset' : 10**15, 'shape' : list(shape), 'dtype' : varType.name}
+        header['topology'] = {'offset' : 10**15, 'length' : len(topology)}
+        
+        start = _align(len(MAGIC) + 8 + len(json.dumps(header)))
+        
+        header['topology']['offset'] = start
+        offset = _align(start + len(topology))
+        for name in sorted(layout):
+            shape, varType = layout[name]
+            header['variables'][name]['offset'] = offset
+            offset = _align(offset + nFrames*int(numpy.prod(shape))*varType.itemsize)
+            
+        encodedHeader = json.dumps(header)
+        
+        try:
+            with open(filename, 'wb') as f:
+                f.write(MAGIC)
+                f.write(struct.pack('<Q', len(encodedHeader)))
+                f.write(encodedHeader)
+                f.seek(start)
+                f.write(topology)
+                f.truncate(offset)
+        except IOError as e:
+            raise MemoryMappedTrajectoryError("Could not create the memory mapped trajectory %r: %s" % (filename,e))
+            
+        self._filename = filename
+        
+        self._header = header
+        
+        self._arrays = {}
+        for name, info in header['variables'].items():
+            self._arrays[name] = numpy.memmap(filename, dtype=info['dtype'], mode='r+', offset=info['offset'], shape=tuple([nFrames] + info['shape']))
+            
+    def write_frame(self, frame, values):
+        '''
+        Writes a frame.
+        
+        :param frame: the index of the frame
+        :type frame: int
+        :param values: the values of the variables for that frame. The missing variables are left to 0.
+        :type values: dict
+        '''
+        
+        for name, value in values.items():
+            try:
+                self._arrays[name][frame] = value
+            except KeyError:
+                raise MemoryMappedTrajectoryError("Unknown variable %r for the memory mapped trajectory %r" % (name,self._filename))
+        
+    def close(self):
+        '''
+        Flushes and closes the file.
+        '''
+        
+        for array in self._arrays.values():
+            array.flush()
+            
+        self._arrays = {}
+        
+class ParticleTrajectory(object):
+    '''
+    The trajectory of a single atom, as returned by MemoryMappedTrajectory.readParticleTrajectory.
+    '''
+    
+    def __init__(self, array):
+        
+        self.array = array
+            
+class MemoryMappedVariable(object):
+    '''
+    A variable of a memory mapped trajectory. Indexing a per-atom variable by a frame index returns a configuration or a 
+    particle vector. Other indexes return copies of the underlying arrays.
+    '''
+    
+    def __init__(self, trajectory, name):
+        
+        self._trajectory = trajectory
+        
+        self._name = name
+        
+        self._array = trajectory.memory_mapped_array(name)
+        
+    def __len__(self):
+        
+        return len(self._array)
+        
+    def __getitem__(self, index):
+        
+        if not isinstance(index, (int,long,numpy.integer)):
+            return numpy.array(self._array[index], dtype=numpy.float64)
+        
+        value = self._array[index]
+        
+        if self._array.ndim == 1:
+            return float(value)
+        
+        if self._array.shape[1:] != (self._trajectory.universe.numberOfAtoms(),3):
+            return numpy.array(value, dtype=numpy.float64)
+        
+        value = numpy.array(value, dtype=numpy.float64)
+        
+        if self._name == "configuration":
+            return Configuration(self._trajectory.universe, value, self._trajectory.cell_parameters(index))
+        else:
+            return ParticleVector(self._trajectory.universe, value)
+
+class MemoryMappedTrajectory(object):
+    '''
+    Read-only trajectory stored in a memory mapped trajectory file.
+    '''
+    
+    def __init__(self, filename, universe=None):
+        '''
+        :param filename: the name of the file
+        :type filename: str
+        :param universe: the universe of the trajectory. If None, it is built from the topology stored in the file.
+        :type universe: MMTK.Universe.Universe
+        '''
+        
+        self.filename = filename
+        
+        self._header = read_header(filename)
+        
+        self._arrays = {}
+        for name, info in self._header['variables'].items():
+            self._arrays[name] = numpy.memmap(filename, dtype=info['dtype'], mode='r', offset=info['offset'], shape=tuple([self._header['n_frames']] + info['shape']))
+            
+        if universe is None:
+            universe = self._build_universe()
+            
+        self.universe = universe
+        
+    def _build_universe(self):
+        '''
+        Builds the universe of the trajectory from its topology.
+        '''
+        
+        import MMTK.Skeleton
+        
+        with open(self.filename, 'rb') as f:
+            f.seek(self._header['topology']['offset'])
+            description = f.read(self._header['topology']['length'])
+
+        conf = None
+        if 'configuration' in self._arrays and len(self) > 0:
+            conf = numpy.array(self._arrays['configuration'][0], dtype=numpy.float64)
+            
+        skeleton = eval(description, vars(MMTK.Skeleton), {})
+        universe = skeleton.make({}, conf)
+
+        cell = self.cell_parameters(0) if len(self) > 0 else None
+        if cell is not None:
+            universe.setCellParameters(cell)
+            
+        return universe
+    
+    def __len__(self):
+        
+        return self._header['n_frames']
+    
+    def __getattr__(self, name):
+        
+        if name.startswith('_') or not name in self.__dict__.get('_arrays', {}):
+            raise AttributeError(name)
+        
+        return MemoryMappedVariable(self, name)
+    
+    def variables(self):
+        '''
+        Returns the names of the variables of the trajectory.
+        
+        :return: the names of the variables
+        :rtype: list of str
+        '''
+        
+        return sorted(self._arrays.keys())
+    
+    def memory_mapped_array(self, name):
+        '''
+        Returns the memory mapped array storing a variable. No data is copied.
+        
+        :param name: the name of the variable
+        :type name: str
+        
+        :return: the array of the variable, indexed first by the frame
+        :rtype: numpy.memmap
+        '''
+        
+        try:
+            return self._arrays[name]
+        except KeyError:
+            raise MemoryMappedTrajectoryError("Unknown variable %r in memory mapped trajectory %r" % (name,self.filename))
+        
+    def cell_parameters(self, frame):
+        '''
+        Returns the cell parameters of a frame.
+        
+        :param frame: the index of the frame
+        :type frame: int
+        
+        :return: the cell parameters or None if the trajectory is not periodic
+        :rtype: numpy array
+        '''
+        
+        if not 'box_size' in self._arrays:
+            return None
+        
+        return numpy.array(self._arrays['box_size'][frame], dtype=numpy.float64)
+    
+    def readParticleTrajectory(self, atom, first=0, last=None, skip=1, variable="configuration"):
+        '''
+        Reads the trajectory of a single atom. The jumps due to the periodic boundary conditions are removed from the 
+        configurations.
+        
+        :return: the trajectory of the atom
+        :rtype: MDANSE.MolecularDynamics.MemoryMappedTrajectory.ParticleTrajectory
+        
+        :raise MemoryMappedTrajectoryError: if the variable is not a per-atom variable of the trajectory or if the 
+        layout of its cell is unknown
+        '''
+        
+        from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+        
+        # read_atoms_trajectories reads the variables by hyperslabs and falls back on this method for the ones it can 
+        # not read that way, which are therefore rejected here.
+        array = self.memory_mapped_array(variable)
+        if array.shape[1:] != (self.universe.numberOfAtoms(),3):
+            raise MemoryMappedTrajectoryError("The variable %r of memory mapped trajectory %r is not a per-atom variable" % (variable,self.filename))
+        
+        if variable == "configuration" and self.universe.is_periodic and 'box_size' in self._arrays and not self._arrays['box_size'].shape[1:] in [(3,),(9,)]:
+            raise MemoryMappedTrajectoryError("Unknown cell layout in memory mapped trajectory %r" % self.filename)
+        
+        return ParticleTrajectory(read_atoms_trajectories(self, [atom], first, last, skip, variable)[:,0,:])
+    
+    def reopen(self):
+        '''
+        Returns a new handle on the trajectory file sharing the universe of this one.
+        
+        :return: the new handle
+        :rtype: MDANSE.MolecularDynamics.MemoryMappedTrajectory.MemoryMappedTrajectory
+        '''
+        
+        return MemoryMappedTrajectory(self.filename, self.universe)
+        
+    def close(self):
+        '''
+        Closes the trajectory.
+        '''
+        
+        self._arrays = {}
@@ -0,0 +1,157 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+'''
+Cache of the topology of the trajectories
+
+Opening a trajectory names its unnamed molecules and computes the bonds of its atom clusters from the covalent radii 
+of their atoms, which takes minutes for large clusters. The molecule names and the bonds are stored in a cache file 
+(numpy .npz format) stored next to the trajectory (see MDANSE.MolecularDynamics.TrajectoryCache.cache_directory) so 
+that the next openings of the trajectory, including those of the worker processes, read them instead.
+
+The cache records the modification time and the size of the trajectory file, its number of atoms and the tolerance 
+used to compute the bonds. It is ignored as soon as one of them changes.
+'''
+
+import json
+import os
+
+import numpy
+
+from MDANSE.MolecularDynamics.TrajectoryCache import cache_directory
+
+class TopologyCache(object):
+    '''
+    The molecule names and the bonds of a trajectory.
+    '''
+    
+    def __init__(self, filename, directory=None):
+        '''
+        :param filename: the name of the trajectory file
+        :type filename: str
+        :param directory: the directory where the cache is stored. If None, it is given by cache_directory.
+        :type directory: str
+        '''
+        
+        self._filename = os.path.abspath(filename)
+        
+        if directory is None:
+            directory = cache_directory(self._filename)
+            
+        self._cacheFile = os.path.join(directory, "%s.topology.npz" % os.path.basename(self._filename))
+        
+    @property
+    def cache_filename(self):
+        '''
+        Returns the name of the cache file.
+        
+        :return: the name of the cache file
+        :rtype: str
+        '''
+        
+        return self._cacheFile
+
+    def _header(self, nAtoms, tolerance):
+        '''
+        Returns the header matching the current state of the trajectory file.
+        '''
+        
+        stat = os.stat(self._filename)
+        
+        return {'mtime' : stat.st_mtime,
+                'size' : stat.st_size,
+                'n_atoms' : nAtoms,
+                'tolerance' : tolerance}
+        
+    def load(self, nAtoms, tolerance):
+        '''
+        Loads the cached topology.
+        
+        :param nAtoms: the number of atoms of the trajectory
+        :type nAtoms: int
+        :param tolerance: the tolerance used to compute the bonds
+        :type tolerance: float
+        
+        :return: the names of the chemical objects of the universe in the order of its object list and the bonds as 
+        a (nBonds,2) array of atom indexes, None if the cache does not exist or does not match the trajectory
+        :rtype: 2-tuple
+        '''
+        
+        try:
+            with numpy.load(self._cacheFile) as data:
+                header = json.loads(str(data['header']))
+                if header != self._header(nAtoms, tolerance):
+                    return None
+                names = [str(n) for n in data['names']]
+                bonds = numpy.array(data['bonds'], dtype=numpy.int32).reshape((-1,2))
+        except (IOError,OSError,KeyError,ValueError):
+            return None
+        
+        return names, bonds
+        
+    def save(self, names, bonds, nAtoms, tolerance):
+        '''
+        Saves the topology to the cache. The cache is written in a temporary file renamed once complete so that 
+        several processes can save it concurrently.
+        
+        :param names: the names of the chemical objects of the universe in the order of its object list
+        :type names: list of str
+        :param bonds: the bonds
+        :type bonds: (nBonds,2) numpy array of atom indexes
+        :param nAtoms: the number of atoms of the trajectory
+        :type nAtoms: int
+        :param tolerance: the tolerance used to compute the bonds
+        :type tolerance: float
+        
+        :return: True if the cache could be written
+        :rtype: bool
+        '''
+        
+        tempFile = self._cacheFile + '.%d.tmp' % os.getpid()
+        
+        try:
+            header = self._header(nAtoms, tolerance)
+            
+            with open(tempFile, 'wb') as f:
+                numpy.savez(f,
+                            header=numpy.array(json.dumps(header)),
+                            names=numpy.array(names, dtype=str),
+                            bonds=numpy.asarray(bonds, dtype=numpy.int32).reshape((-1,2)))
+                
+            # os.rename can not overwrite an existing file on Windows.
+            if os.path.exists(self._cacheFile):
+                os.remove(self._cacheFile)
+            os.rename(tempFile, self._cacheFile)
+            
+        except (IOError,OSError):
+            return False
+        
+        finally:
+            if os.path.exists(tempFile):
+                os.remove(tempFile)
+                
+        return True
@@ -1,15 +1,26 @@
+import contextlib
 import operator
+import os
+import Queue
+import sys
+import threading
 
 import numpy
 
 from MMTK import Atom, AtomCluster
 from MMTK.Collections import Collection
-from MMTK.Trajectory import Trajectory
+from MMTK.ParticleProperties import Configuration, ParticleVector
+from MMTK.Trajectory import SnapshotGenerator, Trajectory, TrajectoryOutput
 from MMTK.ChemicalObjects import isChemicalObject
 
-from MDANSE import ELEMENTS
+from MDANSE import ELEMENTS, PREFERENCES
 from MDANSE.Core.Error import Error
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
 from MDANSE.Extensions import fast_calculation
+from MDANSE.MolecularDynamics.CompressedTrajectory import compressed_filename, CompressedSnapshotGenerator, CompressedTrajectoryWriter
+from MDANSE.MolecularDynamics.FrameCache import FRAME_CACHE
+from MDANSE.MolecularDynamics.TopologyCache import TopologyCache
+from MDANSE.MolecularDynamics.TrajectoryCache import TransposedTrajectoryCache
 
 class MolecularDynamicsError(Error):
     pass
@@ -17,6 +28,15 @@ class MolecularDynamicsError(Error):
 class UniverseAdapterError(Error):
     pass
 
+# The frame preloaded by preloaded_frame for the current thread.
+_PRELOADED = threading.local()
+
+# The frame prefetcher installed for the current thread.
+_PREFETCHER = threading.local()
+
+# Serializes the deferred connectivity builds (see ensure_connectivity).
+_CONNECTIVITY_LOCK = threading.Lock()
+
 def atomindex_to_moleculeindex(universe):
     
     d = {}
@@ -36,11 +56,38 @@ def brute_formula(molecule, sep='_'):
     
     return sep.join([''.join(v) for v in sorted(contents.items())])
 
-def build_connectivity(universe ,tolerance=0.05):
+def cluster_bonds(universe, tolerance=0.05, conf=None, cell=None):
+    '''
+    Computes the bonds of the atom clusters of a universe. Two atoms are bonded if their distance is lower than the sum 
+    of their covalent radii plus a tolerance. For periodic universes, the distances follow the minimum image convention.
+    
+    :param universe: the universe
+    :type universe: MMTK.Universe.Universe
+    :param tolerance: the tolerance (in nm)
+    :type tolerance: float
+    :param conf: the configuration from which the bonds are computed. If None, the current configuration of the universe is used.
+    :type conf: MMTK.ParticleProperties.Configuration
+    :param cell: for periodic universes, the direct and reciprocal basis vectors of the cell of conf. If None, those of 
+    the current cell of the universe are used.
+    :type cell: 2-tuple of (3,3) numpy arrays
+    
+    :return: the bonds
+    :rtype: (nBonds,2) numpy array of atom indexes
+    '''
     
     bonds = []
     
-    conf = universe.contiguousObjectConfiguration()
+    radii = {}
+    
+    conf = universe.contiguousObjectConfiguration(conf=conf)
+    
+    if not universe.is_periodic:
+        cell = rcell = None
+    elif cell is None:
+        cell = numpy.array(universe.basisVectors(), dtype=numpy.float64)
+        rcell = numpy.array(universe.reciprocalBasisVectors(), dtype=numpy.float64)
+    else:
+        cell, rcell = cell
                 
     for obj in universe.objectList():
                                     
@@ -56,21 +103,62 @@ def build_connectivity(universe ,tolerance=0.05):
         coords = conf.array[indexes,:]
         covRadii = numpy.zeros((nAtoms,), dtype=numpy.float64)
         for i,at in enumerate(atoms):
-            covRadii[i] = ELEMENTS[at.symbol.capitalize(),'covalent_radius']
-        
-        bonds = []
-        fast_calculation.cpt_cluster_connectivity(coords,covRadii,tolerance,bonds)
-                  
-        for idx1,idx2 in bonds:
-            if hasattr(atoms[idx1],"bonded_to__"):
-                atoms[idx1].bonded_to__.append(atoms[idx2])
-            else:
-                atoms[idx1].bonded_to__ = [atoms[idx2]]
-                  
-            if hasattr(atoms[idx2],"bonded_to__"):
-                atoms[idx2].bonded_to__.append(atoms[idx1])
-            else:
-                atoms[idx2].bonded_to__ = [atoms[idx1]]
+            if not at.symbol in radii:
+                radii[at.symbol] = ELEMENTS[at.symbol.capitalize(),'covalent_radius']
+            covRadii[i] = radii[at.symbol]
+        
+        clusterBonds = fast_calculation.cpt_cluster_connectivity(coords,covRadii,tolerance,cell,rcell)
+        
+        bonds.append(numpy.array(indexes, dtype=numpy.int32)[clusterBonds])
+        
+    if not bonds:
+        return numpy.zeros((0,2), dtype=numpy.int32)
+        
+    return numpy.concatenate(bonds)
+
+def set_bonds(universe, bonds):
+    '''
+    Adds a set of bonds to the atoms of a universe.
+    
+    :param universe: the universe
+    :type universe: MMTK.Universe.Universe
+    :param bonds: the bonds
+    :type bonds: (nBonds,2) numpy array of atom indexes
+    '''
+    
+    atoms = sorted_atoms(universe)
+    
+    for idx1,idx2 in bonds:
+        at1 = atoms[idx1]
+        at2 = atoms[idx2]
+        if hasattr(at1,"bonded_to__"):
+            at1.bonded_to__.append(at2)
+        else:
+            at1.bonded_to__ = [at2]
+              
+        if hasattr(at2,"bonded_to__"):
+            at2.bonded_to__.append(at1)
+        else:
+            at2.bonded_to__ = [at1]
+
+def build_connectivity(universe ,tolerance=0.05):
+    
+    set_bonds(universe, cluster_bonds(universe, tolerance))
+
+def ensure_connectivity(universe):
+    '''
+    Sets the bonds of a universe whose connectivity has been deferred by open_topology. Does nothing otherwise.
+    
+    :param universe: the universe
+    :type universe: MMTK.Universe.Universe
+    '''
+    
+    with _CONNECTIVITY_LOCK:
+        pending = getattr(universe, 'pending_connectivity__', None)
+        if pending is None:
+            return
+        universe.pending_connectivity__ = None
+        pending()
 
 def find_atoms_in_molecule(universe, moleculeName, atomNames, indexes=False):
 
@@ -134,23 +222,794 @@ def partition_universe(universe,groups):
     
     return coll
 
+# Two atoms whose indexes differ by less than that are read in the same hyperslab.
+HYPERSLAB_MAX_GAP = 64
+
+# The maximum memory (in bytes) used to read the trajectories of a batch of atoms.
+READ_BUFFER_SIZE = 128*1024*1024
+
+def _atom_runs(indexes, maxGap):
+    '''
+    Splits a sorted list of atom indexes into runs of close indexes.
+    
+    :param indexes: the sorted atom indexes
+    :type indexes: list of int
+    :param maxGap: the maximum difference between two consecutive indexes of a run
+    :type maxGap: int
+    
+    :return: the runs
+    :rtype: list of lists of int
+    '''
+    
+    runs = []
+    for idx in indexes:
+        if runs and idx - runs[-1][-1] <= maxGap:
+            runs[-1].append(idx)
+        else:
+            runs.append([idx])
+            
+    return runs
+
+def _stored_variable(trajectory, variable):
+    '''
+    Returns the array storing a variable of a trajectory, indexed first by the frame.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory or MDANSE.MolecularDynamics.MemoryMappedTrajectory.MemoryMappedTrajectory
+    :param variable: the trajectory variable
+    :type variable: str
+    
+    :return: the NetCDF variable or the memory mapped array of the variable
+    :rtype: Scientific.IO.NetCDF.NetCDFVariable or numpy.memmap
+    
+    :raise KeyError: if the variable can not be accessed directly
+    '''
+    
+    # Looked up on the class as the MMTK trajectories resolve their unknown attributes as trajectory variables.
+    if hasattr(type(trajectory), 'memory_mapped_array'):
+        if not variable in trajectory.variables():
+            raise KeyError(variable)
+        return trajectory.memory_mapped_array(variable)
+    
+    # The compressed trajectories only store their per-frame variables as arrays.
+    if hasattr(type(trajectory), 'frame_array'):
+        return trajectory.frame_array(variable)
+    
+    try:
+        return trajectory.trajectory.file.variables[variable]
+    except AttributeError:
+        raise KeyError(variable)
+
+def _netcdf_variable(trajectory, variable):
+    '''
+    Returns the array storing a variable of a trajectory if it can be read by hyperslabs.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory or MDANSE.MolecularDynamics.MemoryMappedTrajectory.MemoryMappedTrajectory
+    :param variable: the trajectory variable
+    :type variable: str
+    
+    :return: the NetCDF variable, the memory mapped array or None if the variable is not stored as a (step, atom, xyz) array
+    :rtype: Scientific.IO.NetCDF.NetCDFVariable or numpy.memmap
+    '''
+    
+    try:
+        var = _stored_variable(trajectory, variable)
+    except KeyError:
+        return None
+
+    # The block structured trajectories have an additional minor step dimension.
+    if len(var.shape) != 3:
+        return None
+    
+    return var
+
+def _cells(trajectory, first, last, step):
+    '''
+    Returns the basis vectors of the simulation cell of a periodic trajectory for a range of frames.
+    
+    :return: the basis vectors (rows) for each frame or None if the layout of the cell is unknown
+    :rtype: (n,3,3) numpy array
+    '''
+    
+    nFrames = len(range(first, last, step))
+
+    try:
+        boxSize = numpy.array(_stored_variable(trajectory, 'box_size')[first:last:step], dtype=numpy.float64)
+    except KeyError:
+        basis = numpy.array(trajectory.universe.basisVectors(), dtype=numpy.float64)
+        return numpy.tile(basis, (nFrames,1,1))
+
+    if boxSize.shape[1] == 3:
+        cells = numpy.zeros((nFrames,3,3), dtype=numpy.float64)
+        for i in range(3):
+            cells[:,i,i] = boxSize[:,i]
+        return cells
+
+    elif boxSize.shape[1] == 9:
+        return boxSize.reshape((nFrames,3,3))
+    
+    else:
+        return None
+
+def _remove_jumps(series, cells):
+    '''
+    Removes the jumps due to the periodic boundary conditions from atomic trajectories.
+    
+    :param series: the positions of the atoms
+    :type series: (nFrames,nAtoms,3) numpy array
+    :param cells: the basis vectors (rows) of the simulation cell for each frame
+    :type cells: (nFrames,3,3) numpy array
+    
+    :return: the continuous positions
+    :rtype: (nFrames,nAtoms,3) numpy array
+    '''
+    
+    boxCoords = numpy.einsum('fai,fij->faj', series, numpy.linalg.inv(cells))
+    
+    jumps = numpy.diff(boxCoords, axis=0)
+    jumps = numpy.round(jumps)
+    
+    boxCoords[1:] -= numpy.cumsum(jumps, axis=0)
+    
+    return numpy.einsum('faj,fji->fai', boxCoords, cells)
+
+def transposed_cache(trajectory, variable="configuration"):
+    '''
+    Returns the atom-major cache of a trajectory variable, building it if it does not exist or is outdated.
+    
+    The cache is opt-in: it is only used when the 'trajectory_cache' preferences item is set to the type of the cached 
+    values.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param variable: the trajectory variable
+    :type variable: str
+    
+    :return: the cache or None if the cache is disabled, the variable can not be cached or the cache is being built by another process
+    :rtype: MDANSE.MolecularDynamics.TrajectoryCache.TransposedTrajectoryCache
+    '''
+    
+    dtype = PREFERENCES.get_preferences_item("trajectory_cache").value
+    if dtype == "none":
+        return None
+    
+    caches = trajectory.__dict__.setdefault('transposed_caches', {})
+    
+    cache = caches.get((variable,dtype))
+    if cache is not None:
+        return cache
+    
+    var = _netcdf_variable(trajectory, variable)
+    if var is None:
+        return None
+
+    cache = TransposedTrajectoryCache(trajectory.filename, variable, dtype)
+    
+    with read_lock(trajectory):
+        if not cache.is_valid() and not cache.build(var):
+            return None
+        
+    caches[(variable,dtype)] = cache
+    
+    return cache
+
+def read_atoms_trajectories(trajectory, atoms, first, last=None, step=1, variable="configuration", dtype=numpy.float64):
+    '''
+    Reads the trajectories of a set of atoms.
+    
+    For NetCDF trajectories, the atoms are read from the atom-major cache of the trajectory if enabled (see 
+    transposed_cache), otherwise by hyperslabs of close atoms rather than one by one. The virtual trajectories (see 
+    MDANSE.MolecularDynamics.VirtualTrajectory) are read from their parent trajectory. The compressed trajectories (see
+    MDANSE.MolecularDynamics.CompressedTrajectory) decode each frame once for all the atoms. As with the
+    readParticleTrajectory method of MMTK, the jumps due to the periodic boundary conditions are removed from the 
+    configurations.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param atoms: the atoms or their indexes
+    :type atoms: list of MMTK.Atom or int
+    :param first: the index of the first frame
+    :type first: int
+    :param last: the index of the last frame (excluded). If None, the trajectory is read until its end.
+    :type last: int
+    :param step: the step between two frames
+    :type step: int
+    :param variable: the trajectory variable to read
+    :type variable: str
+    :param dtype: the type of the returned array
+    :type dtype: numpy dtype
+    
+    :return: the trajectories of the atoms, in the order of the input atoms
+    :rtype: (nFrames,nAtoms,3) numpy array
+    '''
+    
+    if last is None:
+        last = len(trajectory)
+        
+    indexes = [at.index if isinstance(at,Atom) else int(at) for at in atoms]
+    
+    # Looked up on the class as the MMTK trajectories resolve their unknown attributes as trajectory variables.
+    if hasattr(type(trajectory), 'parent_frames'):
+        first, last, step = trajectory.parent_frames(first, last, step)
+        with read_lock(trajectory):
+            return read_atoms_trajectories(trajectory.parent, trajectory.parent_atoms(indexes), first, last, step, variable, dtype)
+        
+    if hasattr(type(trajectory), 'read_atoms'):
+        with INSTRUMENTATION.section("read"), read_lock(trajectory):
+            series = trajectory.read_atoms(indexes, first, last, step, variable)
+            if variable == "configuration" and trajectory.universe.is_periodic:
+                cells = _cells(trajectory, first, last, step)
+                if cells is not None:
+                    series = _remove_jumps(series, cells)
+        return series.astype(dtype, copy=False)
+        
+    nFrames = len(range(first, last, step))
+
+    with INSTRUMENTATION.section("read"), read_lock(trajectory):
+        
+        var = _netcdf_variable(trajectory, variable)
+        
+        cells = None
+        if var is not None and variable == "configuration" and trajectory.universe.is_periodic:
+            cells = _cells(trajectory, first, last, step)
+            # Unknown cell layout: the jumps are removed by MMTK.
+            if cells is None:
+                var = None
+        
+        if var is None:
+            series = numpy.empty((nFrames,len(indexes),3), dtype=dtype)
+            for i, idx in enumerate(indexes):
+                series[:,i,:] = trajectory.readParticleTrajectory(idx, first, last, step, variable).array
+            return series
+            
+        uniqueIndexes = sorted(set(indexes))
+        
+        cache = transposed_cache(trajectory, variable)
+        
+        if cache is not None:
+            series = cache.read(uniqueIndexes, first, last, step)
+        else:
+            series = numpy.empty((nFrames,len(uniqueIndexes),3), dtype=numpy.float64)
+            pos = 0
+            for run in _atom_runs(uniqueIndexes, HYPERSLAB_MAX_GAP):
+                slab = numpy.asarray(var[first:last:step,run[0]:run[-1]+1,:])
+                series[:,pos:pos+len(run),:] = slab[:,numpy.array(run)-run[0],:]
+                pos += len(run)
+            
+    if cells is not None:
+        series = _remove_jumps(series, cells)
+            
+    if indexes != uniqueIndexes:
+        lut = dict([(idx,i) for i, idx in enumerate(uniqueIndexes)])
+        series = series[:,[lut[idx] for idx in indexes],:]
+
+    return series.astype(dtype, copy=False)
+
 def read_atoms_trajectory(trajectory, atoms, first, last=None, step=1, variable="configuration", dtype=numpy.float64):
+    '''
+    Reads the mean trajectory of a set of atoms.
+    
+    The atoms are read by batches whose size is bounded by READ_BUFFER_SIZE.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param atoms: the atoms or their indexes
+    :type atoms: list of MMTK.Atom or int
+    :param first: the index of the first frame
+    :type first: int
+    :param last: the index of the last frame (excluded). If None, the trajectory is read until its end.
+    :type last: int
+    :param step: the step between two frames
+    :type step: int
+    :param variable: the trajectory variable to read
+    :type variable: str
+    :param dtype: the type of the returned array
+    :type dtype: numpy dtype
+    
+    :return: the mean trajectory of the atoms
+    :rtype: (nFrames,3) numpy array
+    '''
         
     if last is None:
         last = len(trajectory)
         
     nFrames = len(range(first, last, step))
     
-    serie = numpy.zeros((nFrames,3), dtype=dtype)
+    batchSize = max(1,READ_BUFFER_SIZE//(nFrames*3*8))
+    
+    serie = numpy.zeros((nFrames,3), dtype=numpy.float64)
+    
+    for i in range(0,len(atoms),batchSize):
+        serie += read_atoms_trajectories(trajectory, atoms[i:i+batchSize], first, last, step, variable, numpy.float64).sum(axis=1)
 
-    for at in atoms:
-        if not isinstance(at,Atom):
-            at = int(at)
-        serie += trajectory.readParticleTrajectory(at, first, last, step, variable).array
-                
     serie /= len(atoms)
     
-    return serie
+    return serie.astype(dtype, copy=False)
+
+class GroupsTrajectoryReader(object):
+    '''
+    Reads the mean trajectories of groups of atoms by batches of groups.
+    
+    Jobs whose steps run over groups of atoms use it to read the atoms of several steps with a few hyperslab reads. The 
+    batch read on a missing group is made of the following steps of the chunk announced by prefetch, or of the following 
+    groups if no chunk has been announced, up to READ_BUFFER_SIZE bytes.
+    '''
+    
+    def __init__(self, groups, first, last, step=1, variable="configuration", dtype=numpy.float64):
+        '''
+        :param groups: the indexes of the atoms of each group
+        :type groups: list of lists of int
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the last frame (excluded)
+        :type last: int
+        :param step: the step between two frames
+        :type step: int
+        :param variable: the trajectory variable to read
+        :type variable: str
+        :param dtype: the type of the returned arrays
+        :type dtype: numpy dtype
+        '''
+        
+        self._groups = groups
+        self._first = first
+        self._last = last
+        self._step = step
+        self._variable = variable
+        self._dtype = dtype
+        
+        self._nFrames = len(range(first, last, step))
+        
+        self._planned = []
+        
+        self._batch = {}
+        
+    def prefetch(self, indexes):
+        '''
+        Announces the groups about to be read.
+        
+        :param indexes: the indexes of the groups in the order they will be read
+        :type indexes: list of int
+        '''
+        
+        self._planned = list(indexes)
+        
+    def read(self, trajectory, index):
+        '''
+        Returns the mean trajectory of a group of atoms.
+        
+        :param trajectory: the trajectory
+        :type trajectory: MMTK.Trajectory.Trajectory
+        :param index: the index of the group
+        :type index: int
+        
+        :return: the mean trajectory of the atoms of the group
+        :rtype: (nFrames,3) numpy array
+        '''
+        
+        if not index in self._batch:
+            
+            if index in self._planned:
+                upcoming = self._planned[self._planned.index(index):]
+            else:
+                upcoming = xrange(index, len(self._groups))
+            
+            batch = []
+            nAtoms = 0
+            for g in upcoming:
+                n = len(self._groups[g])
+                if batch and (nAtoms + n)*self._nFrames*3*8 > READ_BUFFER_SIZE:
+                    break
+                batch.append(g)
+                nAtoms += n
+                
+            # A group too large for the buffer is read on its own by batches of atoms.
+            if nAtoms*self._nFrames*3*8 > READ_BUFFER_SIZE:
+                return read_atoms_trajectory(trajectory, self._groups[index], self._first, self._last, self._step, self._variable, self._dtype)
+                
+            atoms = [idx for g in batch for idx in self._groups[g]]
+            
+            series = read_atoms_trajectories(trajectory, atoms, self._first, self._last, self._step, self._variable, numpy.float64)
+            
+            self._batch = {}
+            pos = 0
+            for g in batch:
+                n = len(self._groups[g])
+                self._batch[g] = series[:,pos:pos+n,:].mean(axis=1).astype(self._dtype, copy=False)
+                pos += n
+                
+        return self._batch.pop(index)
+
+def reopen_trajectory(trajectory):
+    '''
+    Opens a new handle on the file of a trajectory. The new handle shares the universe of the trajectory.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory or MDANSE.MolecularDynamics.MemoryMappedTrajectory.MemoryMappedTrajectory
+    
+    :return: the new handle
+    :rtype: MMTK.Trajectory.Trajectory or MDANSE.MolecularDynamics.MemoryMappedTrajectory.MemoryMappedTrajectory
+    '''
+    
+    if hasattr(type(trajectory), 'reopen'):
+        return trajectory.reopen()
+    
+    return Trajectory(trajectory.universe, trajectory.filename, 'r')
+
+def open_output_trajectory(universe, filename, precision=0.0, comment=None, obj=None, variables="all"):
+    '''
+    Opens a trajectory for writing the snapshots of a universe.
+    
+    :param universe: the universe
+    :type universe: MMTK.Universe.Universe
+    :param filename: the name of the trajectory file
+    :type filename: str
+    :param precision: if strictly positive, the positions are quantized to that precision (in nm) and written in a compressed 
+    trajectory (see MDANSE.MolecularDynamics.CompressedTrajectory) whose name is derived from filename. Otherwise a MMTK 
+    trajectory is written.
+    :type precision: float
+    :param comment: the comment stored in the trajectory file
+    :type comment: str
+    :param obj: the collection of atoms of the universe to write. If None, all the atoms are written.
+    :type obj: MMTK.Collections.Collection
+    :param variables: the variables written in a MMTK trajectory. A compressed trajectory stores all the variables.
+    :type variables: str or list of str
+    
+    :return: the trajectory and the snapshot generator to call for writing a frame
+    :rtype: 2-tuple
+    '''
+    
+    if precision > 0.0:
+        atoms = None if obj is None else [at.index for at in obj.atomList()]
+        trajectory = CompressedTrajectoryWriter(compressed_filename(filename), universe, precision, comment, atoms)
+        return trajectory, CompressedSnapshotGenerator(universe, trajectory)
+    
+    trajectory = Trajectory(universe if obj is None else obj, filename, 'w', comment)
+    
+    return trajectory, SnapshotGenerator(universe, actions=[TrajectoryOutput(trajectory, variables, 0, None, 1)])
+
+def share_trajectory(trajectory, shared=True):
+    '''
+    Sets whether or not a trajectory is shared by several threads. The reads of a shared trajectory are serialized 
+    by a lock (see read_lock).
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param shared: if True the trajectory is shared, otherwise its lock is removed
+    :type shared: bool
+    '''
+    
+    trajectory.read_lock = threading.RLock() if shared else None
+    
+@contextlib.contextmanager
+def read_lock(trajectory):
+    '''
+    Context manager holding the read lock of a trajectory shared by several threads. Does nothing if the trajectory is not shared.
+    
+    The reads made by read_frame, read_configuration and read_atoms_trajectory already hold that lock. As a frame read 
+    by read_frame is set to the universe of the trajectory, a job sharing that universe between threads must also hold
+    the lock until it has copied the data it needs from the universe.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    '''
+    
+    lock = getattr(trajectory, 'read_lock', None)
+    
+    if lock is None:
+        yield
+        return
+    
+    with lock:
+        yield
+
+def read_frame(trajectory, frame, universe=None):
+    '''
+    Sets the configuration of a universe from a frame of a trajectory.
+    
+    If that frame has been preloaded (see preloaded_frame), prefetched (see FramePrefetcher) or is in the frame cache 
+    (see MDANSE.MolecularDynamics.FrameCache), the trajectory file is not read.
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param frame: the index of the frame
+    :type frame: int
+    :param universe: the universe to set. If None, the universe of the trajectory is used.
+    :type universe: MMTK.Universe.Universe
+    '''
+    
+    if universe is None:
+        universe = trajectory.universe
+        
+    preloaded = getattr(_PRELOADED, 'frame', None)
+    if preloaded is not None:
+        filename, preloadedFrame, configuration = preloaded
+        if preloadedFrame == frame and filename == os.path.abspath(getattr(trajectory, 'filename', '')):
+            universe.setConfiguration(Configuration(universe, configuration.array, configuration.cell_parameters))
+            return
+        
+    filename = getattr(trajectory, 'filename', None)
+    
+    prefetcher = getattr(_PREFETCHER, 'value', None)
+    if prefetcher is not None and filename is not None and prefetcher.filename == os.path.abspath(filename):
+        configuration = prefetcher.get(frame)
+        if configuration is not None:
+            universe.setConfiguration(Configuration(universe, configuration.array, configuration.cell_parameters))
+            return
+    
+    if filename is not None:
+        cached = FRAME_CACHE.get(filename, "configuration", frame)
+        if cached is not None:
+            universe.setConfiguration(Configuration(universe, cached[0], cached[1]))
+            return
+
+    with INSTRUMENTATION.section("read"), read_lock(trajectory):
+        universe.setFromTrajectory(trajectory, frame)
+        
+    if filename is not None:
+        conf = universe.configuration()
+        cell = conf.cell_parameters
+        FRAME_CACHE.put(filename, "configuration", frame, (conf.array.copy(),None if cell is None else numpy.array(cell)))
+        
+@contextlib.contextmanager
+def preloaded_frame(trajectory, frame, configuration):
+    '''
+    Context manager within which read_frame sets the universe from an already read configuration instead of reading 
+    a given frame of a trajectory file. This allows several jobs running on the same trajectory to read each frame once.
+    
+    Any handle on the same trajectory file benefits from the preloaded frame. The preloaded frame is local to the current thread.
+    
+    :param trajectory: the trajectory from which the frame has been read
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param frame: the index of the frame
+    :type frame: int
+    :param configuration: the configuration of the frame
+    :type configuration: MMTK.ParticleProperties.Configuration
+    '''
+    
+    previous = getattr(_PRELOADED, 'frame', None)
+    
+    _PRELOADED.frame = (os.path.abspath(trajectory.filename), frame, configuration)
+    
+    try:
+        yield
+    finally:
+        _PRELOADED.frame = previous
+        
+def read_configuration(trajectory, frame, variable="configuration"):
+    '''
+    Reads a frame of a variable of a trajectory.
+    
+    The frames of the per-atom variables are cached in the frame cache (see MDANSE.MolecularDynamics.FrameCache).
+    
+    :param trajectory: the trajectory
+    :type trajectory: MMTK.Trajectory.Trajectory
+    :param frame: the index of the frame
+    :type frame: int
+    :param variable: the trajectory variable to read
+    :type variable: str
+    
+    :return: the contents of the variable for that frame
+    :rtype: MMTK.ParticleProperties.Configuration or MMTK.ParticleProperties.ParticleVector
+    '''
+    
+    filename = getattr(trajectory, 'filename', None)
+    
+    if filename is not None:
+        cached = FRAME_CACHE.get(filename, variable, frame)
+        if cached is not None:
+            if variable == "configuration":
+                return Configuration(trajectory.universe, cached[0].copy(), cached[1])
+            else:
+                return ParticleVector(trajectory.universe, cached[0].copy())
+    
+    with INSTRUMENTATION.section("read"), read_lock(trajectory):
+        value = getattr(trajectory, variable)[frame]
+        
+    if filename is not None:
+        if isinstance(value, Configuration):
+            cell = value.cell_parameters
+            FRAME_CACHE.put(filename, variable, frame, (value.array.copy(),None if cell is None else numpy.array(cell)))
+        elif type(value) is ParticleVector:
+            FRAME_CACHE.put(filename, variable, frame, (value.array.copy(),None))
+        
+    return value
+
+class FramePrefetcher(object):
+    '''
+    Iterator over the configurations of a sequence of frames of a trajectory. The frames are read ahead by a background 
+    thread so that reading the next frames overlaps with the processing of the current one.
+    
+    Once installed for the current thread (see install), read_frame takes its frames from the prefetcher.
+    
+    The background thread reads the frames through its own handle on the trajectory file so that it never waits for 
+    the read lock of the trajectory (see read_lock), which the thread processing the frames may hold while waiting for
+    a frame.
+    '''
+    
+    def __init__(self, trajectory, frames, depth=None):
+        '''
+        :param trajectory: the trajectory
+        :type trajectory: MMTK.Trajectory.Trajectory
+        :param frames: the indexes of the frames in the order they will be read
+        :type frames: list of int
+        :param depth: the maximum number of frames read ahead. If None, it is given by the 'prefetch_depth' preferences item.
+        :type depth: int
+        '''
+        
+        if depth is None:
+            depth = PREFERENCES.get_preferences_item("prefetch_depth").value
+        
+        self._trajectory = trajectory
+        
+        self._filename = os.path.abspath(trajectory.filename)
+        
+        self._frames = list(frames)
+        
+        # The last position of each frame in the sequence.
+        self._positions = dict([(f,i) for i, f in enumerate(self._frames)])
+        
+        self._position = 0
+        
+        self._queue = Queue.Queue(max(1,depth))
+        
+        self._closed = threading.Event()
+        
+        self._thread = None
+        
+    @property
+    def filename(self):
+        '''
+        Returns the absolute name of the trajectory file.
+        
+        :return: the name of the trajectory file
+        :rtype: str
+        '''
+        
+        return self._filename
+                
+    def start(self):
+        '''
+        Starts the background thread.
+        
+        :return: the prefetcher
+        :rtype: MDANSE.MolecularDynamics.Trajectory.FramePrefetcher
+        '''
+        
+        if self._thread is not None:
+            return self
+        
+        self._thread = threading.Thread(target=self._read, name="MDANSE frame prefetcher")
+        self._thread.daemon = True
+        self._thread.start()
+        
+        return self
+    
+    def _read(self):
+        '''
+        Reads the frames. Runs in the background thread.
+        '''
+        
+        trajectory = None
+        
+        for frame in self._frames:
+            
+            try:
+                if trajectory is None:
+                    trajectory = reopen_trajectory(self._trajectory)
+                item = (frame, read_configuration(trajectory, frame), None)
+            except Exception:
+                item = (frame, None, sys.exc_info())
+                
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                except Queue.Full:
+                    continue
+                else:
+                    break
+                
+            if self._closed.is_set() or item[2] is not None:
+                break
+            
+        if trajectory is not None:
+            trajectory.close()
+            
+    def __iter__(self):
+        
+        return self.start()
+        
+    def next(self):
+        '''
+        Returns the next frame of the sequence, waiting for it to be read if needed.
+        
+        :return: the index of the frame and its configuration
+        :rtype: 2-tuple
+        '''
+        
+        if self._position >= len(self._frames):
+            self.close()
+            raise StopIteration
+        
+        if self._closed.is_set():
+            raise StopIteration
+        
+        self.start()
+        
+        with INSTRUMENTATION.section("read"):
+            frame, configuration, error = self._queue.get()
+            
+        self._position += 1
+        
+        if self._position >= len(self._frames) or error is not None:
+            self.close()
+            
+        if error is not None:
+            raise error[0], error[1], error[2]
+        
+        return frame, configuration
+    
+    def get(self, frame):
+        '''
+        Returns the configuration of a frame if that frame is still to come in the sequence. The frames of the sequence 
+        preceding it are skipped.
+        
+        :param frame: the index of the frame
+        :type frame: int
+        
+        :return: the configuration of the frame or None if it does not belong to the rest of the sequence
+        :rtype: MMTK.ParticleProperties.Configuration
+        '''
+        
+        if self._closed.is_set() or self._positions.get(frame, -1) < self._position:
+            return None
+        
+        while True:
+            f, configuration = self.next()
+            if f == frame:
+                return configuration
+    
+    def install(self):
+        '''
+        Starts the prefetcher and makes read_frame take its frames from it in the current thread. A previously installed
+        prefetcher is closed.
+        
+        :return: the prefetcher
+        :rtype: MDANSE.MolecularDynamics.Trajectory.FramePrefetcher
+        '''
+        
+        previous = getattr(_PREFETCHER, 'value', None)
+        if previous is not None:
+            previous.close()
+            
+        _PREFETCHER.value = self
+        
+        return self.start()
+    
+    @staticmethod
+    def uninstall():
+        '''
+        Closes the prefetcher installed for the current thread, if any. Its background thread is stopped and its handle 
+        on the trajectory file is closed, whether or not all its frames have been read.
+        '''
+        
+        prefetcher = getattr(_PREFETCHER, 'value', None)
+        if prefetcher is not None:
+            prefetcher.close()
+        
+    def close(self):
+        '''
+        Stops the background thread and uninstalls the prefetcher.
+        '''
+        
+        self._closed.set()
+        
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            
+        if getattr(_PREFETCHER, 'value', None) is self:
+            _PREFETCHER.value = None
 
 def resolve_undefined_molecules_name(universe):
     
@@ -159,6 +1018,64 @@ def resolve_undefined_molecules_name(universe):
             if not obj.name.strip():
                 obj.name = brute_formula(obj,sep="")
 
+def open_topology(universe, filename, tolerance=0.05, lazy=None):
+    '''
+    Names the unnamed molecules of the universe of a trajectory and sets the bonds of its atom clusters. Both are read 
+    from the topology cache of the trajectory (see MDANSE.MolecularDynamics.TopologyCache) when it is valid, otherwise 
+    they are computed and the cache is written once the bonds are known.
+    
+    :param universe: the universe of the trajectory
+    :type universe: MMTK.Universe.Universe
+    :param filename: the name of the trajectory file
+    :type filename: str
+    :param tolerance: the tolerance (in nm) used to compute the bonds
+    :type tolerance: float
+    :param lazy: if True, the bonds are set only once needed (see ensure_connectivity). If None, it is given by the 
+    'connectivity' preferences item.
+    :type lazy: bool
+    '''
+    
+    # A universe shared with another trajectory (e.g. a virtual trajectory keeping all the atoms of its parent) may 
+    # already have its topology.
+    if hasattr(universe, 'pending_connectivity__'):
+        return
+    
+    if lazy is None:
+        lazy = PREFERENCES.get_preferences_item("connectivity").value == "lazy"
+        
+    cache = TopologyCache(filename)
+    
+    nAtoms = universe.numberOfAtoms()
+    
+    chemicalObjects = [obj for obj in universe.objectList() if isChemicalObject(obj)]
+    
+    cached = cache.load(nAtoms, tolerance)
+    
+    if cached is not None and len(cached[0]) == len(chemicalObjects):
+        names, bonds = cached
+        for obj, name in zip(chemicalObjects,names):
+            obj.name = name
+        pending = lambda : set_bonds(universe, bonds)
+        
+    else:
+        resolve_undefined_molecules_name(universe)
+        names = [obj.name for obj in chemicalObjects]
+        # The bonds are computed from the configuration and the cell of the universe at opening, even when deferred.
+        conf = cell = None
+        if lazy:
+            conf = universe.copyConfiguration()
+            if universe.is_periodic:
+                cell = (numpy.array(universe.basisVectors(), dtype=numpy.float64),numpy.array(universe.reciprocalBasisVectors(), dtype=numpy.float64))
+        def pending():
+            bonds = cluster_bonds(universe, tolerance, conf, cell)
+            set_bonds(universe, bonds)
+            cache.save(names, bonds, nAtoms, tolerance)
+            
+    universe.pending_connectivity__ = pending
+    
+    if not lazy:
+        ensure_connectivity(universe)
+
 def sorted_atoms(universe,attribute=None):
 
     atoms = sorted(universe.atomList(), key = operator.attrgetter('index'))
@@ -174,8 +1091,6 @@ class MMTKTrajectory(Trajectory):
         
         Trajectory.__init__(self,*args,**kwargs)
         
-        resolve_undefined_molecules_name(self.universe)
-         
-        build_connectivity(self.universe)
+        open_topology(self.universe, self.filename)
                
 
@@ -0,0 +1,299 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+'''
+Atom-major cache of the trajectory variables
+
+The NetCDF trajectories are stored frame by frame so that reading the whole time series of an atom touches every 
+frame record of the file. A cache stores a copy of a trajectory variable transposed atom by atom in a binary file 
+(numpy .npy format) which is memory mapped when read, hence the time series of an atom is contiguous on disk.
+
+The cache is built once per trajectory and variable and reused by the subsequent jobs. It is stored next to the 
+trajectory or, if that directory is not writable, in the trajectory_cache directory of the MDANSE application 
+directory. A small JSON header records the modification time and the size of the trajectory file from which the 
+cache was built. The cache is rebuilt as soon as one of them changes.
+'''
+
+import json
+import os
+import time
+
+import numpy
+
+from MDANSE import PLATFORM
+from MDANSE.Core.Error import Error
+
+class TrajectoryCacheError(Error):
+    pass
+
+# The maximum memory (in bytes) used to read a block of frames when building a cache.
+BUILD_BUFFER_SIZE = 128*1024*1024
+
+# The time (in seconds) after which the lock of a build that has not progressed is considered as stale.
+STALE_LOCK_TIMEOUT = 600
+
+def cache_directory(filename):
+    '''
+    Returns the directory where the caches of a trajectory are stored.
+    
+    :param filename: the name of the trajectory file
+    :type filename: str
+    
+    :return: the directory of the caches
+    :rtype: str
+    '''
+    
+    dirname = os.path.dirname(os.path.abspath(filename))
+    
+    if os.access(dirname, os.W_OK):
+        return dirname
+    
+    path = os.path.join(PLATFORM.application_directory(), 'trajectory_cache')
+    
+    PLATFORM.create_directory(path)
+    
+    return path
+
+class TransposedTrajectoryCache(object):
+    '''
+    Atom-major copy of a (frame, atom, xyz) trajectory variable.
+    '''
+    
+    def __init__(self, filename, variable="configuration", dtype=numpy.float32, directory=None):
+        '''
+        :param filename: the name of the trajectory file
+        :type filename: str
+        :param variable: the trajectory variable to cache
+        :type variable: str
+        :param dtype: the type of the cached values
+        :type dtype: numpy dtype
+        :param directory: the directory where the cache is stored. If None, it is given by cache_directory.
+        :type directory: str
+        '''
+        
+        self._filename = os.path.abspath(filename)
+        
+        self._variable = variable
+        
+        self._dtype = numpy.dtype(dtype)
+        
+        if directory is None:
+            directory = cache_directory(self._filename)
+
+        basename = os.path.join(directory, "%s.%s.%s" % (os.path.basename(self._filename),variable,self._dtype.name))
+        
+        self._dataFile = basename + '.npy'
+        
+        self._headerFile = basename + '.json'
+        
+        self._lockFile = basename + '.lock'
+        
+        self._data = None
+        
+    @property
+    def data_filename(self):
+        '''
+        Returns the name of the file storing the cached values.
+        
+        :return: the name of the data file
+        :rtype: str
+        '''
+        
+        return self._dataFile
+
+    @property
+    def header_filename(self):
+        '''
+        Returns the name of the file storing the header of the cache.
+        
+        :return: the name of the header file
+        :rtype: str
+        '''
+        
+        return self._headerFile
+
+    def _header(self):
+        '''
+        Returns the header matching the current state of the trajectory file.
+        '''
+        
+        stat = os.stat(self._filename)
+        
+        return {'mtime' : stat.st_mtime,
+                'size' : stat.st_size,
+                'variable' : self._variable,
+                'dtype' : self._dtype.name}
+        
+    def is_valid(self):
+        '''
+        Returns whether or not the cache exists and has been built from the current trajectory file.
+        
+        :return: True if the cache can be used
+        :rtype: bool
+        '''
+        
+        if not os.path.exists(self._dataFile):
+            return False
+        
+        try:
+            with open(self._headerFile, 'r') as f:
+                header = json.load(f)
+        except (IOError,ValueError):
+            return False
+        
+        return header == self._header()
+        
+    def _acquire_lock(self):
+        '''
+        Creates the lock file of the build. Returns False if another process is already building the cache.
+        '''
+        
+        try:
+            if time.time() - os.path.getmtime(self._lockFile) > STALE_LOCK_TIMEOUT:
+                os.remove(self._lockFile)
+        except OSError:
+            pass
+
+        try:
+            os.close(os.open(self._lockFile, os.O_CREAT|os.O_EXCL|os.O_WRONLY))
+        except OSError:
+            return False
+        
+        return True
+                
+    def build(self, values):
+        '''
+        Builds the cache.
+        
+        The values are read by blocks of frames whose size is bounded by BUILD_BUFFER_SIZE. The cache is written in a 
+        temporary file renamed once complete so that an interrupted build never leaves a truncated cache behind.
+        
+        :param values: the values of the variable, typically a NetCDF variable
+        :type values: (nFrames,nAtoms,3) array-like supporting slicing along its first axis
+        
+        :return: False if the cache is being built by another process, True otherwise
+        :rtype: bool
+        '''
+        
+        if not self._acquire_lock():
+            return False
+        
+        self.close()
+
+        tempFile = self._dataFile + '.%d.tmp' % os.getpid()
+                
+        try:
+            # Taken first, so that a trajectory modified during the build invalidates the cache.
+            header = self._header()
+            
+            nFrames, nAtoms = values.shape[0], values.shape[1]
+            
+            data = numpy.lib.format.open_memmap(tempFile, mode='w+', dtype=self._dtype, shape=(nAtoms,nFrames,3))
+            
+            blockSize = max(1,BUILD_BUFFER_SIZE//(nAtoms*3*8))
+            
+            for f in range(0,nFrames,blockSize):
+                block = numpy.asarray(values[f:f+blockSize])
+                data[:,f:f+len(block),:] = block.transpose(1,0,2)
+                # Tells the other processes that the build is still alive.
+                os.utime(self._lockFile, None)
+                
+            data.flush()
+            del data
+            
+            # os.rename can not overwrite an existing file on Windows.
+            for fname in (self._headerFile,self._dataFile):
+                if os.path.exists(fname):
+                    os.remove(fname)
+            os.rename(tempFile, self._dataFile)
+            
+            with open(self._headerFile, 'w') as f:
+                json.dump(header, f)
+                
+        except (IOError,OSError) as e:
+            raise TrajectoryCacheError("Could not build the trajectory cache %r: %s" % (self._dataFile,e))
+        
+        finally:
+            if os.path.exists(tempFile):
+                os.remove(tempFile)
+            try:
+                os.remove(self._lockFile)
+            except OSError:
+                pass
+            
+        return True
+                    
+    def open(self):
+        '''
+        Memory maps the cache.
+        
+        :return: the cached values
+        :rtype: (nAtoms,nFrames,3) numpy memmap
+        '''
+        
+        if self._data is None:
+            try:
+                self._data = numpy.load(self._dataFile, mmap_mode='r')
+            except (IOError,ValueError) as e:
+                raise TrajectoryCacheError("Could not open the trajectory cache %r: %s" % (self._dataFile,e))
+
+        return self._data
+    
+    def close(self):
+        '''
+        Unmaps the cache.
+        '''
+        
+        self._data = None
+            
+    def read(self, indexes, first, last, step=1):
+        '''
+        Reads the time series of a set of atoms from the cache.
+        
+        :param indexes: the indexes of the atoms
+        :type indexes: list of int
+        :param first: the index of the first frame
+        :type first: int
+        :param last: the index of the last frame (excluded)
+        :type last: int
+        :param step: the step between two frames
+        :type step: int
+        
+        :return: the values of the atoms
+        :rtype: (nFrames,nAtoms,3) numpy array of float64
+        '''
+        
+        data = self.open()
+        
+        nFrames = len(range(first, last, step))
+        
+        series = numpy.empty((nFrames,len(indexes),3), dtype=numpy.float64)
+        
+        for i, idx in enumerate(indexes):
+            series[:,i,:] = data[idx,first:last:step,:]
+            
+        return series
@@ -0,0 +1,442 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+'''
+Virtual trajectories
+
+A virtual trajectory is a view on a range of frames and on a subset of the atoms of another trajectory, its parent. 
+No data is copied: the frames are read from the parent trajectory file when accessed. It provides the subset of the 
+MMTK.Trajectory.Trajectory interface used by the MDANSE jobs so that they run unchanged on virtual trajectories.
+
+A virtual trajectory can be stored in a small JSON file (.mvt) giving the path to the parent trajectory, the range of 
+frames and the indexes of the atoms of the view. Such a file can be used wherever a MMTK trajectory is expected.
+'''
+
+import json
+import os
+
+import numpy
+
+from MMTK.Collections import Collection
+from MMTK.ParticleProperties import Configuration, ParticleVector
+
+from MDANSE.Core.Error import Error
+
+class VirtualTrajectoryError(Error):
+    pass
+
+# The key identifying a virtual trajectory file.
+MAGIC = "mdanse_virtual_trajectory"
+
+# The version of the virtual trajectory files.
+VERSION = 1
+
+def is_virtual_trajectory(filename):
+    '''
+    Returns whether or not a file is a virtual trajectory file.
+    
+    :param filename: the name of the file
+    :type filename: str
+    
+    :return: True if the file is a virtual trajectory file
+    :rtype: bool
+    '''
+    
+    try:
+        with open(filename, 'r') as f:
+            if f.read(1) != '{':
+                return False
+            f.seek(0)
+            return MAGIC in json.load(f)
+    except (IOError,ValueError,TypeError):
+        return False
+    
+def write_virtual_trajectory(filename, parent, first=0, last=None, step=1, atoms=None):
+    '''
+    Writes a virtual trajectory file.
+    
+    :param filename: the name of the virtual trajectory file
+    :type filename: str
+    :param parent: the name of the parent trajectory file
+    :type parent: str
+    :param first: the index of the first frame of the parent trajectory
+    :type first: int
+    :param last: the index of the last frame (excluded) of the parent trajectory. If None, the view goes until the end of the parent trajectory.
+    :type last: int
+    :param step: the step between two frames of the parent trajectory
+    :type step: int
+    :param atoms: the indexes of the atoms of the parent trajectory. If None, all the atoms are kept.
+    :type atoms: list of int
+    '''
+    
+    if atoms is not None:
+        atoms = sorted(set([int(idx) for idx in atoms]))
+    
+    view = {MAGIC : VERSION,
+            'parent' : os.path.abspath(parent),
+            'first' : int(first),
+            'last' : None if last is None else int(last),
+            'step' : int(step),
+            'atoms' : atoms}
+    
+    try:
+        with open(filename, 'w') as f:
+            json.dump(view, f)
+    except IOError as e:
+        raise VirtualTrajectoryError("Could not write the virtual trajectory %r: %s" % (filename,e))
+
+def read_virtual_trajectory(filename):
+    '''
+    Reads a virtual trajectory file.
+    
+    :param filename: the name of the virtual trajectory file
+    :type filename: str
+    
+    :return: the contents of the file. The path to the parent trajectory is absolute.
+    :rtype: dict
+    '''
+    
+    try:
+        with open(filename, 'r') as f:
+            view = json.load(f)
+    except (IOError,ValueError) as e:
+        raise VirtualTrajectoryError("Could not read the virtual trajectory %r: %s" % (filename,e))
+    
+    if view.get(MAGIC) != VERSION:
+        raise VirtualTrajectoryError("%r is not a virtual trajectory of version %d" % (filename,VERSION))
+    
+    # A relative path is relative to the directory of the virtual trajectory file.
+    view['parent'] = os.path.join(os.path.dirname(os.path.abspath(filename)), str(view['parent']))
+    
+    return view
+
+class ParticleTrajectory(object):
+    '''
+    The trajectory of a single atom, as returned by VirtualTrajectory.readParticleTrajectory.
+    '''
+    
+    def __init__(self, array):
+        
+        self.array = array
+
+class VirtualVariable(object):
+    '''
+    A variable of a virtual trajectory. The frames and the atoms are mapped to those of the parent trajectory.
+    '''
+    
+    def __init__(self, trajectory, name):
+        
+        self._trajectory = trajectory
+        
+        self._name = name
+        
+        self._variable = getattr(trajectory.parent, name)
+        
+    def __len__(self):
+        
+        return len(self._trajectory)
+    
+    def _subset(self, value):
+        '''
+        Restricts a frame of the parent variable to the atoms of the view.
+        '''
+        
+        atoms = self._trajectory.parent_atoms()
+        
+        if atoms is None:
+            return value
+        
+        if isinstance(value, Configuration):
+            return Configuration(self._trajectory.universe, value.array[atoms], value.cell_parameters)
+        
+        elif isinstance(value, ParticleVector):
+            return ParticleVector(self._trajectory.universe, value.array[atoms])
+        
+        else:
+            return value
+        
+    def __getitem__(self, index):
+        
+        if isinstance(index, (int,long,numpy.integer)):
+            if index < 0:
+                index += len(self)
+            if index < 0 or index >= len(self):
+                raise IndexError(index)
+            first, _, step = self._trajectory.parent_frames(index, index+1, 1)
+            return self._subset(self._variable[first])
+        
+        if not isinstance(index, slice):
+            raise TypeError("Invalid index %r for a virtual trajectory variable" % (index,))
+
+        start, stop, step = index.indices(len(self))
+        
+        frames = range(start, stop, step)
+        if not frames:
+            return numpy.zeros((0,), dtype=numpy.float64)
+        
+        if step > 0:
+            first, last, step = self._trajectory.parent_frames(start, stop, step)
+            values = numpy.array(self._variable[first:last:step])
+        else:
+            values = numpy.array([numpy.array(getattr(self._variable[f], 'array', self._variable[f])) for f in [self._trajectory.parent_frame(f) for f in frames]])
+
+        atoms = self._trajectory.parent_atoms()
+        
+        if atoms is not None and values.ndim == 3 and values.shape[1] == self._trajectory.parent.universe.numberOfAtoms():
+            values = values[:,atoms,:]
+            
+        return values
+    
+class VirtualTrajectory(object):
+    '''
+    A view on a range of frames and a subset of the atoms of a trajectory.
+    '''
+    
+    def __init__(self, parent, first=0, last=None, step=1, atoms=None, universe=None, filename=None):
+        '''
+        :param parent: the parent trajectory
+        :type parent: MMTK.Trajectory.Trajectory or MDANSE.MolecularDynamics.MemoryMappedTrajectory.MemoryMappedTrajectory
+        :param first: the index of the first frame of the parent trajectory
+        :type first: int
+        :param last: the index of the last frame (excluded) of the parent trajectory. If None, the view goes until the end of the parent trajectory.
+        :type last: int
+        :param step: the step between two frames of the parent trajectory
+        :type step: int
+        :param atoms: the indexes of the atoms of the parent trajectory. If None, all the atoms are kept.
+        :type atoms: list of int
+        :param universe: the universe of the view. If None and the view has an atom subset, it is built from the universe of the parent trajectory.
+        :type universe: MMTK.Universe.Universe
+        :param filename: the name of the virtual trajectory file, if any
+        :type filename: str
+        '''
+        
+        nFrames = len(parent)
+        
+        if last is None or last > nFrames:
+            last = nFrames
+        
+        if step < 1 or first < 0 or first >= last:
+            raise VirtualTrajectoryError("Invalid range of frames (%d,%d,%d) for a trajectory of %d frames" % (first,last,step,nFrames))
+        
+        self.parent = parent
+        
+        self.filename = filename
+        
+        self._first = first
+        
+        self._step = step
+        
+        self._nFrames = len(range(first, last, step))
+        
+        nAtoms = parent.universe.numberOfAtoms()
+        
+        if atoms is not None:
+            atoms = sorted(set([int(idx) for idx in atoms]))
+            if not atoms or atoms[0] < 0 or atoms[-1] >= nAtoms:
+                raise VirtualTrajectoryError("Invalid atom indexes for a trajectory of %d atoms" % nAtoms)
+            # Keeping all the atoms is not a subset.
+            if len(atoms) == nAtoms:
+                atoms = None
+                
+        self._atoms = None if atoms is None else numpy.array(atoms, dtype=numpy.int32)
+        
+        if universe is None:
+            universe = parent.universe if self._atoms is None else self._build_universe()
+            
+        self.universe = universe
+        
+    @classmethod
+    def open(cls, filename):
+        '''
+        Opens a virtual trajectory file.
+        
+        :param filename: the name of the virtual trajectory file
+        :type filename: str
+        
+        :return: the virtual trajectory
+        :rtype: MDANSE.MolecularDynamics.VirtualTrajectory.VirtualTrajectory
+        '''
+        
+        view = read_virtual_trajectory(filename)
+        
+        from MDANSE.MolecularDynamics.CompressedTrajectory import is_compressed_trajectory, CompressedTrajectory
+        from MDANSE.MolecularDynamics.DCDTrajectory import is_dcd_trajectory, DCDTrajectory
+        from MDANSE.MolecularDynamics.MemoryMappedTrajectory import is_memory_mapped_trajectory, MemoryMappedTrajectory
+        from MDANSE.MolecularDynamics.Trajectory import MMTKTrajectory
+        
+        # The parent is sniffed as the trajectory configurator does (see MDANSE.Framework.Configurators.MMTKTrajectoryConfigurator).
+        try:
+            if is_memory_mapped_trajectory(view['parent']):
+                parent = MemoryMappedTrajectory(view['parent'])
+            elif is_compressed_trajectory(view['parent']):
+                parent = CompressedTrajectory(view['parent'])
+            elif is_dcd_trajectory(view['parent']):
+                parent = DCDTrajectory(view['parent'])
+            else:
+                parent = MMTKTrajectory(None, view['parent'], 'r')
+        except (IOError,Error) as e:
+            raise VirtualTrajectoryError("Could not open the parent trajectory %r of %r: %s" % (view['parent'],filename,e))
+        
+        return cls(parent, view['first'], view['last'], view['step'], view['atoms'], filename=os.path.abspath(filename))
+        
+    def _build_universe(self):
+        '''
+        Builds the universe made of the atoms of the view, as MMTK does for a trajectory written for a collection of atoms.
+        '''
+        
+        import MMTK.Skeleton
+        
+        from MDANSE.MolecularDynamics.Trajectory import sorted_atoms
+        
+        parentUniverse = self.parent.universe
+        
+        atoms = sorted_atoms(parentUniverse)
+        
+        indexMap = numpy.zeros((parentUniverse.numberOfAtoms(),), dtype=numpy.int32) - 1
+        indexMap[self._atoms] = numpy.arange(len(self._atoms), dtype=numpy.int32)
+        
+        description = parentUniverse.description(Collection([atoms[idx] for idx in self._atoms]), indexMap)
+        
+        conf = self.parent.configuration[self.parent_frame(0)]
+        
+        skeleton = eval(description, vars(MMTK.Skeleton), {})
+        universe = skeleton.make({}, conf.array[self._atoms])
+
+        if conf.cell_parameters is not None:
+            universe.setCellParameters(conf.cell_parameters)
+            
+        return universe
+    
+    def __len__(self):
+        
+        return self._nFrames
+    
+    def __getattr__(self, name):
+        
+        if name.startswith('_') or not 'parent' in self.__dict__ or not name in self.parent.variables():
+            raise AttributeError(name)
+        
+        return VirtualVariable(self, name)
+        
+    def variables(self):
+        '''
+        Returns the names of the variables of the trajectory.
+        
+        :return: the names of the variables
+        :rtype: list of str
+        '''
+        
+        return self.parent.variables()
+    
+    def parent_frame(self, frame):
+        '''
+        Returns the index in the parent trajectory of a frame of the view.
+        
+        :param frame: the index of the frame in the view
+        :type frame: int
+        
+        :return: the index of the frame in the parent trajectory
+        :rtype: int
+        '''
+        
+        return self._first + frame*self._step
+    
+    def parent_frames(self, first, last, step):
+        '''
+        Returns the range of the parent trajectory frames matching a range of frames of the view.
+        
+        :param first: the index of the first frame of the view
+        :type first: int
+        :param last: the index of the last frame (excluded) of the view
+        :type last: int
+        :param step: the step between two frames of the view
+        :type step: int
+        
+        :return: the first, last (excluded) and step of the range of frames of the parent trajectory
+        :rtype: 3-tuple of int
+        '''
+        
+        nFrames = len(range(first, last, step))
+        
+        parentFirst = self.parent_frame(first)
+        
+        parentStep = step*self._step
+        
+        return parentFirst, parentFirst + max(0,nFrames-1)*parentStep + min(1,nFrames), parentStep
+    
+    def parent_atoms(self, indexes=None):
+        '''
+        Returns the indexes in the parent trajectory of atoms of the view.
+        
+        :param indexes: the indexes of the atoms of the view. If None, all the atoms of the view.
+        :type indexes: list of int
+        
+        :return: the indexes of the atoms in the parent trajectory or None if the view keeps all the atoms and no indexes were given
+        :rtype: numpy array or list of int
+        '''
+        
+        if indexes is None:
+            return self._atoms
+        
+        if self._atoms is None:
+            return list(indexes)
+        
+        return [int(self._atoms[idx]) for idx in indexes]
+        
+    def readParticleTrajectory(self, atom, first=0, last=None, skip=1, variable="configuration"):
+        '''
+        Reads the trajectory of a single atom. The jumps due to the periodic boundary conditions are removed from the 
+        configurations.
+        
+        :return: the trajectory of the atom
+        :rtype: MDANSE.MolecularDynamics.VirtualTrajectory.ParticleTrajectory
+        '''
+        
+        from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+        
+        return ParticleTrajectory(read_atoms_trajectories(self, [atom], first, last, skip, variable)[:,0,:])
+    
+    def reopen(self):
+        '''
+        Returns a new handle on the trajectory sharing the universe of this one.
+        
+        :return: the new handle
+        :rtype: MDANSE.MolecularDynamics.VirtualTrajectory.VirtualTrajectory
+        '''
+        
+        from MDANSE.MolecularDynamics.Trajectory import reopen_trajectory
+        
+        atoms = None if self._atoms is None else self._atoms.tolist()
+        
+        return VirtualTrajectory(reopen_trajectory(self.parent), self._first, self.parent_frame(self._nFrames - 1) + 1, self._step, atoms, self.universe, self.filename)
+        
+    def close(self):
+        '''
+        Closes the parent trajectory.
+        '''
+        
+        self.parent.close()
@@ -0,0 +1,143 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.Framework.Jobs.Checkpoint import Checkpoint, CheckpointError, is_serializable
+
+class DummyJob(object):
+    
+    type = 'dummy'
+    
+    numberOfSteps = 10
+    
+    def __init__(self, trajectory):
+        
+        self.parameters = {'running_mode' : ('monoprocessor',1), 'trajectory' : trajectory, 'n_bins' : 5}
+        
+        self.configuration = {'trajectory' : {'filename' : trajectory}}
+        
+        self.hist = numpy.zeros((5,))
+        
+    def get_checkpoint_state(self):
+        
+        return {'hist' : self.hist}
+    
+    def set_checkpoint_state(self, state):
+        
+        self.hist[...] = state['hist']
+
+class TestCheckpoint(UnitTest):
+    '''
+    Unittest for the checkpointing of the jobs
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.chk')
+        os.close(fd)
+        os.remove(self._filename)
+        
+        fd, self._trajectory = tempfile.mkstemp(suffix='.nc')
+        os.write(fd, 'frames')
+        os.close(fd)
+        
+    def tearDown(self):
+        
+        for filename in (self._filename,self._trajectory):
+            if os.path.exists(filename):
+                os.remove(filename)
+        
+    def test_is_serializable(self):
+        
+        self.assertTrue(is_serializable({'a' : [numpy.arange(3), 1, 'x'], 2 : (None, 3.0)}))
+        self.assertFalse(is_serializable([numpy.arange(3), object()]))
+        self.assertFalse(is_serializable(numpy.empty((3,),dtype=object)))
+        
+    def test_save_restore(self):
+        
+        job = DummyJob(self._trajectory)
+        
+        checkpoint = Checkpoint(self._filename, 0)
+        for i in range(4):
+            job.hist[i] += i
+            checkpoint.record(job, i)
+            
+        # No interval: the checkpoint is only written on request.
+        self.assertFalse(checkpoint.exists())
+        checkpoint.save(job)
+        self.assertTrue(checkpoint.exists())
+        
+        resumed = DummyJob(self._trajectory)
+        # The job can be resumed with another running mode.
+        resumed.parameters['running_mode'] = ('multiprocessor',4)
+        completed = Checkpoint(self._filename, 0).restore(resumed)
+        
+        self.assertEqual(completed, set(range(4)))
+        self.assertTrue(numpy.array_equal(resumed.hist, job.hist))
+        
+        checkpoint.remove()
+        self.assertFalse(checkpoint.exists())
+
+    def test_mismatch(self):
+        
+        job = DummyJob(self._trajectory)
+        Checkpoint(self._filename, 0).save(job)
+        
+        job.numberOfSteps = 20
+        self.assertRaises(CheckpointError, Checkpoint(self._filename, 0).restore, job)
+        
+    def test_signature_mismatch(self):
+        
+        job = DummyJob(self._trajectory)
+        Checkpoint(self._filename, 0).save(job)
+        
+        job.parameters['n_bins'] = 10
+        self.assertRaises(CheckpointError, Checkpoint(self._filename, 0).restore, job)
+        
+        job = DummyJob(self._trajectory)
+        with open(self._trajectory, 'a') as f:
+            f.write('more frames')
+        self.assertRaises(CheckpointError, Checkpoint(self._filename, 0).restore, job)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestCheckpoint))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
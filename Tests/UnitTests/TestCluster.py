@@ -0,0 +1,185 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import socket
+import threading
+import time
+import unittest
+
+from UnitTest import UnitTest
+
+from MDANSE.DistributedComputing.Cluster import AuthenticationError, Channel, ClusterError, ClusterMaster, ClusterSlave, REGISTER, TASK
+
+class DummyJob(object):
+    
+    def run_step(self, index):
+        
+        return index, index**2
+
+class TestCluster(UnitTest):
+    '''
+    Unittest for the socket based master-slave model
+    '''
+
+    def setUp(self):
+        
+        self._master = ClusterMaster(DummyJob(), 2, heartbeatTimeout=10.0, registrationTimeout=10.0)
+        self._master.start()
+        
+        self._slaves = []
+        
+    def tearDown(self):
+        
+        self._master.shutdown()
+        
+        for slave in self._slaves:
+            slave.join(10.0)
+        
+    def _start_slave(self):
+        
+        slave = threading.Thread(target=ClusterSlave(self._master.address, heartbeatInterval=0.5, authkey=self._master.authkey).run)
+        slave.daemon = True
+        slave.start()
+        self._slaves.append(slave)
+        
+    def _run_chunks(self, chunks):
+        
+        for chunk in chunks:
+            self._master.requestTask(chunk)
+            
+        results = []
+        for _ in chunks:
+            results.extend(self._master.retrieveResult()[0])
+            
+        return sorted(results)
+    
+    def test_run(self):
+        
+        self._start_slave()
+        self._start_slave()
+        
+        chunks = [range(i,i+5) for i in range(0,50,5)]
+        
+        self.assertEqual(self._run_chunks(chunks), [(i,i**2) for i in range(50)])
+        
+    def test_dead_worker(self):
+        
+        # A worker that registers, takes a chunk and dies before another worker shows up.
+        def dead_worker():
+            channel = Channel(socket.create_connection(self._master.address), self._master.authkey, False)
+            channel.authenticate()
+            channel.send((REGISTER, "dead"))
+            while channel.receive()[0] != TASK:
+                pass
+            channel.close()
+            self._start_slave()
+        
+        worker = threading.Thread(target=dead_worker)
+        worker.daemon = True
+        worker.start()
+            
+        self._master.requestTask([0,1,2])
+        
+        # The chunk is sent again to the other worker.
+        self.assertEqual(sorted(self._master.retrieveResult()[0]), [(0,0),(1,1),(2,4)])
+        
+    def test_authentication(self):
+        
+        refused = []
+        
+        # A peer without the secret key is refused before the master unpickles anything it sends.
+        def intruder():
+            channel = Channel(socket.create_connection(self._master.address), "wrong key", False)
+            try:
+                channel.authenticate()
+            except (AuthenticationError, EOFError, socket.error) as e:
+                refused.append(e)
+            channel.close()
+            self._start_slave()
+
+        worker = threading.Thread(target=intruder)
+        worker.daemon = True
+        worker.start()
+        
+        self._master.requestTask([3])
+
+        self.assertEqual(self._master.retrieveResult()[0], [(3,9)])
+        self.assertEqual(len(refused), 1)
+        
+        # The messages are accepted in the order they were sent.
+        sender = Channel(None, "key", True)
+        receiver = Channel(None, "key", False)
+        sender._sessionKey = receiver._sessionKey = "session"
+        a, b = socket.socketpair()
+        sender.sock, receiver.sock = a, b
+        sender.send((TASK, 0, [1]))
+        self.assertEqual(receiver.receive(), (TASK, 0, [1]))
+        # A replayed message has the wrong sequence number.
+        sender._sent = 0
+        sender.send((TASK, 0, [1]))
+        self.assertRaises(AuthenticationError, receiver.receive)
+        a.close()
+        b.close()
+        
+    def test_silent_peer(self):
+        
+        # A peer that connects and never answers the handshake does not block the master.
+        self._master.authenticationTimeout = 60.0
+        silent = socket.create_connection(self._master.address)
+        
+        try:
+            start = time.time()
+            self._start_slave()
+            self._master.requestTask([4])
+            self.assertEqual(self._master.retrieveResult()[0], [(4,16)])
+            self.assertTrue(time.time() - start < 30.0)
+        finally:
+            silent.close()
+            
+        # Nor does a master that never answers block the worker.
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('localhost',0))
+        server.listen(1)
+        
+        slave = ClusterSlave(server.getsockname(), authkey=self._master.authkey)
+        slave.authenticationTimeout = 0.5
+        try:
+            self.assertRaises(ClusterError, slave.run)
+        finally:
+            server.close()
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestCluster))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
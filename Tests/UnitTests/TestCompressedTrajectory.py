@@ -0,0 +1,136 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.CompressedTrajectory import is_compressed_trajectory, CompressedTrajectory, CompressedTrajectoryError, CompressedTrajectoryWriter
+from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+
+class _Universe(object):
+    '''
+    The minimal universe interface used by the compressed trajectories.
+    '''
+    
+    is_periodic = True
+    
+    def __init__(self, nAtoms):
+        
+        self._nAtoms = nAtoms
+        
+    def numberOfAtoms(self):
+        
+        return self._nAtoms
+    
+    def description(self):
+        
+        return "S()"
+    
+    def basisVectors(self):
+        
+        return [numpy.array([2.0,0.0,0.0]),numpy.array([0.0,2.0,0.0]),numpy.array([0.0,0.0,2.0])]
+
+class TestCompressedTrajectory(UnitTest):
+    '''
+    Unittest for the compressed trajectories
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.mct')
+        os.close(fd)
+        
+        self._universe = _Universe(100)
+        
+        numpy.random.seed(0)
+        self._unfolded = numpy.cumsum(numpy.random.normal(0.0, 0.3, (20,100,3)), axis=0)
+        self._folded = self._unfolded - 2.0*numpy.floor(self._unfolded/2.0)
+        
+        writer = CompressedTrajectoryWriter(self._filename, self._universe, 0.001)
+        for i in range(20):
+            writer.write_frame({'configuration':self._folded[i],'time':0.5*i,'box_size':numpy.array([2.0,2.0,2.0])})
+        writer.close()
+        
+    def tearDown(self):
+        
+        os.remove(self._filename)
+        
+    def test_sniffing(self):
+        
+        self.assertTrue(is_compressed_trajectory(self._filename))
+        self.assertFalse(is_compressed_trajectory(__file__))
+        self.assertRaises(CompressedTrajectoryError, CompressedTrajectory, __file__, self._universe)
+        
+    def test_frames(self):
+        
+        traj = CompressedTrajectory(self._filename, self._universe)
+        
+        self.assertEqual(len(traj), 20)
+        self.assertAlmostEqual(traj.max_error, 0.0005)
+        self.assertAlmostEqual(traj.time[3], 1.5)
+        
+        conf = traj.configuration[4]
+        self.assertTrue(numpy.abs(conf.array - self._folded[4]).max() <= traj.max_error*(1.0+1.0e-6))
+        self.assertTrue(numpy.allclose(conf.cell_parameters, [2.0,2.0,2.0]))
+        
+        traj.close()
+        
+    def test_atoms_trajectories(self):
+        
+        traj = CompressedTrajectory(self._filename, self._universe)
+        
+        series = read_atoms_trajectories(traj, [0,5,7], 0, 20, 1)
+        
+        self.assertEqual(series.shape, (20,3,3))
+        
+        ref = self._unfolded[:,[0,5,7],:] - self._unfolded[0,[0,5,7],:] + self._folded[0,[0,5,7],:]
+        self.assertTrue(numpy.abs(series - ref).max() <= 2.0*traj.max_error*(1.0+1.0e-6))
+        
+        traj.close()
+        
+    def test_compression_ratio(self):
+        
+        # Positions bounded to 1 pm take much less room than their double precision values.
+        self.assertTrue(os.path.getsize(self._filename) < self._folded.nbytes/3)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestCompressedTrajectory))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.Extensions import fast_calculation
+
+def brute_force_connectivity(coords, covRadii, tolerance, cell=None, rcell=None):
+    
+    bonds = []
+    for i in range(len(covRadii)-1):
+        for j in range(i+1,len(covRadii)):
+            r = coords[j] - coords[i]
+            if cell is not None:
+                s = numpy.dot(rcell, r)
+                s -= numpy.floor(s + 0.5)
+                r = numpy.dot(s, cell)
+            if numpy.dot(r,r) <= (covRadii[i] + covRadii[j] + tolerance)**2:
+                bonds.append((i,j))
+                
+    return numpy.array(bonds, dtype=numpy.int32).reshape((-1,2))
+
+class TestConnectivity(UnitTest):
+    '''
+    Unittest for the cell-list based cluster connectivity
+    '''
+    
+    def setUp(self):
+        
+        numpy.random.seed(0)
+        
+        self._coords = numpy.random.uniform(0.0, 2.0, (500,3))
+        self._covRadii = numpy.random.uniform(0.03, 0.08, (500,))
+        
+    def test_free_cluster(self):
+        
+        bonds = fast_calculation.cpt_cluster_connectivity(self._coords, self._covRadii, 0.05)
+        
+        self.assertEqual(bonds.dtype, numpy.int32)
+        self.assertTrue(numpy.array_equal(bonds, brute_force_connectivity(self._coords, self._covRadii, 0.05)))
+        
+    def test_periodic_cluster(self):
+        
+        cell = numpy.array([[2.0,0.0,0.0],[0.3,2.0,0.0],[0.2,0.1,2.0]])
+        rcell = numpy.linalg.inv(cell).T
+        
+        # Atoms spread over several images of the cell.
+        coords = numpy.dot(self._coords/2.0 + numpy.random.randint(-2, 3, (500,3)), cell)
+        
+        bonds = fast_calculation.cpt_cluster_connectivity(coords, self._covRadii, 0.05, cell, rcell)
+        
+        self.assertTrue(numpy.array_equal(bonds, brute_force_connectivity(coords, self._covRadii, 0.05, cell, rcell)))
+        
+    def test_small_cluster(self):
+        
+        bonds = fast_calculation.cpt_cluster_connectivity(numpy.zeros((1,3)), numpy.ones((1,)), 0.05)
+        
+        self.assertEqual(bonds.shape, (0,2))
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestConnectivity))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
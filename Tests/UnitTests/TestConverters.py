@@ -0,0 +1,202 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import unittest
+
+from UnitTest import UnitTest
+
+import numpy
+
+from MMTK import Units
+
+from MDANSE.Framework.Jobs.Converters.Converter import Converter, index_frames
+from MDANSE.Framework.Jobs.Converters.DL_POLY import HistoryFile, HistoryFileError
+from MDANSE.Framework.Jobs.Converters.PDB import PDBConverterError, PDBModelReader
+
+class _Converter(Converter):
+    '''
+    A converter whose frames are the ten times their index.
+    '''
+    
+    # No output trajectory is opened for a worker.
+    isWorker = True
+    
+    def __init__(self):
+        
+        self.written = []
+        
+        self.open_output(None)
+        
+    def read_frame(self, index):
+        
+        return 10*index
+    
+    def write_frame(self, index, frame):
+        
+        self.written.append((index,frame))
+
+class TestConverters(UnitTest):
+    '''
+    Unittest for the helpers shared by the converters
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.txt')
+        
+        self._offsets = []
+        with os.fdopen(fd, 'w') as f:
+            for i in range(10):
+                self._offsets.append(f.tell())
+                f.write("ITEM: TIMESTEP\n%d\n" % (100*i))
+                f.write("1 2 3\n"*(i+1))
+            self._offsets.append(f.tell())
+        
+    def tearDown(self):
+        
+        os.remove(self._filename)
+        
+    def test_index_frames(self):
+        
+        self.assertEqual(index_frames(self._filename, "ITEM: TIMESTEP"), self._offsets)
+
+        # The markers overlapping two blocks must be found once.
+        for blockSize in (1,5,13,14,15,64):
+            self.assertEqual(index_frames(self._filename, "ITEM: TIMESTEP", blockSize), self._offsets)
+            
+    def test_pdb_model_reader(self):
+        
+        fd, filename = tempfile.mkstemp(suffix='.pdb')
+        with os.fdopen(fd, 'w') as f:
+            for model in range(1,6):
+                f.write("MODEL     %4d\n" % model)
+                for i in range(3):
+                    f.write("ATOM  %5d  O   HOH A%4d    %8.3f%8.3f%8.3f  1.00  0.00           O\n" % (i+1,i+1,model,-100.0*i,i))
+                    # Atoms with an alternate location other than A are skipped.
+                    f.write("ATOM  %5d  O  BHOH A%4d    %8.3f%8.3f%8.3f  1.00  0.00           O\n" % (i+1,i+1,0.0,0.0,0.0))
+                f.write("ENDMDL\n")
+            f.write("END\n")
+        
+        reader = PDBModelReader(filename)
+        
+        # The model 0 is the first model of the file.
+        for model in [0,2,3,5,1]:
+            coordinates = reader.read_model(model)
+            expected = [[max(1,model),-100.0*i,i] for i in range(3)]
+            self.assertTrue(numpy.allclose(coordinates, numpy.array(expected)*Units.Ang))
+            
+        self.assertRaises(PDBConverterError, reader.read_model, 6)
+        
+        reader.close()
+        
+        os.remove(filename)
+        
+    def test_frames_order(self):
+        
+        converter = _Converter()
+        
+        results = dict([converter.run_step(i) for i in range(6)])
+        
+        # The frames are written in order whatever the order in which they are read.
+        converter.combine(2, results[2])
+        self.assertEqual(converter.written, [])
+        
+        for i in [0,1,5,3,4]:
+            converter.combine(i, results[i])
+            
+        self.assertEqual(converter.written, [(i,10*i) for i in range(6)])
+        
+    def test_reused_buffers(self):
+        
+        converter = _Converter()
+        
+        # The frames retrieved from the shared memory are views on a buffer reused by the next result of the worker.
+        buffer = numpy.zeros((2,3))
+        for i in [2,1,0]:
+            buffer[...] = i
+            converter.combine(i, (i, buffer))
+            if i == 2:
+                self.assertEqual(converter.retained_size(), buffer.nbytes)
+            
+        self.assertEqual([idx for idx, _ in converter.written], [0,1,2])
+        for idx, (_, frame) in converter.written[1:]:
+            self.assertTrue(numpy.all(frame == idx))
+        self.assertEqual(converter.retained_size(), 0)
+        
+    def test_history_file(self):
+        
+        numpy.random.seed(0)
+        values = numpy.random.uniform(-10.0, 10.0, (4,5,9))
+        
+        fd, filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write("%-80s\n" % "test")
+            f.write("%10d%10d%10d\n" % (2,3,5))
+            for i in range(4):
+                f.write("timestep%10d%10d%10d%10d%12.6f\n" % (10*(i+1),5,2,3,0.001))
+                for j in range(3):
+                    f.write("%12.4f%12.4f%12.4f\n" % tuple(10.0*(i+1)*numpy.identity(3)[j]))
+                for j in range(5):
+                    f.write("%-8s%10d%12.6f%12.6f\n" % ("O%d" % j,j+1,15.9994,-0.8))
+                    for k in range(3):
+                        f.write("%12.4e%12.4e%12.4e\n" % tuple(values[i,j,3*k:3*k+3]))
+        
+        history = HistoryFile(filename)
+        
+        self.assertEqual(history["n_frames"], 4)
+        
+        factors = numpy.array([Units.Ang]*3 + [Units.Ang/Units.ps]*3 + [-Units.amu*Units.Ang/Units.ps**2]*3)
+        
+        frames = history.read_steps(1, 4)
+        for i, (time, cell, config) in enumerate(frames, 1):
+            self.assertAlmostEqual(time, 0.01*i)
+            self.assertTrue(numpy.allclose(cell, 10.0*(i+1)*numpy.identity(3)*Units.Ang))
+            self.assertTrue(numpy.allclose(config, values[i]*factors, rtol=1.0e-4))
+            
+        time, cell, config = history.read_step(2)
+        self.assertTrue(numpy.allclose(config, frames[1][2]))
+        
+        self.assertRaises(HistoryFileError, history.read_steps, 3, 5)
+        
+        history.close()
+        
+        os.remove(filename)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestConverters))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
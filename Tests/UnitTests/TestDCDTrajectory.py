@@ -0,0 +1,180 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy
+
+from MMTK import Units
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.DCDTrajectory import cell_basis_vectors, is_dcd_trajectory, DCDFile, DCDTrajectory, DCDTrajectoryError
+from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+
+def _record(data, order):
+    
+    return struct.pack(order + 'i', len(data)) + data + struct.pack(order + 'i', len(data))
+
+def write_dcd(filename, coordinates, cells=None, order='<'):
+    '''
+    Writes a CHARMM flavoured DCD file. The coordinates and the cell lengths are in Angstrom.
+    '''
+    
+    nFrames, nAtoms, _ = coordinates.shape
+    
+    header = [nFrames,0,10,0,0,0,0,0,0]
+    
+    with open(filename, 'wb') as f:
+        f.write(_record('CORD' + struct.pack(order + '9if10i', *(header + [0.5, 0 if cells is None else 1] + [0]*8 + [24])), order))
+        f.write(_record(struct.pack(order + 'i', 1) + 'test'.ljust(80), order))
+        f.write(_record(struct.pack(order + 'i', nAtoms), order))
+        for i in range(nFrames):
+            if cells is not None:
+                f.write(_record(numpy.asarray(cells[i], dtype=order + 'f8').tostring(), order))
+            for axis in range(3):
+                f.write(_record(numpy.asarray(coordinates[i,:,axis], dtype=order + 'f4').tostring(), order))
+
+class _Universe(object):
+    '''
+    The minimal universe interface used by the DCD trajectories.
+    '''
+    
+    is_periodic = True
+    
+    def __init__(self, nAtoms):
+        
+        self._nAtoms = nAtoms
+        
+    def numberOfAtoms(self):
+        
+        return self._nAtoms
+    
+class TestDCDTrajectory(UnitTest):
+    '''
+    Unittest for the DCD trajectories
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.dcd')
+        os.close(fd)
+        
+        numpy.random.seed(0)
+        self._unfolded = numpy.cumsum(numpy.random.normal(0.0, 3.0, (20,10,3)), axis=0)
+        self._folded = (self._unfolded - 20.0*numpy.floor(self._unfolded/20.0)).astype(numpy.float32)
+        
+        # A, cos(gamma), B, cos(beta), cos(alpha), C of an orthorhombic cell.
+        self._cells = numpy.tile([20.0,0.0,20.0,0.0,0.0,20.0], (20,1))
+        
+        write_dcd(self._filename, self._folded, self._cells, '>')
+        
+    def tearDown(self):
+        
+        os.remove(self._filename)
+        
+    def test_sniffing(self):
+        
+        self.assertTrue(is_dcd_trajectory(self._filename))
+        self.assertFalse(is_dcd_trajectory(__file__))
+        
+    def test_dcd_file(self):
+        
+        dcd = DCDFile(self._filename)
+        
+        self.assertEqual(dcd['n_frames'], 20)
+        self.assertEqual(dcd['natoms'], 10)
+        self.assertEqual(dcd['title'], 'test')
+        
+        cell, config = dcd.read_step(7)
+        self.assertTrue(numpy.allclose(cell, 2.0*numpy.identity(3)))
+        self.assertTrue(numpy.allclose(config, self._folded[7]*Units.Ang))
+        
+        series = dcd.read_configurations(2, 18, 3, [1,4])
+        self.assertTrue(numpy.allclose(series, self._folded[2:18:3][:,[1,4],:]*Units.Ang))
+        
+        dcd.close()
+        
+    def test_cell_basis_vectors(self):
+        
+        # alpha = 80, beta = 90 and gamma = 60 degrees given as cosines then in degrees.
+        cosines = numpy.cos(numpy.radians([80.0,90.0,60.0]))
+        cells = numpy.array([[10.0,cosines[2],20.0,cosines[1],cosines[0],30.0],[10.0,60.0,20.0,90.0,80.0,30.0]])
+        
+        basis = cell_basis_vectors(cells)
+        
+        self.assertTrue(numpy.allclose(basis[0], basis[1]))
+        self.assertTrue(numpy.allclose(numpy.sqrt((basis[0]**2).sum(axis=1)), numpy.array([10.0,20.0,30.0])*Units.Ang))
+        
+        angle = lambda u, v : numpy.degrees(numpy.arccos(numpy.dot(u,v)/numpy.sqrt(numpy.dot(u,u)*numpy.dot(v,v))))
+        self.assertAlmostEqual(angle(basis[0,1],basis[0,2]), 80.0)
+        self.assertAlmostEqual(angle(basis[0,0],basis[0,2]), 90.0)
+        self.assertAlmostEqual(angle(basis[0,0],basis[0,1]), 60.0)
+        
+    def test_frames(self):
+        
+        traj = DCDTrajectory(self._filename, _Universe(10))
+        
+        self.assertEqual(len(traj), 20)
+        self.assertEqual(traj.variables(), ['box_size','configuration','time'])
+        
+        conf = traj.configuration[4]
+        self.assertTrue(numpy.allclose(conf.array, self._folded[4]*Units.Ang))
+        self.assertTrue(numpy.allclose(conf.cell_parameters, 2.0*numpy.identity(3).ravel()))
+        
+        self.assertRaises(DCDTrajectoryError, DCDTrajectory, self._filename, _Universe(11))
+        
+        traj.close()
+        
+    def test_atoms_trajectories(self):
+        
+        traj = DCDTrajectory(self._filename, _Universe(10))
+        
+        series = read_atoms_trajectories(traj, [0,5,7], 0, 20, 1)
+        
+        self.assertEqual(series.shape, (20,3,3))
+        
+        ref = (self._unfolded[:,[0,5,7],:] - self._unfolded[0,[0,5,7],:] + self._folded[0,[0,5,7],:])*Units.Ang
+        self.assertTrue(numpy.allclose(series, ref, atol=1.0e-5))
+        
+        traj.close()
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestDCDTrajectory))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
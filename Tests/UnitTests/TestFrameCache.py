@@ -0,0 +1,119 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.FrameCache import FrameCache
+
+class TestFrameCache(UnitTest):
+    '''
+    Unittest for the cache of the trajectory frames
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.nc')
+        os.write(fd, 'x')
+        os.close(fd)
+        
+    def tearDown(self):
+        
+        os.remove(self._filename)
+        
+    def test_hits_and_misses(self):
+        
+        cache = FrameCache(budget=1024)
+        
+        self.assertTrue(cache.get(self._filename, 'configuration', 0) is None)
+        
+        conf = numpy.arange(12, dtype=numpy.float64).reshape((4,3))
+        cache.put(self._filename, 'configuration', 0, (conf,None))
+        
+        frame = cache.get(self._filename, 'configuration', 0)
+        self.assertTrue(numpy.array_equal(frame[0], conf))
+        self.assertFalse(frame[0].flags.writeable)
+        
+        self.assertTrue(cache.get(self._filename, 'velocities', 0) is None)
+        
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['frames'], 1)
+        self.assertEqual(stats['size'], conf.nbytes)
+        
+    def test_budget(self):
+        
+        # Room for 3 frames of 96 bytes.
+        cache = FrameCache(budget=300)
+        
+        for i in range(4):
+            cache.put(self._filename, 'configuration', i, (numpy.zeros((4,3)),))
+            if i == 1:
+                # Frame 0 becomes the most recently used one.
+                cache.get(self._filename, 'configuration', 0)
+                
+        self.assertEqual(cache.stats()['frames'], 3)
+        self.assertTrue(cache.get(self._filename, 'configuration', 1) is None)
+        self.assertFalse(cache.get(self._filename, 'configuration', 0) is None)
+        
+        # A frame larger than the budget is not cached.
+        cache.put(self._filename, 'configuration', 10, (numpy.zeros((100,3)),))
+        self.assertTrue(cache.get(self._filename, 'configuration', 10) is None)
+        
+    def test_invalidation(self):
+        
+        cache = FrameCache(budget=1024)
+        cache.put(self._filename, 'configuration', 0, (numpy.zeros((4,3)),))
+        
+        with open(self._filename, 'a') as f:
+            f.write('x')
+        
+        self.assertTrue(cache.get(self._filename, 'configuration', 0) is None)
+        self.assertEqual(cache.stats()['size'], 0)
+        
+        cache.put(self._filename, 'configuration', 0, (numpy.zeros((4,3)),))
+        cache.discard(self._filename)
+        self.assertEqual(cache.stats()['frames'], 0)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestFrameCache))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import json
+import os
+import tempfile
+import unittest
+
+from UnitTest import UnitTest
+
+from MDANSE.Core.Instrumentation import INSTRUMENTATION
+
+class DummyJob(object):
+    
+    def run_step(self, index):
+        
+        with INSTRUMENTATION.section("read"):
+            pass
+        
+        return index, None
+
+class TestInstrumentation(UnitTest):
+    '''
+    Unittest for the instrumentation of the jobs
+    '''
+
+    def tearDown(self):
+        
+        INSTRUMENTATION.disable()
+        
+    def test_disabled(self):
+        
+        INSTRUMENTATION.disable()
+        
+        self.assertEqual(INSTRUMENTATION.run_step(DummyJob(), 3), (3,None))
+        self.assertEqual(INSTRUMENTATION.pop_events(), None)
+        
+    def test_events(self):
+        
+        INSTRUMENTATION.enable()
+        INSTRUMENTATION.set_worker("master")
+        
+        job = DummyJob()
+        for i in range(5):
+            INSTRUMENTATION.run_step(job, i)
+            with INSTRUMENTATION.section("combine"):
+                pass
+            
+        events = INSTRUMENTATION.pop_events()
+        
+        steps = [e for e in events if e[0] == "step"]
+        self.assertEqual([e[1] for e in steps], range(5))
+        self.assertTrue(all(["read" in e[6] for e in steps]))
+        self.assertEqual(len([e for e in events if e[0] == "combine"]), 5)
+        
+        # Events recorded by a worker.
+        INSTRUMENTATION.add_events(events)
+        INSTRUMENTATION.add_events([("step", 5, "worker 0", steps[0][3], 1.0, 0.5, {})])
+        
+        fd, filename = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            INSTRUMENTATION.write_trace(filename)
+            with open(filename, 'r') as f:
+                trace = json.load(f)
+        finally:
+            os.remove(filename)
+            
+        names = [e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"]
+        self.assertEqual(sorted(names), ["master","worker 0"])
+        self.assertEqual(len([e for e in trace["traceEvents"] if e["ph"] == "X"]), 11)
+        
+        summary = INSTRUMENTATION.summary()
+        self.assertTrue("step (read)" in summary)
+        self.assertTrue("worker 0" in summary)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestInstrumentation))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,145 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.MemoryMappedTrajectory import is_memory_mapped_trajectory, MemoryMappedTrajectory, MemoryMappedTrajectoryError, MemoryMappedTrajectoryWriter
+from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+
+class _Universe(object):
+    '''
+    The minimal universe interface used by the memory mapped trajectories.
+    '''
+    
+    is_periodic = True
+    
+    def __init__(self, nAtoms):
+        
+        self._nAtoms = nAtoms
+        
+    def numberOfAtoms(self):
+        
+        return self._nAtoms
+    
+    def description(self):
+        
+        return "S()"
+    
+    def basisVectors(self):
+        
+        return [numpy.array([2.0,0.0,0.0]),numpy.array([0.0,2.0,0.0]),numpy.array([0.0,0.0,2.0])]
+
+class TestMemoryMappedTrajectory(UnitTest):
+    '''
+    Unittest for the memory mapped trajectories
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.mdt')
+        os.close(fd)
+        
+        self._universe = _Universe(10)
+        
+        numpy.random.seed(0)
+        self._unfolded = numpy.cumsum(numpy.random.normal(0.0, 0.3, (20,10,3)), axis=0)
+        self._folded = self._unfolded - 2.0*numpy.floor(self._unfolded/2.0)
+        
+        writer = MemoryMappedTrajectoryWriter(self._filename, self._universe, 20, {'configuration':(10,3),'time':(),'box_size':(3,)}, numpy.float64)
+        for i in range(20):
+            writer.write_frame(i, {'configuration':self._folded[i],'time':0.5*i,'box_size':[2.0,2.0,2.0]})
+        writer.close()
+        
+    def tearDown(self):
+        
+        os.remove(self._filename)
+        
+    def test_sniffing(self):
+        
+        self.assertTrue(is_memory_mapped_trajectory(self._filename))
+        self.assertFalse(is_memory_mapped_trajectory(__file__))
+        self.assertRaises(MemoryMappedTrajectoryError, MemoryMappedTrajectory, __file__, self._universe)
+        
+    def test_frames(self):
+        
+        traj = MemoryMappedTrajectory(self._filename, self._universe)
+        
+        self.assertEqual(len(traj), 20)
+        self.assertEqual(traj.variables(), ['box_size','configuration','time'])
+        self.assertAlmostEqual(traj.time[3], 1.5)
+        
+        conf = traj.configuration[4]
+        self.assertTrue(numpy.array_equal(conf.array, self._folded[4]))
+        self.assertTrue(numpy.array_equal(conf.cell_parameters, [2.0,2.0,2.0]))
+        
+        # Configurations are copies, not views on the file.
+        conf.array[:] = 0.0
+        self.assertTrue(numpy.array_equal(traj.configuration[4].array, self._folded[4]))
+        
+        traj.close()
+        
+    def test_atoms_trajectories(self):
+        
+        traj = MemoryMappedTrajectory(self._filename, self._universe)
+        
+        series = read_atoms_trajectories(traj, [0,5,7], 0, 20, 1)
+        
+        self.assertEqual(series.shape, (20,3,3))
+        
+        ref = self._unfolded[:,[0,5,7],:] - self._unfolded[0,[0,5,7],:] + self._folded[0,[0,5,7],:]
+        self.assertTrue(numpy.allclose(series, ref))
+        
+        self.assertTrue(numpy.allclose(traj.readParticleTrajectory(5, 0, 20).array, ref[:,1,:]))
+        
+        traj.close()
+        
+    def test_unknown_variable(self):
+        
+        traj = MemoryMappedTrajectory(self._filename, self._universe)
+        
+        self.assertRaises(MemoryMappedTrajectoryError, read_atoms_trajectories, traj, [0,5], 0, 20, 1, "velocities")
+        self.assertRaises(MemoryMappedTrajectoryError, read_atoms_trajectories, traj, [0,5], 0, 20, 1, "time")
+        
+        traj.close()
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestMemoryMappedTrajectory))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
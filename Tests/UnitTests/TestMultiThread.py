@@ -0,0 +1,88 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import unittest
+
+from UnitTest import UnitTest
+
+from MDANSE.DistributedComputing.MultiThread import ThreadMaster, MultiThreadError
+
+class DummyJob(object):
+    
+    configuration = {}
+    
+    def run_step(self, index):
+        
+        if index == 13:
+            raise ValueError("step 13")
+        
+        return index, index*index
+
+class TestMultiThread(UnitTest):
+    '''
+    Unittest for the pool of worker threads
+    '''
+
+    def test_run(self):
+        
+        master = ThreadMaster(DummyJob(), 4)
+        master.start()
+        
+        try:
+            chunks = [range(i,i+3) for i in range(0,12,3)]
+            for chunk in chunks:
+                master.requestTask(chunk)
+            results = []
+            for _ in chunks:
+                results.extend(master.retrieveResult()[0])
+        finally:
+            master.shutdown()
+            
+        self.assertEqual(sorted(results), [(i,i*i) for i in range(12)])
+        
+    def test_failure(self):
+        
+        master = ThreadMaster(DummyJob(), 2)
+        master.start()
+        
+        try:
+            master.requestTask([12,13])
+            self.assertRaises(MultiThreadError, master.retrieveResult)
+        finally:
+            master.shutdown()
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestMultiThread))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,160 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import unittest
+
+from UnitTest import UnitTest
+
+from MDANSE.DistributedComputing.Scheduling import AdaptiveChunker, ResultsWindow, build_job, job_bootstrap
+
+class _Job(object):
+    
+    def run_step(self, index):
+        return index, None
+    
+class _ConfiguredJob(_Job):
+    
+    def worker_state(self):
+        return ("dummy", {"frames" : (0,10,1)}, {})
+
+class TestScheduling(UnitTest):
+    '''
+    Unittest for the scheduling of the steps of a job
+    '''
+        
+    def test_all_steps_scheduled_once(self):
+        
+        chunker = AdaptiveChunker(range(1000), 4, targetDuration=1.0)
+        
+        steps = []
+        while True:
+            chunk = chunker.next_chunk()
+            if chunk is None:
+                break
+            steps.extend(chunk)
+            chunker.update(chunk, 0.01*len(chunk))
+            
+        self.assertEqual(steps, range(1000))
+        
+    def test_chunk_size(self):
+        
+        chunker = AdaptiveChunker(range(10000), 4, targetDuration=1.0)
+        
+        # No measure yet: one step per chunk.
+        self.assertEqual(len(chunker.next_chunk()), 1)
+        
+        chunker.update([0], 0.01)
+        self.assertEqual(chunker.chunk_size(), 100)
+        
+        # The chunk size is bounded by half of the remaining steps per worker.
+        chunker = AdaptiveChunker(range(10000), 4, targetDuration=1.0)
+        chunker.update([0], 1.0e-6)
+        self.assertEqual(chunker.chunk_size(), 10000//8)
+        
+    def test_longest_first(self):
+        
+        costs = [1,10,1,5,0,10,2,2]
+        
+        chunker = AdaptiveChunker(range(8), 1, targetDuration=20.0, costs=costs)
+        
+        chunks = []
+        while True:
+            chunk = chunker.next_chunk()
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            chunker.update(chunk, 1.0*chunker.cost(chunk))
+            
+        # The steps are scheduled by decreasing cost, the steps of equal cost in index order.
+        self.assertEqual(sum(chunks,[]), [1,5,3,6,7,0,2,4])
+        
+        # The first chunk is made of a single step, the second is bounded by half of the remaining cost (21).
+        self.assertEqual(chunks[:2], [[1],[5]])
+        
+    def test_results_window(self):
+        
+        window = ResultsWindow(4, budget=1000)
+        
+        # No measure yet: only the number of chunks is bounded.
+        self.assertEqual(window.available_steps(), None)
+        window.push(1)
+        window.pop(1, 100)
+        self.assertTrue(window.empty)
+        
+        # 100 bytes per step: at most 10 steps in flight.
+        self.assertEqual(window.available_steps(), 10)
+        window.push(6)
+        self.assertEqual(window.available_steps(), 4)
+        window.push(4)
+        self.assertFalse(window.is_open())
+        window.pop(6, 600)
+        self.assertTrue(window.is_open())
+        window.pop(4, 400)
+        
+        # A single step larger than the budget can still be run when nothing is in flight.
+        window.push(1)
+        window.pop(1, 5000)
+        self.assertEqual(window.available_steps(), 1)
+        
+        # The results kept by the job are taken from the budget.
+        window = ResultsWindow(4, budget=1000)
+        window.push(1)
+        window.pop(1, 100)
+        window.retain(300)
+        self.assertEqual(window.available_steps(), 7)
+        window.retain(2000)
+        self.assertEqual(window.available_steps(), 1)
+        window.push(1)
+        self.assertFalse(window.is_open())
+        
+        # The number of chunks in flight is bounded.
+        window = ResultsWindow(2)
+        window.push(1)
+        window.push(1)
+        self.assertFalse(window.is_open())
+        
+    def test_job_bootstrap(self):
+        
+        # A job that can not be rebuilt by the workers is sent as it is.
+        job = _Job()
+        self.assertEqual(job_bootstrap(job), (False, job))
+        self.assertTrue(build_job(job_bootstrap(job)) is job)
+        
+        # Otherwise only its state is sent.
+        self.assertEqual(job_bootstrap(_ConfiguredJob()), (True, ("dummy", {"frames" : (0,10,1)}, {})))
+            
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestScheduling))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,101 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import ctypes
+import multiprocessing
+import os
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.DistributedComputing.SharedMemory import pack, unpack, SharedArray, SharedMemoryError, SharedMemoryMaster
+
+class DyingJob(object):
+    
+    configuration = {}
+    
+    def run_step(self, index):
+        
+        # Dies as a worker killed by the system would do, without reporting any error.
+        os._exit(1)
+
+class TestSharedMemory(UnitTest):
+    '''
+    Unittest for the packing of the step results in shared memory buffers
+    '''
+
+    def setUp(self):
+        
+        self._buffer = numpy.frombuffer(multiprocessing.RawArray(ctypes.c_char, 1024), dtype=numpy.uint8)
+        
+    def test_pack_unpack(self):
+        
+        result = (3, {'a' : numpy.arange(5,dtype=numpy.float64), 'b' : [numpy.ones((2,3),dtype=numpy.complex64), None, 'x']}, 2.0)
+        
+        skeleton, _ = pack(result, self._buffer)
+        
+        self.assertTrue(isinstance(skeleton[1]['a'],SharedArray))
+        self.assertTrue(isinstance(skeleton[1]['b'][0],SharedArray))
+                
+        unpacked = unpack(skeleton, self._buffer)
+
+        self.assertEqual(unpacked[0],3)
+        self.assertEqual(unpacked[2],2.0)
+        self.assertEqual(unpacked[1]['b'][1:],[None,'x'])
+        self.assertTrue(numpy.array_equal(unpacked[1]['a'],result[1]['a']))
+        self.assertTrue(numpy.array_equal(unpacked[1]['b'][0],result[1]['b'][0]))
+        self.assertEqual(unpacked[1]['b'][0].dtype,numpy.complex64)
+
+    def test_buffer_overflow(self):
+        
+        self.assertRaises(SharedMemoryError, pack, numpy.zeros((200,),dtype=numpy.float64), self._buffer)
+        
+    def test_dead_worker(self):
+        
+        master = SharedMemoryMaster(DyingJob(), 1, bufferSize=1024)
+        master.pollInterval = 0.1
+        master.start()
+        master.requestTask([0])
+        
+        try:
+            self.assertRaisesRegexp(SharedMemoryError, "Worker 0 died", master.retrieveResult)
+        finally:
+            master.shutdown()
+
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestSharedMemory))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
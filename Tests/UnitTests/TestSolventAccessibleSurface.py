@@ -0,0 +1,95 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.Extensions import sas_fast_calc
+
+def reference_sas(config, indexes, radii, points, probe):
+    '''
+    Pure numpy version of the Shrake-Rupley algorithm implemented in sas_fast_calc.
+    '''
+    
+    sas = 0.0
+    for i in indexes:
+        radius = radii[i] + 2.0*probe
+        dist = ((config - config[i])**2).sum(axis=1)
+        neighbours = [k for k in range(len(config)) if k != i and dist[k] < (radius + radii[k])**2]
+        radi = radius + probe
+        spherePoints = config[i] + radi*points
+        accessible = numpy.ones((len(points),), dtype=bool)
+        for j in neighbours:
+            accessible &= ((spherePoints - config[j])**2).sum(axis=1) >= (radii[j] + probe)**2
+        sas += accessible.sum()*radi*radi
+        
+    return sas
+
+class TestSolventAccessibleSurface(UnitTest):
+    '''
+    Unittest for the solvent accessible surface kernel
+    '''
+
+    def setUp(self):
+        
+        numpy.random.seed(1)
+        
+        self._config = numpy.random.uniform(0.0, 1.0, (30,3))
+        
+        radii = numpy.random.uniform(0.05, 0.15, (30,))
+        self._radii = numpy.column_stack((numpy.arange(30),radii))
+        
+        points = numpy.random.normal(0.0, 1.0, (50,3))
+        self._points = points/numpy.sqrt((points**2).sum(axis=1))[:,numpy.newaxis]
+        
+    def test_partial_selection(self):
+        
+        # The selected atoms are given by their universe indexes.
+        indexes = numpy.array([3,7,8,21,29], dtype=numpy.int32)
+        
+        sas = sas_fast_calc.sas(0, self._config, indexes, self._radii, self._points, 0.14)
+        
+        self.assertAlmostEqual(sas, reference_sas(self._config, indexes, self._radii[:,1], self._points, 0.14))
+        
+        # A configuration restricted to the selected atoms does not hold the atoms indexed by the universe indexes.
+        self.assertRaises(IndexError, sas_fast_calc.sas, 0, self._config[indexes,:], indexes, self._radii, self._points, 0.14)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestSolventAccessibleSurface))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
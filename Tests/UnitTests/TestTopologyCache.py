@@ -0,0 +1,108 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import time
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.TopologyCache import TopologyCache
+
+class TestTopologyCache(UnitTest):
+    '''
+    Unittest for the cache of the trajectory topologies
+    '''
+
+    def setUp(self):
+        
+        self._directory = tempfile.mkdtemp()
+        
+        self._filename = os.path.join(self._directory, 'traj.nc')
+        with open(self._filename, 'w') as f:
+            f.write('x')
+        
+    def tearDown(self):
+        
+        for f in os.listdir(self._directory):
+            os.remove(os.path.join(self._directory, f))
+        os.rmdir(self._directory)
+        
+    def test_round_trip(self):
+        
+        cache = TopologyCache(self._filename)
+        
+        self.assertTrue(cache.load(4, 0.05) is None)
+        
+        bonds = numpy.array([[0,1],[1,2],[2,3]])
+        self.assertTrue(cache.save(['C2H2','water'], bonds, 4, 0.05))
+        self.assertTrue(os.path.exists(cache.cache_filename))
+        
+        names, cachedBonds = TopologyCache(self._filename).load(4, 0.05)
+        self.assertEqual(names, ['C2H2','water'])
+        self.assertTrue(numpy.array_equal(cachedBonds, bonds))
+        self.assertEqual(cachedBonds.dtype, numpy.int32)
+        
+    def test_no_bonds(self):
+        
+        cache = TopologyCache(self._filename)
+        
+        cache.save([], numpy.zeros((0,2)), 4, 0.05)
+        
+        names, bonds = cache.load(4, 0.05)
+        self.assertEqual(names, [])
+        self.assertEqual(bonds.shape, (0,2))
+        
+    def test_invalidation(self):
+        
+        cache = TopologyCache(self._filename)
+        
+        cache.save(['water'], numpy.array([[0,1]]), 4, 0.05)
+        
+        self.assertTrue(cache.load(5, 0.05) is None)
+        self.assertTrue(cache.load(4, 0.1) is None)
+        
+        # Any change of the trajectory file invalidates the cache.
+        time.sleep(0.01)
+        with open(self._filename, 'a') as f:
+            f.write('y')
+        self.assertTrue(cache.load(4, 0.05) is None)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestTopologyCache))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
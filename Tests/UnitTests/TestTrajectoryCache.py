@@ -0,0 +1,109 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.TrajectoryCache import TransposedTrajectoryCache
+
+class TestTrajectoryCache(UnitTest):
+    '''
+    Unittest for the atom-major trajectory cache
+    '''
+
+    def setUp(self):
+        
+        self._directory = tempfile.mkdtemp()
+        
+        self._filename = os.path.join(self._directory, 'traj.nc')
+        with open(self._filename, 'w') as f:
+            f.write('x')
+            
+        self._values = numpy.random.uniform(-1.0, 1.0, (20,7,3))
+        
+    def tearDown(self):
+        
+        shutil.rmtree(self._directory)
+        
+    def test_read(self):
+        
+        cache = TransposedTrajectoryCache(self._filename, dtype=numpy.float64)
+        self.assertFalse(cache.is_valid())
+        
+        self.assertTrue(cache.build(self._values))
+        self.assertTrue(cache.is_valid())
+        
+        series = cache.read([5,0,2], 1, 17, 3)
+        self.assertTrue(numpy.array_equal(series, self._values[1:17:3][:,[5,0,2],:]))
+        
+        cache.close()
+        
+    def test_float32(self):
+        
+        cache = TransposedTrajectoryCache(self._filename, dtype=numpy.float32)
+        cache.build(self._values)
+        
+        self.assertTrue(numpy.allclose(cache.read(range(7), 0, 20), self._values, atol=1.0e-6))
+        
+        cache.close()
+        
+    def test_invalidation(self):
+        
+        cache = TransposedTrajectoryCache(self._filename)
+        cache.build(self._values)
+        
+        with open(self._filename, 'a') as f:
+            f.write('x')
+        self.assertFalse(cache.is_valid())
+        
+        cache.build(self._values)
+        self.assertTrue(cache.is_valid())
+        
+        stat = os.stat(self._filename)
+        os.utime(self._filename, (stat.st_atime,stat.st_mtime + 10))
+        self.assertFalse(cache.is_valid())
+        
+        cache.close()
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestTrajectoryCache))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,146 @@
+#MDANSE : Molecular Dynamics Analysis for Neutron Scattering Experiments
+#------------------------------------------------------------------------------------------
+#Copyright (C)
+#2015- Eric C. Pellegrini Institut Laue-Langevin
+#BP 156
+#6, rue Jules Horowitz
+#38042 Grenoble Cedex 9
+#France
+#pellegrini[at]ill.fr
+#goret[at]ill.fr
+#aoun[at]ill.fr
+#
+#This library is free software; you can redistribute it and/or
+#modify it under the terms of the GNU Lesser General Public
+#License as published by the Free Software Foundation; either
+#version 2.1 of the License, or (at your option) any later version.
+#
+#This library is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public
+#License along with this library; if not, write to the Free Software
+#Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+''' 
+Created on Oct 18, 2026
+'''
+
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from UnitTest import UnitTest
+
+from MDANSE.MolecularDynamics.MemoryMappedTrajectory import MemoryMappedTrajectory, MemoryMappedTrajectoryWriter
+from MDANSE.MolecularDynamics.Trajectory import read_atoms_trajectories
+from MDANSE.MolecularDynamics.VirtualTrajectory import is_virtual_trajectory, read_virtual_trajectory, write_virtual_trajectory, VirtualTrajectory, VirtualTrajectoryError
+
+class _Universe(object):
+    '''
+    The minimal universe interface used by the memory mapped and virtual trajectories.
+    '''
+    
+    is_periodic = True
+    
+    def __init__(self, nAtoms):
+        
+        self._nAtoms = nAtoms
+        
+    def numberOfAtoms(self):
+        
+        return self._nAtoms
+    
+    def description(self):
+        
+        return "S()"
+    
+    def basisVectors(self):
+        
+        return [numpy.array([2.0,0.0,0.0]),numpy.array([0.0,2.0,0.0]),numpy.array([0.0,0.0,2.0])]
+
+class TestVirtualTrajectory(UnitTest):
+    '''
+    Unittest for the virtual trajectories
+    '''
+
+    def setUp(self):
+        
+        fd, self._filename = tempfile.mkstemp(suffix='.mdt')
+        os.close(fd)
+        
+        fd, self._viewFilename = tempfile.mkstemp(suffix='.mvt')
+        os.close(fd)
+        
+        numpy.random.seed(0)
+        unfolded = numpy.cumsum(numpy.random.normal(0.0, 0.3, (20,10,3)), axis=0)
+        self._folded = unfolded - 2.0*numpy.floor(unfolded/2.0)
+        
+        writer = MemoryMappedTrajectoryWriter(self._filename, _Universe(10), 20, {'configuration':(10,3),'time':(),'box_size':(3,)}, numpy.float64)
+        for i in range(20):
+            writer.write_frame(i, {'configuration':self._folded[i],'time':0.5*i,'box_size':[2.0,2.0,2.0]})
+        writer.close()
+        
+        self._parent = MemoryMappedTrajectory(self._filename, _Universe(10))
+        
+    def tearDown(self):
+        
+        self._parent.close()
+        
+        os.remove(self._filename)
+        os.remove(self._viewFilename)
+        
+    def test_file(self):
+        
+        write_virtual_trajectory(self._viewFilename, self._filename, 2, 19, 3, [7,3,3])
+        
+        self.assertTrue(is_virtual_trajectory(self._viewFilename))
+        self.assertFalse(is_virtual_trajectory(self._filename))
+        
+        view = read_virtual_trajectory(self._viewFilename)
+        self.assertEqual(view['parent'], os.path.abspath(self._filename))
+        self.assertEqual((view['first'],view['last'],view['step']), (2,19,3))
+        self.assertEqual(view['atoms'], [3,7])
+        
+    def test_frames(self):
+        
+        traj = VirtualTrajectory(self._parent, 2, 19, 3, [3,7], universe=_Universe(2))
+        
+        self.assertEqual(len(traj), 6)
+        self.assertAlmostEqual(traj.time[1], 2.5)
+        self.assertTrue(numpy.allclose(traj.time[0:6:2], [1.0,4.0,7.0]))
+        
+        conf = traj.configuration[2]
+        self.assertTrue(numpy.array_equal(conf.array, self._folded[8][[3,7]]))
+        
+        self.assertRaises(IndexError, traj.configuration.__getitem__, 6)
+        
+        self.assertRaises(VirtualTrajectoryError, VirtualTrajectory, self._parent, 5, 5, 1)
+        
+    def test_atoms_trajectories(self):
+        
+        traj = VirtualTrajectory(self._parent, 2, 19, 3, [3,7], universe=_Universe(2))
+        
+        series = read_atoms_trajectories(traj, [1,0], 0, 6, 2)
+        
+        self.assertTrue(numpy.allclose(series, read_atoms_trajectories(self._parent, [7,3], 2, 19, 6)))
+        
+    def test_all_atoms(self):
+        
+        traj = VirtualTrajectory(self._parent, 0, None, 2, range(10))
+        
+        self.assertTrue(traj.universe is self._parent.universe)
+        self.assertEqual(len(traj), 10)
+                
+def suite():
+    loader = unittest.TestLoader()
+    s = unittest.TestSuite()
+    s.addTest(loader.loadTestsFromTestCase(TestVirtualTrajectory))
+    return s
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)